@@ -0,0 +1,332 @@
+# ------------------------------------------------------------
+# 🔮 Antecipação: gera em segundo plano enquanto o formulário é preenchido
+# ------------------------------------------------------------
+# O tema costuma estar digitado bem antes do objetivo e do clique em
+# "Gerar". Com a antecipação ligada, quando as entradas ficam paradas por
+# DEBOUNCE segundos, um job da fila (fila_jobs.py) gera o que ainda não tem
+# saída. No clique, vale a mesma regra das saídas guardadas na sessão: a
+# tarefa só é aproveitada se as variáveis que ela usa não mudaram (exemplos
+# e exercícios só usam {tema}; o resumo também usa {nivel} e {objetivo}).
+# O que ainda está no ar é adotado pelo job da geração; o resto é descartado.
+# A antecipação só dispara com folga no orçamento de requisições e com
+# worker livre, e conta o que foi aproveitado (quando a saída chega a quem a
+# usa) e os tokens desperdiçados, inclusive os de jobs cancelados ou
+# abandonados antes de alguém colher a saída.
+# ------------------------------------------------------------
+import os
+import threading
+import time
+
+import streamlit as st
+
+from rastreamento import nome_tarefa
+from roteamento import modelo_da_tarefa
+from sessao import variaveis_da_tarefa
+
+# Segundos com as entradas paradas até a antecipação disparar
+DEBOUNCE = float(os.environ.get("ANTECIPACAO_DEBOUNCE", "2"))
+
+# Fração do orçamento RPM/TPM de cada modelo que precisa estar livre para antecipar
+FOLGA_MINIMA = 0.5
+
+# Quantas vezes o disparo é adiado (sem folga ou com outra antecipação no ar) antes de desistir
+MAX_ADIAMENTOS = 5
+
+
+class EstatisticasAntecipacao:
+    """Contadores do processo: tarefas antecipadas aproveitadas ou descartadas e os tokens delas."""
+
+    def __init__(self):
+        self.aproveitadas = 0
+        self.descartadas = 0
+        self.tokens_aproveitados = 0
+        self.tokens_desperdicados = 0
+        self._lock = threading.Lock()
+
+    def aproveitada(self, tokens=0):
+        with self._lock:
+            self.aproveitadas += 1
+            self.tokens_aproveitados += tokens
+
+    def descartada(self, tokens=0):
+        with self._lock:
+            self.descartadas += 1
+            self.tokens_desperdicados += tokens
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.aproveitadas + self.descartadas
+            return {
+                "aproveitadas": self.aproveitadas,
+                "descartadas": self.descartadas,
+                "taxa_aproveitamento": self.aproveitadas / total if total else 0.0,
+                "tokens_aproveitados": self.tokens_aproveitados,
+                "tokens_desperdicados": self.tokens_desperdicados,
+            }
+
+
+_estatisticas = EstatisticasAntecipacao()
+
+
+def obter_estatisticas():
+    """Estatísticas únicas do processo (somam todas as sessões)."""
+    return _estatisticas
+
+
+def tokens_da_tarefa(rastro, nome):
+    """Tokens de entrada + saída das chamadas ao LLM da tarefa no rastro."""
+    return sum(s.tokens_entrada + s.tokens_saida for s in list(rastro.spans) if s.tipo == "llm" and s.nome == nome)
+
+
+# Destino de cada tarefa de um job antecipado (job.extras["destinos"]): a sessão
+# colhe, a geração adota ou o fim do job a dá por desperdiçada. Só o primeiro vale,
+# para a mesma tarefa não ser contada duas vezes
+_destinos_lock = threading.Lock()
+
+
+def _reservar(job, nome, destino):
+    """Marca o destino da tarefa antecipada; False se ela já tinha um."""
+    with _destinos_lock:
+        destinos = job.extras.setdefault("destinos", {})
+        if nome in destinos:
+            return False
+        destinos[nome] = destino
+        return True
+
+
+def _antecipar(job, dados):
+    # Trabalho do job antecipado. No fim, o que gastou tokens e não tem destino conta
+    # como desperdício: tarefa que falhou ou não terminou, e, com o job cancelado ou já
+    # entregue a uma geração (ninguém mais colhe), também o que ficou pronto
+    from fila_jobs import rodar_tarefas
+
+    def ao_adotar(nome, saida):
+        # Chamado pelo fila_jobs.adotar quando a geração recebe (ou não) a tarefa adotada
+        tokens = tokens_da_tarefa(job.rastro, nome) if job.rastro is not None else 0
+        if saida is not None:
+            obter_estatisticas().aproveitada(tokens)
+        else:
+            obter_estatisticas().descartada(tokens)
+
+    job.extras["ao_adotar"] = ao_adotar
+    try:
+        rodar_tarefas(
+            job, dados["agentes"], dados["tarefas"], dados["inputs"],
+            prontas=dados["prontas"], transmitir=False, devolver_erros=True,
+        )
+    finally:
+        entregues = {nome_tarefa(t) for t, s in job.concluidas[:] if not isinstance(s, Exception)}
+        sem_colheita = job.cancelado or job.extras.get("sem_colheita")
+        for nome in dados["entradas"]:
+            if nome in entregues and not sem_colheita:
+                continue
+            tokens = tokens_da_tarefa(job.rastro, nome) if job.rastro is not None else 0
+            if tokens and _reservar(job, nome, "desperdicada"):
+                obter_estatisticas().descartada(tokens)
+
+
+def ha_folga(modelos):
+    """Se dá para antecipar agora: ninguém esperando na fila, worker sobrando e orçamento livre."""
+    from chaves import obter_pool
+    from fila_jobs import obter_fila
+
+    fila = obter_fila().estatisticas()
+    if fila["esperando"] or fila["rodando"] >= fila["workers"] - 1:
+        return False
+    return all(obter_pool().folga(modelo) >= FOLGA_MINIMA for modelo in modelos)
+
+
+def _disparar(estado, dados, adiamentos=0):
+    # Roda na thread do Timer (sem st.*): só submete se o agendamento ainda é o atual.
+    # O estado é o mesmo dict que a página lê e muda no rerun: tudo sob o lock dele
+    with estado["lock"]:
+        agendado = estado.get("agendado")
+        if agendado is None or agendado["dados"] is not dados:
+            return
+        from fila_jobs import FilaCheia, obter_fila
+
+        anterior = obter_fila().obter(estado["job"]["id"]) if estado.get("job") else None
+        if (anterior is not None and not anterior.terminado) or not ha_folga(dados["modelos"]):
+            if adiamentos < MAX_ADIAMENTOS:
+                timer = threading.Timer(DEBOUNCE, _disparar, args=(estado, dados, adiamentos + 1))
+                timer.daemon = True
+                agendado["timer"] = timer
+                timer.start()
+            else:
+                estado["agendado"] = None
+            return
+
+        estado["agendado"] = None
+        try:
+            job = obter_fila().submeter(f"{dados['app']}_antecipacao", lambda job: _antecipar(job, dados))
+        except FilaCheia:
+            return
+        estado["job"] = {"id": job.id, "inputs": dados["inputs"], "entradas": dados["entradas"], "entregues": 0}
+
+
+class Antecipacao:
+    """
+    Antecipação das tarefas de uma página na sessão.
+    - resultados: ResultadosSessao da página (entradas atuais e saídas guardadas)
+    Fica em st.session_state o job antecipado no ar e as saídas que ele já
+    entregou ({nome: registro}, como no ResultadosSessao, mais os tokens gastos).
+    O timer do disparo muda o mesmo estado em outra thread: os métodos públicos
+    e o _disparar seguram o lock guardado junto com ele.
+    """
+
+    def __init__(self, resultados):
+        self.resultados = resultados
+        self._estado = st.session_state.setdefault(
+            f"antecipacao_{resultados.app}",
+            {"job": None, "prontas": {}, "agendado": None, "lock": threading.RLock()},
+        )
+        self._lock = self._estado["lock"]
+        with self._lock:
+            self._colher()
+            # Entradas mudaram: o que foi antecipado para as antigas não serve mais
+            for nome, registro in list(self._estado["prontas"].items()):
+                if not self._combina(registro["entradas"]):
+                    self._descartar(nome)
+
+    def _combina(self, entradas):
+        return all(self.resultados.inputs.get(var) == valor for var, valor in entradas.items())
+
+    def _descartar(self, nome):
+        registro = self._estado["prontas"].pop(nome, None)
+        if registro is not None:
+            obter_estatisticas().descartada(registro["tokens"])
+
+    def _job(self):
+        info = self._estado["job"]
+        if info is None:
+            return None, None
+        from fila_jobs import obter_fila
+
+        job = obter_fila().obter(info["id"])
+        if job is None:
+            self._estado["job"] = None
+        return info, job
+
+    def _colher(self):
+        # Saídas novas do job antecipado vão para "prontas"; job terminado sai do estado
+        info, job = self._job()
+        if job is None:
+            return
+        job.visto_em = time.time()
+        concluidas = job.concluidas[:]
+        for tarefa, saida in concluidas[info["entregues"]:]:
+            nome = nome_tarefa(tarefa)
+            if isinstance(saida, Exception) or not _reservar(job, nome, "colhida"):
+                continue
+            registro = self.resultados.registro(tarefa, saida.raw, modelo_da_tarefa(job.rastro, tarefa), info["inputs"])
+            registro["tokens"] = tokens_da_tarefa(job.rastro, nome)
+            self._descartar(nome)
+            self._estado["prontas"][nome] = registro
+        info["entregues"] = len(concluidas)
+        if job.terminado:
+            self._estado["job"] = None
+
+    def agendar(self, nomes, montar):
+        """
+        Agenda a antecipação do que falta para as entradas atuais (a cada rerun sem clique).
+        - nomes: tarefas que a tela mostra
+        - montar: função sem argumentos que devolve (agentes, tarefas) prontos para rodar
+          (LLM, roteamento e compactação como na geração normal)
+        Um novo rerun com outras entradas troca o agendamento (debounce).
+        """
+        with self._lock:
+            self._agendar(nomes, montar)
+
+    def _agendar(self, nomes, montar):
+        info, job = self._job()
+        no_ar = set()
+        if job is not None:
+            entregues = {nome_tarefa(t) for t, _ in job.concluidas[:]}
+            no_ar = {n for n, entradas in info["entradas"].items() if n not in entregues and self._combina(entradas)}
+        faltam = [
+            n for n in nomes
+            if self.resultados.obter(n) is None and n not in self._estado["prontas"] and n not in no_ar
+        ]
+        agendado = self._estado["agendado"]
+        chave = (dict(self.resultados.inputs), faltam)
+        if agendado is not None and agendado["chave"] == chave:
+            return
+        if agendado is not None:
+            agendado["timer"].cancel()
+            self._estado["agendado"] = None
+        if not faltam or not self.resultados.inputs.get("tema"):
+            return
+
+        agentes, tarefas = montar()
+        a_gerar = list(faltam)
+        tarefas, prontas = self.resultados.preparar(tarefas, a_gerar)
+        rodar = [t for t in tarefas if id(t) not in prontas]
+        dados = {
+            "app": self.resultados.app,
+            "agentes": agentes,
+            "tarefas": tarefas,
+            "inputs": dict(self.resultados.inputs),
+            "prontas": prontas,
+            "modelos": {t.agent.llm.model for t in rodar if t.agent is not None},
+            "entradas": {
+                nome_tarefa(t): {v: self.resultados.inputs.get(v) for v in variaveis_da_tarefa(t)} for t in rodar
+            },
+        }
+        timer = threading.Timer(DEBOUNCE, _disparar, args=(self._estado, dados))
+        timer.daemon = True
+        self._estado["agendado"] = {"chave": chave, "dados": dados, "timer": timer}
+        timer.start()
+
+    def aproveitar(self, a_gerar):
+        """
+        No clique: passa para a sessão o que foi antecipado para as entradas atuais.
+        - a_gerar: o que a_gerar() pediu, na ordem das abas; a lista é reduzida no lugar
+        Devolve (job, nomes): o job antecipado ainda no ar e as tarefas que a geração
+        deve adotar dele (fila_jobs.adotar), ou (None, []).
+        """
+        with self._lock:
+            return self._aproveitar(a_gerar)
+
+    def _aproveitar(self, a_gerar):
+        estatisticas = obter_estatisticas()
+        self._colher()
+        if self._estado["agendado"] is not None:
+            self._estado["agendado"]["timer"].cancel()
+            self._estado["agendado"] = None
+        # Na ordem das abas, a dependência (exercícios) entra antes de quem a usa (gabarito)
+        for nome in list(a_gerar):
+            registro = self._estado["prontas"].get(nome)
+            if registro is not None and self.resultados.vale(registro):
+                del self._estado["prontas"][nome]
+                self.resultados.incluir(nome, registro)
+                a_gerar.remove(nome)
+                estatisticas.aproveitada(registro["tokens"])
+                st.session_state[f"entradas_{self.resultados.app}"] = self.resultados.inputs
+
+        info, job = self._job()
+        if job is None or not a_gerar:
+            return None, []
+        entregues = {nome_tarefa(t) for t, _ in job.concluidas[:]}
+        adotadas = [
+            n for n in a_gerar
+            if n in info["entradas"] and n not in entregues and self._combina(info["entradas"][n])
+            and _reservar(job, n, "adotada")
+        ]
+        if not adotadas:
+            return None, []
+        # A geração passa a acompanhar o job; a sessão não o colhe mais (o que ele
+        # entregar fora das adotadas é desperdício). A adotada só conta como
+        # aproveitada, com os tokens, quando a saída chega à geração (fila_jobs.adotar)
+        job.extras["sem_colheita"] = True
+        self._estado["job"] = None
+        return job, adotadas
+
+
+def mostrar_estatisticas():
+    """Legenda com a taxa de aproveitamento da antecipação e os tokens desperdiçados."""
+    stats = obter_estatisticas().estatisticas()
+    st.caption(
+        f"🔮 Antecipação: {stats['aproveitadas']} tarefas aproveitadas, {stats['descartadas']} descartadas "
+        f"({stats['taxa_aproveitamento']:.0%} de aproveitamento) · "
+        f"{stats['tokens_desperdicados']} tokens desperdiçados"
+    )
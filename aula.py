@@ -2,13 +2,18 @@
 #TAREFA 1 = AGENTE 1
 #AGENTE 2 = AGENTE(RESULTADO 1)
 
-import os
 import streamlit as st
-from crewai import Agent, Task, Crew, Process, LLM #LLM é a sigla para "Large Language Model" (Grande Modelo de Linguagem)  
-                                                   #um tipo de inteligência artificial treinado em grandes volumes de dados de texto
-                                                   #para compreender
-                                                   #gerar e manipular texto de forma humana
-                                                   #quantos mais parametros, mais "raciocinio" a IA tem
+from cache_respostas import obter_cache
+from chaves import mostrar_chaves, obter_pool
+from coalescencia import obter_coalescedor
+from rastreamento import comparar_modos, mostrar_comparacao, mostrar_desempenho
+from prompts import compactar_prompts, mostrar_prompts
+from recursos import aquecer, obter_llm
+from orcamento import aplicar_orcamentos
+from roteamento import SLO_FILA, TEMPO_LIMITE, reservas_de, rotear
+from sessao import ResultadosSessao
+from historico import mostrar_historico
+from cache_semantico import LIMIAR_PADRAO
 
 #Agentes para estudo
 
@@ -22,25 +27,70 @@ objetivo = st.text_area("Objetivo (opcional)", placeholder="Ex.: entender concei
 
 # NOVO: toggle para gabarito
 mostrar_gabarito = st.toggle("Gerar e mostrar gabarito (respostas + justificativas)", value=True)
+# Exercícios e respostas numa só chamada, separados aqui (o gabarito não reenvia os exercícios)
+fundir = mostrar_gabarito and st.toggle("Gerar exercícios e gabarito numa só chamada", value=False)
+# Resumo, exemplos e exercícios não dependem um do outro: rodam juntos
+paralelo = st.toggle("Executar tarefas independentes em paralelo", value=True)
+# Ligado: ignora respostas guardadas e pede tudo de novo à API
+refazer = st.toggle("Ignorar cache e gerar de novo", value=False)
+# Mostra o texto de cada aba enquanto o modelo escreve
+transmitir = st.toggle("Mostrar o texto enquanto é gerado", value=True)
+# Tira dos goals dos agentes o que as tarefas já pedem (menos tokens de entrada por chamada)
+compactar = st.toggle("Compactar prompts (menos tokens de entrada)", value=True)
+# Modelo pequeno para tarefas formulaicas, grande para as que exigem raciocínio
+rotear_modelos = st.toggle("Escolher o modelo de cada tarefa (rápido/forte)", value=True)
+# Serve o material de um pedido parecido ("Algoritmos" ≈ "algoritimos") sem chamar o modelo
+reaproveitar = st.toggle("Reaproveitar material de pedidos parecidos (cache semântico)", value=False)
+if reaproveitar:
+    limiar = st.slider("Semelhança mínima para reaproveitar", min_value=0.5, max_value=1.0,
+                       value=LIMIAR_PADRAO, step=0.01)
 
 
 executar= st.button("Gerar material")
-api_key = "" #se pega no groq 
-
-
-
-if executar:
+api_key = obter_pool().principal  # GROQ_API_KEY (e, para mais vazão, GROQ_API_KEYS: ver chaves.py)
+
+# Espaços sobrando não mudam o pedido ("Algoritmos " e "Algoritmos" viram o mesmo prompt)
+tema, nivel, objetivo = (" ".join(campo.split()) for campo in (tema, nivel, objetivo))
+inputs = {
+    "tema": tema,
+    "nivel": nivel or "não informado",
+    "objetivo": objetivo or "não informado",
+}
+# Saídas guardadas na sessão: o que já foi gerado para estas entradas não roda de novo
+resultados = ResultadosSessao("aula", inputs)
+titulos = {"resumo": "Resumo", "exemplos": "Exemplos", "exercicios": "Exercícios", "gabarito": "Gabarito"}
+if not mostrar_gabarito:
+    del titulos["gabarito"]
+# Gerações anteriores (qualquer sessão) na barra lateral, mostradas sem chamar a API
+mostrar_historico(resultados.app, titulos)
+a_gerar = resultados.a_gerar(list(titulos), executar, refazer)
+if reaproveitar and not refazer:
+    a_gerar = resultados.reaproveitar_parecido(list(titulos), a_gerar, limiar)
+
+
+if a_gerar:
     if not api_key or not tema:
         st.error("Por favor, informe a API key e o tema de estudo.")
         st.stop()
 
-    llm = LLM(
+    # Imports pesados só quando a geração é pedida (a tela abre sem esperar por eles)
+    from crewai import Agent, Task                     #LLM é a sigla para "Large Language Model" (Grande Modelo de Linguagem)  
+                                                       #um tipo de inteligência artificial treinado em grandes volumes de dados de texto
+                                                       #para compreender
+                                                       #gerar e manipular texto de forma humana
+                                                       #quantos mais parametros, mais "raciocinio" a IA tem
+
+    llm = obter_llm(
         model = "groq/llama-3.3-70b-versatile",
         api_key=api_key,
-        temperature=0.3 #temperature define o nivel de criatividade.
+        usar_cache=not refazer and not resultados.pular_cache, # "gerar só esta aba de novo" e "gerar do zero" também pulam o cache
+        temperature=0.3, #temperature define o nivel de criatividade.
         # <= 0.3 mais deterministico,
         # entre 0.4 e 0.7 equilibrado para explicação,
         # maior que 0.7 mais criativo e menos previsivel
+        reservas=reservas_de("groq/llama-3.3-70b-versatile"), # se o 70B estourar o limite, vai para o 8B
+        slo_fila=SLO_FILA,
+        timeout=TEMPO_LIMITE,
     )
     agente_resumo = Agent(
         role = "Redator de resumo didático.",
@@ -60,12 +110,17 @@ if executar:
         backstory = "Você mostra o conceito em acçao com exemplos breves e concretos",
         llm=llm, verbose = False
     )
+    # Só o gabarito com os exercícios já guardados (ex.: "gerar só esta aba de novo")
+    # não tem como sair na mesma chamada: vai pelo caminho de duas chamadas
+    fundido = fundir and resultados.junto_com(a_gerar, "gabarito", "exercicios")
     agente_exercicios = Agent(
         role = "Criador de exemplos práticos.",
         goal =(
             "Criar 4 EXERCÍCIOS SIMPLES sobre {tema}."
             "Variar formato (múltipla escolha, V/F, completar, resolução curta)."
-            "Enunciados claros. NÃO incluir respostas"
+            # No modo fundido a mesma chamada escreve o gabarito, depois dos exercícios
+            + ("Enunciados claros; respostas só no gabarito, depois dos enunciados." if fundido
+               else "Enunciados claros. NÃO incluir respostas")
         ),
         backstory = "Você cria atividades rápidas que fixam os conceitos essenciais",
         llm=llm, verbose = False
@@ -89,6 +144,7 @@ if executar:
             "Inclua: definição (3-4 frases), por que importa (2-3), onde se aplica (2,3) e 4,6 ideias chave,"
             "com marcadores. Formate em Markdown com título, parágrafos curtos e com 4-6 marcadores"
         ),
+        name="resumo",
         agent=agente_resumo,
         expected_output="Resumo em Markdown com título, parágrafos curtos e 4-6 marcadores (bullets)."
     )
@@ -98,16 +154,19 @@ if executar:
             "Padrão (até 5 linhas cada): Título, cenário, dados/ entrada, como aplicar (1-2)frases, resultados"
             
         ),
+        name="exemplos",
         agent=agente_exemplos,
         expected_output="Lista numerada (1-4) em Markdown com exemplos curtos e completos"
     )
+    pedido_exercicios = "Crie 4 exercícios simples sobre o {tema} em PT-BR."
     t_exercicios = Task(
         description=(
-            "EXERCÍCIOS: Crie 4 exercícios simples sobre o {tema} em PT-BR."
+            f"EXERCÍCIOS: {pedido_exercicios}"
             "Varie formatos e não inclua respostas."
             "Entregue lista numerada (1-4) em Markdown"
             
         ),
+        name="exercicios",
         agent=agente_exercicios,
         expected_output="Lista numerada (1-4) em Markdown com exercícios simples, sem respostas"
     )
@@ -116,62 +175,77 @@ if executar:
         t_gabarito = Task(
             description=(
                 "GABARITO\n"
-                "Com base nos EXERCÍCIOS fornecidos no contexto, produza as respostas corretas dos itens 1–3. "
+                "Com base nos EXERCÍCIOS fornecidos no contexto, produza as respostas corretas dos itens 1–4. "
                 "Para cada item, dê:\n"
                 "- **Resposta:** (letra/valor/solução) \n"
                 "- **Comentário:** justificativa breve e direta (1–2 frases), citando o conceito-chave.\n"
-                "Formato: lista numerada (1 a 3) em Markdown."
+                "Formato: lista numerada (1 a 4) em Markdown."
             ),
+            name="gabarito",
             agent=agente_gabarito,
-            expected_output="Lista numerada (1–3) com resposta e comentário por exercício.",
+            expected_output="Lista numerada (1–4) com resposta e comentário por exercício.",
             context=[t_exercicios]
         )
 
     #definindo equipe
     agents = [agente_resumo, agente_exemplos, agente_exercicios]
     tasks = [t_resumo, t_exemplos, t_exercicios]
-    if mostrar_gabarito:
+    if fundido:
+        from equipes import fundir_gabarito
+
+        tasks[2:] = fundir_gabarito(t_exercicios, t_gabarito, f"{pedido_exercicios} Varie formatos.", 4)
+    elif mostrar_gabarito:
         agents.append(agente_gabarito)
         tasks.append(t_gabarito)
-
-    crew = Crew(
-        agents=agents,
-        tasks=tasks,
-        process=Process.sequential,
+    if rotear_modelos:
+        rotear(tasks, llm)
+    # max_tokens de cada tarefa tirado do tamanho que ela pede (orcamento.py)
+    aplicar_orcamentos(tasks)
+
+    # Só rodam as tarefas sem saída guardada (e quem depende delas); ex.: ao ligar
+    # o gabarito, ele roda sozinho com os exercícios que já estão na sessão
+    tasks, prontas = resultados.preparar(tasks, a_gerar)
+    rodar = [t for t in tasks if id(t) not in prontas]
+    # Mede os prompts finais e, se ligado, compacta antes da geração
+    relatorio_prompts = compactar_prompts(agents, rodar, inputs, aplicar=compactar)
+
+    # A geração vai para a fila de jobs do processo (fila_jobs.py); esta página só
+    # acompanha. Gabarito começa assim que os exercícios terminam (context=[t_exercicios])
+    resultados.submeter(
+        agents, tasks, inputs, a_gerar,
+        extras={"prompts": relatorio_prompts, "gabarito": "fundido" if fundido else "separado"},
+        max_paralelo=None if paralelo else 1,
+        transmitir=transmitir,
+        prontas=prontas,
     )
 
-    crew.kickoff(inputs={
-        "tema": tema,
-        "nivel": nivel or "não informado",
-        "objetivo": objetivo or "não informado",
-    })
-
-    # ---------------------------
-    # Exibição
-    # ---------------------------
-    resumo_out = getattr(t_resumo, "output", None) or getattr(t_resumo, "result", "") or ""
-    exemplos_out = getattr(t_exemplos, "output", None) or getattr(t_exemplos, "result", "") or ""
-    exercicios_out = getattr(t_exercicios, "output", None) or getattr(t_exercicios, "result", "") or ""
-    gabarito_out = ""
-    if mostrar_gabarito:
-        gabarito_out = getattr(t_gabarito, "output", None) or getattr(t_gabarito, "result", "") or ""
-
-    # Abas condicionais
-    if mostrar_gabarito:
-        aba_resumo, aba_exemplos, aba_exercicios, aba_gabarito = st.tabs(
-            ["Resumo", "Exemplos", "Exercícios", "Gabarito"]
-        )
-    else:
-        aba_resumo, aba_exemplos, aba_exercicios = st.tabs(
-            ["Resumo", "Exemplos", "Exercícios"]
-        )
+# Abas do job desta sessão (na fila, gerando ou recém-terminado) ou, sem job, as guardadas
+job = resultados.acompanhar(titulos, transmitir)
+if job is None:
+    if any(resultados.ultima(nome) for nome in titulos):
+        resultados.abas(titulos)
+elif job.rastro is not None:
+    if job.erro is not None:
+        st.error(f"🚫 A geração falhou: {job.erro}")
+    # Material completo e novo entra no índice semântico (outras sessões podem reaproveitar)
+    resultados.indexar(titulos)
+    resultados.arquivar(titulos, job)
+    mostrar_desempenho(job.rastro)
+    mostrar_prompts(job.extras["prompts"])
+    if "gabarito" in titulos:
+        # Tempo e tokens de exercícios + gabarito numa chamada ou em duas (média do processo)
+        comparar_modos("gabarito", job.extras.get("gabarito", "separado"), job.rastro, ("exercicios", "gabarito"))
+        mostrar_comparacao("gabarito", {
+            "fundido": "🧮 Exercícios + gabarito numa chamada", "separado": "em duas chamadas",
+        })
+
+    stats = obter_cache().estatisticas()
+    voos = obter_coalescedor().estatisticas()
+    st.caption(
+        f"💾 Cache: {stats['acertos']} acertos, {stats['falhas']} falhas ({stats['taxa_acerto']:.0%} de acerto)"
+        f" · 🔗 {voos['deduplicadas']} chamadas idênticas deduplicadas"
+    )
+    mostrar_chaves()
 
-    with aba_resumo:
-        st.markdown(resumo_out)
-    with aba_exemplos:
-        st.markdown(exemplos_out)
-    with aba_exercicios:
-        st.markdown(exercicios_out)
-    if mostrar_gabarito:
-        with aba_gabarito:
-            st.markdown(gabarito_out)
\ No newline at end of file
+# Com a tela já desenhada, importa crewai/litellm uma vez por processo
+aquecer()
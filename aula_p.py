@@ -1,6 +1,17 @@
-import os
 import streamlit as st
-from crewai import Agent, Task, Crew, Process, LLM
+from cache_respostas import obter_cache
+from chaves import mostrar_chaves, obter_pool
+from coalescencia import obter_coalescedor
+from rastreamento import comparar_modos, mostrar_comparacao, mostrar_desempenho
+from prompts import compactar_prompts, mostrar_prompts
+from recursos import aquecer, obter_llm
+from orcamento import aplicar_orcamentos
+from roteamento import SLO_FILA, TEMPO_LIMITE, reservas_de, rotear
+from sessao import ResultadosSessao
+from historico import mostrar_historico
+from cache_semantico import LIMIAR_PADRAO
+from antecipacao import Antecipacao, mostrar_estatisticas
+from variantes import entradas_niveis, grupo_comparacao, ler_niveis, mostrar_economia, titulos_niveis
 
 # ---------------------------
 # UI
@@ -10,173 +21,193 @@ st.write("Informe o tema e gere material didático automaticamente:")
 
 tema = st.text_input("Tema de estudo", placeholder="Ex.: Algoritmos de Busca, Fotossíntese, Juros Compostos")
 nivel = st.text_input("Público/nível (opcional)", placeholder="Ex.: iniciante, ensino médio, graduação, profissional")
+# Mesmo tema para vários públicos: o núcleo sai uma vez e cada nível é uma adaptação curta dele
+varios_niveis = st.toggle("Vários níveis a partir de um núcleo comum", value=False)
+if varios_niveis:
+    niveis = ler_niveis(st.text_input("Níveis (separados por vírgula)", placeholder="Ex.: iniciante, ensino médio, graduação"))
 objetivo = st.text_area("Objetivo (opcional)", placeholder="Ex.: entender conceitos básicos e aplicar em exercícios simples")
 
 # NOVO: toggle para gabarito
 mostrar_gabarito = st.toggle("Gerar e mostrar gabarito (respostas + justificativas)", value=True)
+# Exercícios e respostas numa só chamada, separados aqui (o gabarito não reenvia os exercícios)
+fundir = mostrar_gabarito and st.toggle("Gerar exercícios e gabarito numa só chamada", value=False)
+# Resumo, exemplos e exercícios não dependem um do outro: rodam juntos
+paralelo = st.toggle("Executar tarefas independentes em paralelo", value=True)
+
+# Ligado: ignora respostas guardadas e pede tudo de novo à API
+refazer = st.toggle("Ignorar cache e gerar de novo", value=False)
+# Mostra o texto de cada aba enquanto o modelo escreve
+transmitir = st.toggle("Mostrar o texto enquanto é gerado", value=True)
+# Tira dos goals dos agentes o que as tarefas já pedem (menos tokens de entrada por chamada)
+compactar = st.toggle("Compactar prompts (menos tokens de entrada)", value=True)
+# Modelo pequeno para tarefas formulaicas, grande para as que exigem raciocínio
+rotear_modelos = st.toggle("Escolher o modelo de cada tarefa (rápido/forte)", value=True)
+# Serve o material de um pedido parecido ("Algoritmos" ≈ "algoritimos") sem chamar o modelo
+reaproveitar = st.toggle("Reaproveitar material de pedidos parecidos (cache semântico)", value=False)
+if reaproveitar:
+    limiar = st.slider("Semelhança mínima para reaproveitar", min_value=0.5, max_value=1.0,
+                       value=LIMIAR_PADRAO, step=0.01)
+# Enquanto o formulário é preenchido, gera em segundo plano o que as entradas já permitem
+antecipar = st.toggle("Antecipar a geração enquanto o formulário é preenchido", value=False)
 
 executar = st.button("Gerar material")
-api_key = ''
-
-if executar:
-    if not api_key or not tema:
-        st.error("Por favor, informe a API key e o tema de estudo.")
-        st.stop()
+api_key = obter_pool().principal  # GROQ_API_KEY (e, para mais vazão, GROQ_API_KEYS: ver chaves.py)
+
+# Espaços sobrando não mudam o pedido ("Algoritmos " e "Algoritmos" viram o mesmo prompt)
+tema, nivel, objetivo = (" ".join(campo.split()) for campo in (tema, nivel, objetivo))
+inputs = {
+    "tema": tema,
+    "nivel": nivel or "não informado",
+    "objetivo": objetivo or "não informado",
+}
+grupos = None
+if varios_niveis:
+    # {nivel_1}, {nivel_2}... no lugar de {nivel}; um grupo de abas por nível
+    inputs = entradas_niveis(inputs, niveis)
+    titulos, grupos = titulos_niveis(niveis, mostrar_gabarito)
+else:
+    titulos = {"resumo": "Resumo", "exemplos": "Exemplos", "exercicios": "Exercícios", "gabarito": "Gabarito"}
+    if not mostrar_gabarito:
+        del titulos["gabarito"]
+# Saídas guardadas na sessão: o que já foi gerado para estas entradas não roda de novo
+resultados = ResultadosSessao("aula_p_niveis" if varios_niveis else "aula_p", inputs)
+# Gerações anteriores (qualquer sessão) na barra lateral, mostradas sem chamar a API
+mostrar_historico(resultados.app, titulos)
+a_gerar = resultados.a_gerar(list(titulos), executar, refazer)
+if reaproveitar and not refazer and not varios_niveis:
+    a_gerar = resultados.reaproveitar_parecido(list(titulos), a_gerar, limiar)
+# O que a antecipação já gerou para estas entradas vai direto para as abas; o que
+# ainda está no ar é adotado pela geração (origem/adotadas)
+origem, adotadas = None, []
+antecipar = antecipar and not varios_niveis
+if antecipar and not refazer:
+    antecipacao = Antecipacao(resultados)
+    if a_gerar and not resultados.pular_cache:
+        origem, adotadas = antecipacao.aproveitar(a_gerar)
+
+
+def montar_tarefas(usar_cache=True, fundido=False):
+    """
+    Agentes e tarefas com o LLM e as opções da tela (geração e antecipação).
+    - fundido: exercícios e gabarito numa só chamada
+    """
+    # Imports pesados só quando a geração é pedida (a tela abre sem esperar por eles)
+    from equipes import montar_aula_niveis, montar_aula_p
+    from variantes import rotear_variantes
 
     # ---------------------------
     # LLM (Groq / Llama 3.3 70B)
     # ---------------------------
-    llm = LLM(
+    llm = obter_llm(
         model="groq/llama-3.3-70b-versatile",
         api_key=api_key,
-        temperature=0.3
+        usar_cache=usar_cache,
+        temperature=0.3,
+        # Se o 70B estourar o limite ou a fila passar do SLO, a chamada vai para o 8B
+        reservas=reservas_de("groq/llama-3.3-70b-versatile"),
+        slo_fila=SLO_FILA,
+        timeout=TEMPO_LIMITE,
     )
 
     # ---------------------------
-    # Agentes
+    # Agentes e tarefas (definidos em equipes.py, compartilhados com o lote_aula.py)
     # ---------------------------
-    agente_resumo = Agent(
-        role="Redator(a) de Resumo Didático",
-        goal=(
-            "Escrever um RESUMO claro e didático sobre {tema} para o público {nivel}, "
-            "alinhado ao objetivo {objetivo}. "
-            "A linguagem deve ser direta, com contexto prático e sem jargões desnecessários."
-        ),
-        backstory="Você transforma temas técnicos/Acadêmicos em explicações curtas e precisas.",
-        llm=llm, verbose=False
-    )
-
-    agente_exemplos = Agent(
-        role="Criador(a) de Exemplos Contextualizados",
-        goal=(
-            "Gerar 4 EXEMPLOS CURTOS sobre {tema}, cada um com contexto realista. "
-            "Cada exemplo com título (em negrito), cenário, dados (se houver), aplicação e resultado."
-        ),
-        backstory="Você mostra o conceito em ação com exemplos breves e concretos.",
-        llm=llm, verbose=False
-    )
-
-    agente_exercicios = Agent(
-        role="Autor(a) de Exercícios Práticos",
-        goal=(
-            "Criar 3 EXERCÍCIOS SIMPLES sobre {tema}. "
-            "Variar formato (múltipla escolha, V/F, completar, resolução curta). "
-            "Enunciados claros. NÃO incluir respostas."
-        ),
-        backstory="Você cria atividades rápidas que fixam os conceitos essenciais.",
-        llm=llm, verbose=False
-    )
+    if varios_niveis:
+        agents, tasks = montar_aula_niveis(llm, len(niveis), mostrar_gabarito, fundido)
+        if rotear_modelos:
+            rotear_variantes(tasks, llm)
+    else:
+        agents, tasks = montar_aula_p(llm, mostrar_gabarito, fundido)
+        if rotear_modelos:
+            rotear(tasks, llm)
+    # max_tokens de cada tarefa tirado do tamanho que ela pede (orcamento.py)
+    aplicar_orcamentos(tasks)
+    return agents, tasks
 
-    # Opcional: agente de gabarito (só se toggle estiver ligado)
-    if mostrar_gabarito:
-        agente_gabarito = Agent(
-            role="Revisor(a) e Gabaritador(a)",
-            goal=(
-                "Ler os EXERCÍCIOS sobre {tema} e produzir o GABARITO oficial, "
-                "com respostas corretas e justificativa breve (1–2 frases) por item."
-            ),
-            backstory="Você confere consistência e explica rapidamente o porquê da resposta.",
-            llm=llm, verbose=False
-        )
 
-    # ---------------------------
-    # Tarefas
-    # ---------------------------
-    t_resumo = Task(
-        description=(
-            "RESUMO\n"
-            "Escreva em PT-BR um resumo didático sobre {tema} para o nível {nivel} e objetivo {objetivo}. "
-            "Inclua: definição (2–3 frases), por que importa (1–2), onde se aplica (1–2) e 3–5 ideias-chave em bullets. "
-            "150–220 palavras. Formate em Markdown com título."
-        ),
-        agent=agente_resumo,
-        expected_output="Resumo em Markdown com título, parágrafos curtos e 3–5 bullets."
+def montar_antecipadas():
+    agents, tasks = montar_tarefas(
+        fundido=fundir and resultados.junto_com(resultados.faltando(list(titulos)), "gabarito", "exercicios")
     )
+    compactar_prompts(agents, tasks, inputs, aplicar=compactar)
+    return agents, tasks
 
-    t_exemplos = Task(
-        description=(
-            "EXEMPLOS\n"
-            "Produza 4 exemplos curtos e contextualizados sobre {tema}. "
-            "Padrão (até 5 linhas cada): **Título**; cenário; dados/entrada; como aplicar (1–2 frases); resultado."
-        ),
-        agent=agente_exemplos,
-        expected_output="Lista numerada (1–4) em Markdown com exemplos curtos e completos."
-    )
 
-    t_exercicios = Task(
-        description=(
-            "EXERCÍCIOS\n"
-            "Crie 3 exercícios simples sobre {tema} em PT-BR. "
-            "Varie formatos e não inclua respostas. "
-            "Entregue lista numerada (1 a 3) em Markdown."
-        ),
-        agent=agente_exercicios,
-        expected_output="Lista numerada (1–3) com exercícios simples, sem respostas."
-    )
+if a_gerar:
+    if not api_key or not tema:
+        st.error("Por favor, informe a API key e o tema de estudo.")
+        st.stop()
+    if varios_niveis and len(niveis) < 2:
+        st.error("Informe pelo menos dois níveis, separados por vírgula (ex.: iniciante, graduação).")
+        st.stop()
 
-    # Tarefa de gabarito condicionada
-    if mostrar_gabarito:
-        t_gabarito = Task(
-            description=(
-                "GABARITO\n"
-                "Com base nos EXERCÍCIOS fornecidos no contexto, produza as respostas corretas dos itens 1–3. "
-                "Para cada item, dê:\n"
-                "- **Resposta:** (letra/valor/solução) \n"
-                "- **Comentário:** justificativa breve e direta (1–2 frases), citando o conceito-chave.\n"
-                "Formato: lista numerada (1 a 3) em Markdown."
-            ),
-            agent=agente_gabarito,
-            expected_output="Lista numerada (1–3) com resposta e comentário por exercício.",
-            context=[t_exercicios]
-        )
+    # Só o gabarito com os exercícios já guardados (ex.: "gerar só esta aba de novo")
+    # não tem como sair na mesma chamada: vai pelo caminho de duas chamadas
+    pares = [(f"gabarito_{i}", f"exercicios_{i}") for i in range(1, len(niveis) + 1)] if varios_niveis \
+        else [("gabarito", "exercicios")]
+    fundido = fundir and all(resultados.junto_com(a_gerar, *par) for par in pares)
+    # "Gerar só esta aba de novo" e "gerar do zero" também pulam o cache (senão volta o mesmo texto)
+    agents, tasks = montar_tarefas(usar_cache=not refazer and not resultados.pular_cache, fundido=fundido)
 
     # ---------------------------
     # Orquestração
     # ---------------------------
-    agents = [agente_resumo, agente_exemplos, agente_exercicios]
-    tasks = [t_resumo, t_exemplos, t_exercicios]
-    if mostrar_gabarito:
-        agents.append(agente_gabarito)
-        tasks.append(t_gabarito)
-
-    crew = Crew(
-        agents=agents,
-        tasks=tasks,
-        process=Process.sequential,
+    # Só rodam as tarefas sem saída guardada (e quem depende delas); ex.: ao ligar
+    # o gabarito, ele roda sozinho com os exercícios que já estão na sessão
+    tasks, prontas = resultados.preparar(tasks, a_gerar)
+    rodar = [t for t in tasks if id(t) not in prontas]
+    # Mede os prompts finais e, se ligado, compacta antes da geração
+    relatorio_prompts = compactar_prompts(agents, rodar, inputs, aplicar=compactar)
+
+    # A geração vai para a fila de jobs do processo (fila_jobs.py); esta página só
+    # acompanha. Gabarito começa assim que os exercícios terminam (context=[t_exercicios])
+    resultados.submeter(
+        agents, tasks, inputs, a_gerar,
+        extras={"prompts": relatorio_prompts, "gabarito": "fundido" if fundido else "separado"},
+        max_paralelo=None if paralelo else 1,
+        transmitir=transmitir,
+        prontas=prontas,
+        origem=origem,
+        adotadas=adotadas,
     )
-
-    crew.kickoff(inputs={
-        "tema": tema,
-        "nivel": nivel or "não informado",
-        "objetivo": objetivo or "não informado",
-    })
-
-    # ---------------------------
-    # Exibição
-    # ---------------------------
-    resumo_out = getattr(t_resumo, "output", None) or getattr(t_resumo, "result", "") or ""
-    exemplos_out = getattr(t_exemplos, "output", None) or getattr(t_exemplos, "result", "") or ""
-    exercicios_out = getattr(t_exercicios, "output", None) or getattr(t_exercicios, "result", "") or ""
-    gabarito_out = ""
-    if mostrar_gabarito:
-        gabarito_out = getattr(t_gabarito, "output", None) or getattr(t_gabarito, "result", "") or ""
-
-    # Abas condicionais
-    if mostrar_gabarito:
-        aba_resumo, aba_exemplos, aba_exercicios, aba_gabarito = st.tabs(
-            ["Resumo", "Exemplos", "Exercícios", "Gabarito"]
-        )
+elif antecipar and not refazer and api_key and tema and resultados.job_atual() is None:
+    antecipacao.agendar(list(titulos), montar_antecipadas)
+
+# Abas do job desta sessão (na fila, gerando ou recém-terminado) ou, sem job, as guardadas
+job = resultados.acompanhar(titulos, transmitir, grupos)
+if job is None:
+    if any(resultados.ultima(nome) for nome in titulos):
+        resultados.abas(titulos, grupos=grupos)
+elif job.rastro is not None:
+    if job.erro is not None:
+        st.error(f"🚫 A geração falhou: {job.erro}")
+    if not varios_niveis:
+        # Material completo e novo entra no índice semântico (outras sessões podem reaproveitar)
+        resultados.indexar(titulos)
+    resultados.arquivar(titulos, job)
+    mostrar_desempenho(job.rastro)
+    mostrar_prompts(job.extras["prompts"])
+    if varios_niveis:
+        # Esta geração contra N gerações de um nível (média das medidas neste processo)
+        mostrar_economia(job.rastro, tuple(titulos), len(niveis), mostrar_gabarito)
     else:
-        aba_resumo, aba_exemplos, aba_exercicios = st.tabs(
-            ["Resumo", "Exemplos", "Exercícios"]
-        )
-
-    with aba_resumo:
-        st.markdown(resumo_out)
-    with aba_exemplos:
-        st.markdown(exemplos_out)
-    with aba_exercicios:
-        st.markdown(exercicios_out)
-    if mostrar_gabarito:
-        with aba_gabarito:
-            st.markdown(gabarito_out)
\ No newline at end of file
+        comparar_modos(grupo_comparacao(mostrar_gabarito), "um_nivel", job.rastro, tuple(titulos))
+    if "gabarito" in titulos:
+        # Tempo e tokens de exercícios + gabarito numa chamada ou em duas (média do processo)
+        comparar_modos("gabarito", job.extras.get("gabarito", "separado"), job.rastro, ("exercicios", "gabarito"))
+        mostrar_comparacao("gabarito", {
+            "fundido": "🧮 Exercícios + gabarito numa chamada", "separado": "em duas chamadas",
+        })
+
+    stats = obter_cache().estatisticas()
+    voos = obter_coalescedor().estatisticas()
+    st.caption(
+        f"💾 Cache: {stats['acertos']} acertos, {stats['falhas']} falhas ({stats['taxa_acerto']:.0%} de acerto)"
+        f" · 🔗 {voos['deduplicadas']} chamadas idênticas deduplicadas"
+    )
+    mostrar_chaves()
+if antecipar:
+    mostrar_estatisticas()
+
+# Com a tela já desenhada, importa crewai/litellm uma vez por processo
+aquecer()
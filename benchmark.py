@@ -0,0 +1,449 @@
+# ------------------------------------------------------------
+# 📊 Benchmark offline dos quatro apps (com LLM falso)
+# ------------------------------------------------------------
+# Roda cada app de verdade (Streamlit AppTest, sem navegador), com os mesmos
+# agentes, tarefas e crews, mas trocando a API do Groq pelo StubLLM.
+# Mede latência ponta a ponta (p50/p95/p99), latência por tarefa e o
+# overhead fora do LLM, e compara com um baseline salvo.
+#
+# Uso:
+#   python benchmark.py                       # roda e compara com o baseline
+#   python benchmark.py --salvar-baseline     # roda e grava o baseline
+#   python benchmark.py --apps aula_p --repeticoes 20 --taxa-429 0.1
+#   python benchmark.py --prompts             # tokens de entrada sem/com compactação
+#   python benchmark.py --partida             # partida a frio, rerun e primeiro pedido
+#   python benchmark.py --orcamento --tokens-saida 900   # sem/com max_tokens por tarefa
+#   python benchmark.py --niveis              # 3 níveis: uma geração por nível x núcleo comum
+#   python benchmark.py --grupo               # modo grupo do D&D: chamadas por personagem
+# ------------------------------------------------------------
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Tudo local: sem mapa de custos remoto, sem telemetria, sem chave de verdade
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("CACHE_RESPOSTAS_ARQUIVO", ":memory:")
+os.environ.setdefault("HISTORICO_ARQUIVO", ":memory:")
+os.environ["RASTRO_ARQUIVO"] = os.path.join(tempfile.mkdtemp(prefix="bench_"), "rastros.jsonl")
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PASTA)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import limitador  # noqa: E402
+
+BASELINE_PADRAO = os.path.join(PASTA, "benchmark_baseline.json")
+
+# Campos preenchidos em cada app (rótulo do widget -> valor)
+APPS = {
+    "aula": {
+        "Tema de estudo": "Algoritmos de busca",
+        "Público/nível (opcional)": "graduação",
+        "Objetivo (opcional)": "entender conceitos básicos e aplicar em exercícios simples",
+    },
+    "aula_p": {
+        "Tema de estudo": "Algoritmos de busca",
+        "Público/nível (opcional)": "graduação",
+        "Objetivo (opcional)": "entender conceitos básicos e aplicar em exercícios simples",
+    },
+    "exercicio": {
+        "Tema de estudo": "loops",
+        "Nível do público (opcional)": "iniciante",
+        "Objetivo (opcional)": "entender a lógica da GML e aplicar em scripts simples",
+    },
+    "dupla_exercicio": {
+        "Nome do personagem": "Thalindra Sombrasol",
+        "Raça": "Elfo",
+        "Classe": "Mago",
+        "Tema ou estilo (opcional)": "sombrio",
+    },
+}
+
+
+def percentil(valores, p):
+    """Percentil pelo método nearest-rank (sem numpy)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def _ultimo_rastro():
+    with open(os.environ["RASTRO_ARQUIVO"], encoding="utf-8") as arquivo:
+        return json.loads(arquivo.readlines()[-1])
+
+
+def preparar(at, campos, opcoes):
+    """Preenche os campos e liga/desliga os toggles conforme as opções."""
+    for widget in list(at.text_input) + list(at.text_area):
+        if widget.label in campos:
+            widget.input(campos[widget.label])
+    for toggle in at.toggle:
+        if toggle.label == "Ignorar cache e gerar de novo":
+            toggle.set_value(True)  # sem cache: mede sempre a geração
+        elif toggle.label == "Mostrar o texto enquanto é gerado":
+            toggle.set_value(not opcoes.sem_streaming)
+        elif "paralelo" in toggle.label:
+            toggle.set_value(not opcoes.sequencial)
+        elif toggle.label.startswith("Compactar prompts"):
+            toggle.set_value(not opcoes.sem_compactar)
+
+
+def rodar_uma_vez(app, stub, opcoes):
+    """Uma geração completa do app; devolve tempos ponta a ponta, no LLM e por tarefa."""
+    at = AppTest.from_file(os.path.join(PASTA, f"{app}.py"), default_timeout=opcoes.timeout)
+    at.run()
+    preparar(at, APPS[app], opcoes)
+    at.button[0].click()
+
+    inicio = time.time()
+    at.run()
+    fim = time.time()
+    if at.exception:
+        raise RuntimeError(f"{app}: {at.exception[0].message}")
+
+    rastro = _ultimo_rastro()
+    return {
+        "total": fim - inicio,
+        "llm": stub.tempo_ocupado(inicio, fim),
+        "tarefas": {s["nome"]: s["duracao"] for s in rastro["spans"] if s["tipo"] == "tarefa"},
+    }
+
+
+def medir_app(app, stub, opcoes):
+    rodar_uma_vez(app, stub, opcoes)  # aquecimento (imports e inicialização do CrewAI)
+    chamadas_antes, erros_antes = stub.chamadas, stub.erros_429
+    execucoes = [rodar_uma_vez(app, stub, opcoes) for _ in range(opcoes.repeticoes)]
+
+    totais = [e["total"] for e in execucoes]
+    overheads = [e["total"] - e["llm"] for e in execucoes]
+    tarefas = {}
+    for e in execucoes:
+        for nome, duracao in e["tarefas"].items():
+            tarefas.setdefault(nome, []).append(duracao)
+    return {
+        "p50": percentil(totais, 50),
+        "p95": percentil(totais, 95),
+        "p99": percentil(totais, 99),
+        "overhead_p50": percentil(overheads, 50),
+        "overhead_p95": percentil(overheads, 95),
+        "tarefas": {n: {"p50": percentil(d, 50), "p95": percentil(d, 95)} for n, d in tarefas.items()},
+        "chamadas_por_execucao": (stub.chamadas - chamadas_antes) / len(execucoes),
+        "erros_429": stub.erros_429 - erros_antes,
+    }
+
+
+def medir_prompts(app, stub, opcoes):
+    """Tokens de entrada de uma geração (soma das chamadas ao LLM), sem e com compactação."""
+    tokens = {}
+    for compactar in (False, True):
+        opcoes.sem_compactar = not compactar
+        rodar_uma_vez(app, stub, opcoes)
+        spans = _ultimo_rastro()["spans"]
+        tokens[compactar] = sum(s["tokens_entrada"] for s in spans if s["tipo"] == "llm")
+    return tokens[False], tokens[True]
+
+
+def medir_orcamento(app, stub, opcoes):
+    """
+    Uma geração sem e outra com o orçamento de saída (orcamento.py): tokens de
+    saída, tempo com o LLM gerando, tempo ponta a ponta e continuações.
+    Com --tokens-saida acima do que as tarefas pedem, o LLM falso "se estende".
+    """
+    import orcamento
+
+    rodar_uma_vez(app, stub, opcoes)  # aquecimento (imports e inicialização do CrewAI)
+    medidas = {}
+    for ativo in (False, True):
+        orcamento.ATIVO = ativo
+        execucao = rodar_uma_vez(app, stub, opcoes)
+        chamadas = [s for s in _ultimo_rastro()["spans"] if s["tipo"] == "llm"]
+        medidas[ativo] = {
+            "tokens": sum(s["tokens_saida"] for s in chamadas),
+            "llm": execucao["llm"],
+            "total": execucao["total"],
+            "continuacoes": sum(s["continuacoes"] for s in chamadas),
+        }
+    return medidas[False], medidas[True]
+
+
+# Níveis do --niveis (modo vários níveis do aula_p)
+NIVEIS = ["iniciante", "ensino médio", "graduação"]
+
+
+def _gerar_aula_p(stub, opcoes, nivel=None, niveis=None):
+    """Uma geração do aula_p com um nível ou no modo vários níveis; devolve tempo, tokens e chamadas."""
+    from roteamento import FORTE
+
+    at = AppTest.from_file(os.path.join(PASTA, "aula_p.py"), default_timeout=opcoes.timeout)
+    at.run()
+    campos = dict(APPS["aula_p"])
+    if niveis:
+        next(t for t in at.toggle if t.label.startswith("Vários níveis")).set_value(True)
+        at.run()
+        campos["Níveis (separados por vírgula)"] = ", ".join(niveis)
+    else:
+        campos["Público/nível (opcional)"] = nivel
+    preparar(at, campos, opcoes)
+    at.button[0].click()
+    chamadas_antes = stub.chamadas
+    inicio = time.time()
+    at.run()
+    total = time.time() - inicio
+    if at.exception:
+        raise RuntimeError(f"aula_p: {at.exception[0].message}")
+    spans = [s for s in _ultimo_rastro()["spans"] if s["tipo"] == "llm"]
+    return {
+        "total": total,
+        "tokens": sum(s["tokens_entrada"] + s["tokens_saida"] for s in spans),
+        "forte": sum(s["tokens_entrada"] + s["tokens_saida"] for s in spans if s["modelo"] == FORTE),
+        "chamadas": stub.chamadas - chamadas_antes,
+    }
+
+
+def medir_niveis(stub, opcoes):
+    """
+    Os NIVEIS no aula_p: uma geração por nível, uma após a outra (como sem o modo),
+    contra uma geração no modo vários níveis (núcleo comum + adaptações).
+    """
+    _gerar_aula_p(stub, opcoes, nivel=NIVEIS[0])  # aquecimento (imports e inicialização do CrewAI)
+    independentes = [_gerar_aula_p(stub, opcoes, nivel=nivel) for nivel in NIVEIS]
+    separado = {campo: sum(g[campo] for g in independentes) for campo in independentes[0]}
+    return separado, _gerar_aula_p(stub, opcoes, niveis=NIVEIS)
+
+
+# Personagens do --grupo (modo grupo do dupla_exercicio) e quantos vão em cada chamada
+GRUPO = [
+    "Thalindra Sombrasol, Elfo, Mago, sombrio",
+    "Brom Martelo-Rubro, Anão, Guerreiro, cômico",
+    "Lyra Vento-Leste, Humano, Ladino, aventureiro",
+    "Korg, Meio-Orc, Bárbaro, trágico",
+    "Sefira Luz-de-Prata, Halfling, Clérigo, sereno",
+    "Zaros, Tiefling, Bruxo, sombrio",
+]
+POR_CHAMADA = (1, 3, 5)
+
+
+def _gerar_grupo(stub, opcoes, por_chamada):
+    """Uma geração do GRUPO no dupla_exercicio (job na fila); devolve tempo, tokens, chamadas e personagens prontos."""
+    at = AppTest.from_file(os.path.join(PASTA, "dupla_exercicio.py"), default_timeout=opcoes.timeout)
+    at.run()
+    next(t for t in at.toggle if t.label.startswith("Modo grupo")).set_value(True)
+    at.run()
+    preparar(at, {"Personagens (um por linha: nome, raça, classe, tema)": "\n".join(GRUPO)}, opcoes)
+    at.slider[0].set_value(por_chamada)
+    next(b for b in at.button if b.label.startswith("🎲")).click()
+    chamadas_antes = stub.chamadas
+    inicio = time.time()
+    at.run()
+    total = time.time() - inicio
+    if at.exception:
+        raise RuntimeError(f"dupla_exercicio (grupo): {at.exception[0].message}")
+    spans = [s for s in _ultimo_rastro()["spans"] if s["tipo"] == "llm"]
+    return {
+        "total": total,
+        "tokens": sum(s["tokens_entrada"] + s["tokens_saida"] for s in spans),
+        "chamadas": stub.chamadas - chamadas_antes,
+        "prontos": sum(m.value.startswith("## ") for m in at.markdown),
+    }
+
+
+def medir_grupo(stub, opcoes):
+    """O GRUPO no modo grupo com cada valor de POR_CHAMADA (1 = cada personagem nas três tarefas avulsas)."""
+    _gerar_grupo(stub, opcoes, 1)  # aquecimento (imports e inicialização do CrewAI)
+    return {por_chamada: _gerar_grupo(stub, opcoes, por_chamada) for por_chamada in POR_CHAMADA}
+
+
+def medir_partida(app, opcoes):
+    """
+    Roda num processo novo (sem crewai/litellm importados) e mede:
+    - tela: da primeira execução do script até os widgets estarem prontos
+    - rerun: uma nova execução depois de preencher os campos (como ao digitar)
+    - primeiro_pedido: o clique em "Gerar", incluindo importar o que faltar
+    """
+    import recursos
+
+    marcas = {}
+    aquecer_original = recursos.aquecer
+
+    def aquecer_medido():
+        # A tela já foi desenhada quando o app chega no aquecimento
+        marcas.setdefault("tela", time.time())
+        return aquecer_original()
+
+    recursos.aquecer = aquecer_medido
+    at = AppTest.from_file(os.path.join(PASTA, f"{app}.py"), default_timeout=opcoes.timeout)
+    inicio = time.time()
+    at.run()
+    primeira_execucao = time.time() - inicio
+    tela = marcas.get("tela", inicio + primeira_execucao) - inicio
+
+    preparar(at, APPS[app], opcoes)
+    inicio = time.time()
+    at.run()
+    rerun = time.time() - inicio
+
+    inicio = time.time()
+    from llm_stub import StubLLM  # importa o litellm, como o primeiro pedido de verdade faria
+
+    with StubLLM(opcoes.latencia, opcoes.tps, opcoes.tokens_saida).instalado():
+        at.button[0].click()
+        at.run()
+    primeiro = time.time() - inicio
+    if at.exception:
+        raise RuntimeError(f"{app}: {at.exception[0].message}")
+    return {"tela": tela, "primeira_execucao": primeira_execucao, "rerun": rerun, "primeiro_pedido": primeiro}
+
+
+def imprimir(resultados):
+    for app, r in resultados.items():
+        print(f"\n== {app} ==")
+        print(f"  ponta a ponta  p50 {r['p50']:.3f}s  p95 {r['p95']:.3f}s  p99 {r['p99']:.3f}s")
+        print(f"  fora do LLM    p50 {r['overhead_p50']:.3f}s  p95 {r['overhead_p95']:.3f}s")
+        print(f"  chamadas/exec  {r['chamadas_por_execucao']:.1f}  (429 injetados: {r['erros_429']})")
+        for nome, t in r["tarefas"].items():
+            print(f"  tarefa {nome:<11} p50 {t['p50']:.3f}s  p95 {t['p95']:.3f}s")
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista as métricas que pioraram mais que a tolerância (e mais de 50 ms) em relação ao baseline."""
+    regressoes = []
+    for app, r in resultados.items():
+        base = baseline.get("apps", {}).get(app)
+        if not base:
+            continue
+        for metrica in ("p50", "p95", "overhead_p50"):
+            if r[metrica] > base[metrica] * (1 + tolerancia) and r[metrica] - base[metrica] > 0.05:
+                regressoes.append(f"{app}.{metrica}: {base[metrica]:.3f}s -> {r[metrica]:.3f}s")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline dos apps com LLM falso.")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=sorted(APPS))
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos até o primeiro token")
+    parser.add_argument("--tps", type=float, default=300, help="tokens por segundo do LLM falso")
+    parser.add_argument("--tokens-saida", type=int, default=250)
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração de chamadas com RateLimitError")
+    parser.add_argument("--com-limites", action="store_true", help="mantém os limites RPM/TPM do Groq")
+    parser.add_argument("--sem-streaming", action="store_true")
+    parser.add_argument("--sequencial", action="store_true", help="desliga os modos paralelos")
+    parser.add_argument("--sem-compactar", action="store_true", help="desliga a compactação dos prompts")
+    parser.add_argument("--prompts", action="store_true", help="só compara os tokens de entrada sem/com compactação")
+    parser.add_argument("--orcamento", action="store_true", help="compara tokens e tempo sem/com max_tokens por tarefa")
+    parser.add_argument("--niveis", action="store_true", help="aula_p: uma geração por nível x núcleo comum")
+    parser.add_argument("--grupo", action="store_true", help="dupla_exercicio: chamadas por personagem no modo grupo")
+    parser.add_argument("--partida", action="store_true", help="mede partida a frio, rerun e primeiro pedido")
+    parser.add_argument("--partida-de", choices=sorted(APPS), help=argparse.SUPPRESS)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--baseline", default=BASELINE_PADRAO)
+    parser.add_argument("--salvar-baseline", action="store_true")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora aceita (0.2 = 20%%)")
+    opcoes = parser.parse_args()
+
+    if opcoes.partida_de:
+        # Processo filho do --partida: um app, em processo limpo
+        print(json.dumps(medir_partida(opcoes.partida_de, opcoes)))
+        return 0
+    if opcoes.partida:
+        print(f"\n{'app':<16} {'tela':>7} {'1ª exec':>8} {'rerun':>7} {'1º pedido':>10}")
+        for app in opcoes.apps:
+            comando = [sys.executable, os.path.abspath(__file__), "--partida-de", app,
+                       "--latencia", str(opcoes.latencia), "--tps", str(opcoes.tps),
+                       "--tokens-saida", str(opcoes.tokens_saida)]
+            saida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+            r = json.loads(saida.strip().splitlines()[-1])
+            print(f"{app:<16} {r['tela']:>6.2f}s {r['primeira_execucao']:>7.2f}s "
+                  f"{r['rerun']:>6.3f}s {r['primeiro_pedido']:>9.2f}s")
+        return 0
+
+    if not opcoes.com_limites:
+        # O que se mede aqui é o código, não o plano gratuito do Groq
+        limitador.LIMITES_MODELOS.clear()
+        limitador.LIMITE_PADRAO = (10**6, 10**9)
+
+    configuracao = {
+        "latencia": opcoes.latencia, "tps": opcoes.tps, "tokens_saida": opcoes.tokens_saida,
+        "taxa_429": opcoes.taxa_429, "com_limites": opcoes.com_limites,
+        "sem_streaming": opcoes.sem_streaming, "sequencial": opcoes.sequencial,
+        "sem_compactar": opcoes.sem_compactar,
+    }
+    from llm_stub import StubLLM
+
+    stub = StubLLM(opcoes.latencia, opcoes.tps, opcoes.tokens_saida, opcoes.taxa_429)
+
+    if opcoes.prompts:
+        print(f"\n{'app':<16} {'sem compactar':>14} {'compactado':>11} {'economia':>9}")
+        with stub.instalado():
+            for app in opcoes.apps:
+                antes, depois = medir_prompts(app, stub, opcoes)
+                economia = 1 - depois / antes if antes else 0.0
+                print(f"{app:<16} {antes:>14} {depois:>11} {economia:>9.0%}")
+        return 0
+    if opcoes.orcamento:
+        print(f"\n{'app':<16} {'tokens saída':>17} {'economia':>9} {'tempo no LLM':>17} "
+              f"{'ponta a ponta':>17} {'continuações':>13}")
+        with stub.instalado():
+            for app in opcoes.apps:
+                sem, com = medir_orcamento(app, stub, opcoes)
+                economia = 1 - com["tokens"] / sem["tokens"] if sem["tokens"] else 0.0
+                print(f"{app:<16} {sem['tokens']:>7} -> {com['tokens']:>6} {economia:>9.0%} "
+                      f"{sem['llm']:>6.2f}s -> {com['llm']:>5.2f}s {sem['total']:>6.2f}s -> {com['total']:>5.2f}s "
+                      f"{com['continuacoes']:>13}")
+        return 0
+    if opcoes.niveis:
+        with stub.instalado():
+            separado, comum = medir_niveis(stub, opcoes)
+        print(f"\n{len(NIVEIS)} níveis no aula_p ({', '.join(NIVEIS)})")
+        print(f"{'modo':<28} {'ponta a ponta':>14} {'tokens':>8} {'no forte':>9} {'chamadas':>9}")
+        for rotulo, medida in (("uma geração por nível", separado), ("núcleo comum + adaptações", comum)):
+            print(f"{rotulo:<28} {medida['total']:>13.2f}s {medida['tokens']:>8} {medida['forte']:>9} {medida['chamadas']:>9}")
+        return 0
+    if opcoes.grupo:
+        with stub.instalado():
+            medidas = medir_grupo(stub, opcoes)
+        print(f"\n{len(GRUPO)} personagens no modo grupo do dupla_exercicio")
+        print(f"{'por chamada':<12} {'prontos':>8} {'ponta a ponta':>14} {'tokens':>8} {'chamadas':>9} {'por personagem':>15}")
+        for por_chamada, medida in medidas.items():
+            print(f"{por_chamada:<12} {medida['prontos']:>8} {medida['total']:>13.2f}s {medida['tokens']:>8} "
+                  f"{medida['chamadas']:>9} {medida['chamadas'] / len(GRUPO):>15.2f}")
+        return 0
+    with stub.instalado():
+        resultados = {app: medir_app(app, stub, opcoes) for app in opcoes.apps}
+    imprimir(resultados)
+
+    if opcoes.salvar_baseline:
+        with open(opcoes.baseline, "w", encoding="utf-8") as arquivo:
+            json.dump({"configuracao": configuracao, "apps": resultados}, arquivo, indent=2, ensure_ascii=False)
+        print(f"\nBaseline salvo em {opcoes.baseline}")
+        return 0
+
+    if not os.path.exists(opcoes.baseline):
+        print("\nSem baseline para comparar (use --salvar-baseline).")
+        return 0
+    with open(opcoes.baseline, encoding="utf-8") as arquivo:
+        baseline = json.load(arquivo)
+    if baseline.get("configuracao") != configuracao:
+        print("\n⚠️ Configuração diferente da do baseline; comparação só indicativa.")
+    regressoes = comparar(resultados, baseline, opcoes.tolerancia)
+    if regressoes:
+        print("\n🚨 Regressões em relação ao baseline:")
+        for linha in regressoes:
+            print(f"  {linha}")
+        return 1
+    print("\n✅ Sem regressões em relação ao baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
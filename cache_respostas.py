@@ -0,0 +1,152 @@
+# ------------------------------------------------------------
+# 💾 Cache de respostas do LLM (memória LRU + SQLite em disco)
+# ------------------------------------------------------------
+# Em sala de aula os mesmos temas se repetem muito. Guardamos a resposta de
+# cada chamada usando como chave o modelo, a temperatura e as mensagens já
+# renderizadas (papel/objetivo/história do agente + descrição da tarefa).
+# Assim, repetir um pedido não gasta tokens nem limite de requisições do Groq.
+# ------------------------------------------------------------
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+ARQUIVO_PADRAO = os.environ.get("CACHE_RESPOSTAS_ARQUIVO", "cache_respostas.sqlite3")
+
+
+class CacheRespostas:
+    """
+    Cache em duas camadas: um LRU pequeno em memória na frente de um SQLite em disco.
+    - caminho: arquivo SQLite (":memory:" para não gravar nada)
+    - max_memoria: quantas respostas ficam no LRU em memória
+    - max_bytes_disco: tamanho máximo (soma dos textos) guardado no SQLite
+    - ttl: segundos até uma resposta expirar
+    """
+
+    def __init__(self, caminho=ARQUIVO_PADRAO, max_memoria=256, max_bytes_disco=50_000_000, ttl=7 * 24 * 3600):
+        self.max_memoria = max_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.ttl = ttl
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        self._memoria = OrderedDict()  # chave -> (criado_em, texto)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(caminho, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS respostas ("
+            "chave TEXT PRIMARY KEY, texto TEXT NOT NULL, "
+            "criado_em REAL NOT NULL, usado_em REAL NOT NULL, tamanho INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_respostas_usado_em ON respostas (usado_em)")
+        self._db.commit()
+
+    @staticmethod
+    def chave(modelo, temperatura, mensagens):
+        """Gera a chave (sha256) a partir do modelo, temperatura e mensagens renderizadas."""
+        bruto = json.dumps(
+            {"modelo": modelo, "temperatura": temperatura, "mensagens": mensagens},
+            ensure_ascii=False, sort_keys=True, default=str,
+        )
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    def obter(self, chave):
+        """Devolve o texto guardado para a chave, ou None se não existir/expirou."""
+        agora = time.time()
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item and agora - item[0] <= self.ttl:
+                self._memoria.move_to_end(chave)
+                self.acertos_memoria += 1
+                return item[1]
+            self._memoria.pop(chave, None)
+
+            linha = self._db.execute(
+                "SELECT texto, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha and agora - linha[1] <= self.ttl:
+                self._db.execute("UPDATE respostas SET usado_em = ? WHERE chave = ?", (agora, chave))
+                self._db.commit()
+                self._guardar_memoria(chave, linha[1], linha[0])
+                self.acertos_disco += 1
+                return linha[0]
+            if linha:
+                self._db.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                self._db.commit()
+            self.falhas += 1
+            return None
+
+    def guardar(self, chave, texto):
+        """Guarda (ou substitui) a resposta nas duas camadas e aplica os limites."""
+        agora = time.time()
+        with self._lock:
+            self._guardar_memoria(chave, agora, texto)
+            self._db.execute(
+                "INSERT OR REPLACE INTO respostas (chave, texto, criado_em, usado_em, tamanho) VALUES (?, ?, ?, ?, ?)",
+                (chave, texto, agora, agora, len(texto.encode("utf-8"))),
+            )
+            self._remover_excesso(agora)
+            self._db.commit()
+
+    def _guardar_memoria(self, chave, criado_em, texto):
+        self._memoria[chave] = (criado_em, texto)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _remover_excesso(self, agora):
+        # Primeiro o que expirou, depois os menos usados até caber no limite de bytes
+        self._db.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.max_bytes_disco:
+            return
+        for chave, tamanho in self._db.execute(
+            "SELECT chave, tamanho FROM respostas ORDER BY usado_em"
+        ).fetchall():
+            if total <= self.max_bytes_disco:
+                break
+            self._db.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            self._memoria.pop(chave, None)
+            total -= tamanho
+
+    def limpar(self):
+        """Apaga tudo (memória e disco)."""
+        with self._lock:
+            self._memoria.clear()
+            self._db.execute("DELETE FROM respostas")
+            self._db.commit()
+
+    def estatisticas(self):
+        """Contadores de acertos/falhas e ocupação atual."""
+        with self._lock:
+            itens, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+            ).fetchone()
+            acertos = self.acertos_memoria + self.acertos_disco
+            consultas = acertos + self.falhas
+            return {
+                "acertos": acertos,
+                "acertos_memoria": self.acertos_memoria,
+                "acertos_disco": self.acertos_disco,
+                "falhas": self.falhas,
+                "taxa_acerto": acertos / consultas if consultas else 0.0,
+                "itens_memoria": len(self._memoria),
+                "itens_disco": itens,
+                "bytes_disco": total,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache():
+    """Cache único do processo (compartilhado por todas as sessões do Streamlit)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheRespostas()
+        return _cache
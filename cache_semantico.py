@@ -0,0 +1,185 @@
+# ------------------------------------------------------------
+# 🧭 Cache semântico: reaproveita material de pedidos parecidos
+# ------------------------------------------------------------
+# O cache de respostas (cache_respostas.py) só acerta quando o prompt é
+# idêntico. Em sala, "Algoritmos", "algoritmos" e "Algoritimos" são o mesmo
+# pedido. Aqui tema, nível e objetivo viram um vetor cada (hashing dos
+# trigramas de letras de cada palavra, tudo local, sem modelo de embeddings) e
+# um índice em memória guarda as gerações anteriores de cada app. Se o pedido
+# novo for parecido o bastante com um antigo (média ponderada dos cossenos
+# acima do limiar, com os mesmos números e ordinais no tema), o material
+# guardado é servido sem chamar o LLM.
+# ------------------------------------------------------------
+import hashlib
+import re
+import threading
+import unicodedata
+
+from prompts import PALAVRAS_VAZIAS
+
+# Semelhança mínima (cosseno, 0 a 1) para reaproveitar uma geração: "Algoritimos"
+# contra "Algoritmos" dá 0,76 só com o tema
+LIMIAR_PADRAO = 0.75
+
+# Peso de cada campo na semelhança: o cosseno final é a média ponderada dos
+# campos preenchidos nos dois pedidos (campo vazio num deles fica de fora)
+PESOS = {"tema": 0.6, "nivel": 0.2, "objetivo": 0.2}
+
+# Campo preenchido nos dois pedidos com cosseno abaixo disso reprova, mesmo que
+# a média passe ("Iniciante" contra "Pós-graduação" não se compensa pelo tema)
+MINIMO_POR_CAMPO = 0.5
+
+DIMENSAO = 2 ** 12  # por campo
+MAX_ITENS = 500
+
+# Valores que os apps usam para campo em branco
+_VAZIOS = {"nao informado", "nao especificado"}
+
+# Ordinais por extenso ("segunda guerra", "terceira lei"): como os números, mudam o assunto
+_ORDINAL = re.compile(r"(primeir|segund|terceir|quart|quint|sext|setim|oitav|non|decim)[oa]s?")
+
+
+def normalizar(texto):
+    """Minúsculas, sem acento, sem pontuação e sem espaços sobrando ("Não informado" conta como vazio)."""
+    texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode().lower()
+    texto = " ".join(re.findall(r"\w+", texto))
+    return "" if texto in _VAZIOS else texto
+
+
+def marcos(texto):
+    """
+    Números e ordinais do texto ("2º grau" -> {"2o"}, "Segunda Guerra" -> {"segunda"}).
+    No tema eles precisam ser iguais: nos trigramas "1º grau" e "2º grau" diferem
+    num atributo só e passariam do limiar.
+    """
+    return frozenset(palavra for palavra in normalizar(texto).split()
+                     if any(c.isdigit() for c in palavra) or _ORDINAL.fullmatch(palavra))
+
+
+def _atributos(texto):
+    # Só trigramas de letras (com borda): "algoritimos" e "algoritmos" dividem quase
+    # todos; com a palavra inteira como atributo, um erro de digitação pesaria demais
+    atributos = []
+    for palavra in normalizar(texto).split():
+        if palavra not in PALAVRAS_VAZIAS:
+            marcada = f" {palavra} "
+            atributos += [marcada[i:i + 3] for i in range(len(marcada) - 2)]
+    return atributos
+
+
+def _posicao(atributo):
+    # hashlib (e não hash()) para o mesmo texto cair no mesmo lugar em qualquer processo
+    resumo = hashlib.blake2b(atributo.encode("utf-8"), digest_size=8).digest()
+    numero = int.from_bytes(resumo, "little")
+    return numero % DIMENSAO, 1.0 if numero >> 63 else -1.0
+
+
+def vetorizar(texto):
+    """Vetor normalizado (numpy, float32) dos trigramas de um campo; None se o campo está vazio."""
+    import numpy as np
+
+    atributos = _atributos(texto)
+    if not atributos:
+        return None
+    vetor = np.zeros(DIMENSAO, dtype=np.float32)
+    for atributo in atributos:
+        posicao, sinal = _posicao(atributo)
+        vetor[posicao] += sinal
+    norma = np.linalg.norm(vetor)
+    return vetor / norma if norma else None
+
+
+class IndiceSemantico:
+    """
+    Índice em memória das gerações de um app: vetores das entradas + material gerado.
+    - max_itens: quantas gerações guardar (as mais antigas saem primeiro)
+    """
+
+    def __init__(self, max_itens=MAX_ITENS):
+        self.max_itens = max_itens
+        self._vetores = []  # por geração: {campo: vetor ou None}
+        self._itens = []
+        self._matrizes = None  # por campo: (pilha dos vetores, preenchido?), refeitas só quando o índice muda
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def adicionar(self, inputs, material):
+        """Guarda o material gerado para as entradas (substitui o de entradas idênticas)."""
+        vetores = {campo: vetorizar(inputs.get(campo, "")) for campo in PESOS}
+        chave = {campo: normalizar(inputs.get(campo, "")) for campo in PESOS}
+        item = {"chave": chave, "marcos": marcos(inputs.get("tema", "")), "inputs": dict(inputs),
+                "material": material}
+        with self._lock:
+            for i, antigo in enumerate(self._itens):
+                if antigo["chave"] == chave:
+                    del self._itens[i], self._vetores[i]
+                    break
+            self._itens.append(item)
+            self._vetores.append(vetores)
+            del self._itens[:-self.max_itens], self._vetores[:-self.max_itens]
+            self._matrizes = None
+
+    def _empilhar(self):
+        import numpy as np
+
+        vazio = np.zeros(DIMENSAO, dtype=np.float32)
+        return {
+            campo: (np.stack([v[campo] if v[campo] is not None else vazio for v in self._vetores]),
+                    np.array([v[campo] is not None for v in self._vetores]))
+            for campo in PESOS
+        }
+
+    def buscar(self, inputs, limiar=LIMIAR_PADRAO, precisa=()):
+        """
+        Geração mais parecida com as entradas, se a semelhança passar do limiar.
+        - inputs: tema, nivel, objetivo do pedido novo
+        - limiar: semelhança mínima (0 a 1)
+        - precisa: tarefas pedidas; entre as parecidas, vence a que tem todas
+          (senão a mais parecida, e o que faltar nela é gerado)
+        Devolve (semelhança, inputs da geração guardada, material) ou None.
+        """
+        import numpy as np
+
+        consulta = {campo: vetorizar(inputs.get(campo, "")) for campo in PESOS}
+        with self._lock:
+            if not self._itens:
+                return None
+            if self._matrizes is None:
+                self._matrizes = self._empilhar()
+            matrizes = self._matrizes
+            itens = list(self._itens)
+
+        soma = np.zeros(len(itens), dtype=np.float32)
+        pesos = np.zeros(len(itens), dtype=np.float32)
+        marcos_tema = marcos(inputs.get("tema", ""))
+        reprovados = np.array([item["marcos"] != marcos_tema for item in itens])
+        for campo, peso in PESOS.items():
+            matriz, preenchidos = matrizes[campo]
+            if consulta[campo] is None:
+                continue
+            cossenos = matriz @ consulta[campo]
+            soma += peso * cossenos * preenchidos
+            pesos += peso * preenchidos
+            reprovados |= preenchidos & (cossenos < MINIMO_POR_CAMPO)
+        semelhancas = np.where(reprovados | (pesos == 0), 0.0, soma / np.maximum(pesos, 1e-9))
+
+        candidatos = [i for i in np.argsort(-semelhancas, kind="stable") if semelhancas[i] >= limiar]
+        if not candidatos:
+            return None
+        completos = [i for i in candidatos if all(nome in itens[i]["material"] for nome in precisa)]
+        i = (completos or candidatos)[0]
+        return float(semelhancas[i]), itens[i]["inputs"], itens[i]["material"]
+
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def obter_indice(app):
+    """Índice único do processo para o app (compartilhado por todas as sessões do Streamlit)."""
+    with _indices_lock:
+        if app not in _indices:
+            _indices[app] = IndiceSemantico()
+        return _indices[app]
@@ -0,0 +1,277 @@
+# ------------------------------------------------------------
+# 🏋️ Teste de carga: várias sessões simultâneas em cada app
+# ------------------------------------------------------------
+# O benchmark.py mede uma geração por vez. Aqui N sessões (alunos) geram ao
+# mesmo tempo no mesmo processo, como num servidor Streamlit só: cada sessão
+# é um AppTest numa thread, com entradas próprias (sem cache nem
+# coalescência), e todas dividem a fila de jobs, o limitador e o histórico.
+# O LLM falso tem latência, velocidade e um limite de RPM por modelo (429
+# com o tempo até liberar), como a API. A concorrência sobe em degraus e,
+# em cada um, mede vazão, p50/p95, taxa de erros e memória do processo; o
+# resumo aponta o degrau em que o servidor satura.
+#
+# Uso:
+#   python carga.py                                 # aula_p e dupla_exercicio, 1 a 16 sessões
+#   python carga.py --apps aula_p --niveis 1 2 4 8 16 32 --rpm 120
+#   python carga.py --fila-workers 8 --fila-max 32 --saida carga_8w.json
+# ------------------------------------------------------------
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+# Importar o benchmark já deixa tudo local: sem rede, sem telemetria, sem chave de verdade
+from benchmark import APPS, PASTA, percentil, preparar
+from streamlit.testing.v1 import AppTest
+
+import limitador
+
+SAIDA_PADRAO = os.path.join(PASTA, "carga_resumo.json")
+
+# A vazão "parou de crescer" se o degrau seguinte rende menos que isto a mais
+GANHO_MINIMO = 0.10
+
+
+def memoria_mb():
+    """Memória residente do processo (o "servidor") em MB."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource  # fora do Linux: só o pico
+
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 2**20 if sys.platform == "darwin" else pico / 1024
+
+
+def permitir_sessoes_simultaneas():
+    """
+    O AppTest foi feito para um teste por vez: cada run() instala um Runtime falso
+    global e o apaga ao terminar, derrubando o run das outras sessões no meio.
+    Aqui o último Runtime instalado continua valendo depois de apagado.
+    """
+    from streamlit.runtime import Runtime
+
+    ultimo = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            ultimo["runtime"] = cls._instance
+        if "runtime" not in ultimo:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo["runtime"]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in ultimo)
+
+
+def erro_da_pagina(at):
+    """Primeira exceção ou mensagem de erro que a página mostrou, ou None."""
+    if at.exception:
+        return at.exception[0].message
+    for erro in at.error:
+        return erro.value
+    return None
+
+
+def gerando(at, app):
+    """A página ainda acompanha um job (na fila ou rodando): tem o botão de cancelar."""
+    return any(botao.key == f"cancelar_{app}" for botao in at.button)
+
+
+def sessao_simulada(app, numero, geracoes, opcoes, medidas):
+    """
+    Um aluno: abre o app e gera `geracoes` vezes, cada uma com um tema (ou nome) novo.
+    Cada geração vira {"latencia", "erro"} em `medidas`.
+    """
+    campos = dict(APPS[app])
+    variar = next(iter(campos))  # tema / nome do personagem
+    try:
+        at = AppTest.from_file(os.path.join(PASTA, f"{app}.py"), default_timeout=opcoes.timeout)
+        at.run()
+    except Exception as erro:
+        medidas.extend({"latencia": 0.0, "erro": f"abrir a página: {erro}"} for _ in range(geracoes))
+        return
+    for geracao in range(geracoes):
+        campos[variar] = f"{APPS[app][variar]} {numero}-{geracao}"
+        inicio = time.time()
+        try:
+            preparar(at, campos, opcoes)
+            at.button[0].click()
+            at.run()
+            # O AppTest para de seguir os st.rerun() da página depois de um tempo:
+            # roda de novo, como o navegador faria, até o job terminar
+            while gerando(at, app) and time.time() - inicio < opcoes.timeout:
+                at.run()
+            erro = "timeout" if gerando(at, app) else erro_da_pagina(at)
+        except Exception as excecao:  # timeout do AppTest
+            erro = str(excecao) or type(excecao).__name__
+        medidas.append({"latencia": time.time() - inicio, "erro": erro})
+
+
+def rodar_nivel(app, sessoes, stub, opcoes):
+    """Um degrau: `sessoes` alunos ao mesmo tempo; devolve as métricas do degrau."""
+    medidas, memoria = [], [memoria_mb()]
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(0.2):
+            memoria.append(memoria_mb())
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    chamadas_antes, erros_antes = stub.chamadas, stub.erros_429
+    inicio = time.time()
+    threads = [
+        threading.Thread(target=sessao_simulada, args=(app, numero, opcoes.geracoes, opcoes, medidas))
+        for numero in range(1, sessoes + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.time() - inicio
+    parar.set()
+    amostrador.join()
+
+    latencias = [m["latencia"] for m in medidas if not m["erro"]]
+    erros = [m["erro"] for m in medidas if m["erro"]]
+    return {
+        "sessoes": sessoes,
+        "geracoes": len(medidas),
+        "duracao": duracao,
+        "vazao_por_minuto": len(latencias) / duracao * 60,
+        "p50": percentil(latencias, 50),
+        "p95": percentil(latencias, 95),
+        "taxa_erros": len(erros) / len(medidas) if medidas else 0.0,
+        "exemplos_erros": sorted({e.splitlines()[0][:120] for e in erros})[:3],
+        "memoria_mb": max(memoria + [memoria_mb()]),
+        "chamadas_llm": stub.chamadas - chamadas_antes,
+        "erros_429": stub.erros_429 - erros_antes,
+    }
+
+
+def ponto_de_saturacao(niveis, max_erros, fator_p95):
+    """
+    Primeiro degrau em que o servidor deixou de dar conta, e por quê.
+    - niveis: métricas dos degraus, em ordem crescente de sessões
+    - max_erros: taxa de erros aceita
+    - fator_p95: quantas vezes o p95 de uma sessão só é aceito
+    Devolve (índice do degrau, motivo) ou (None, None) se nenhum saturou.
+    """
+    base = niveis[0]["p95"] if niveis else 0.0
+    for i, nivel in enumerate(niveis):
+        if nivel["taxa_erros"] > max_erros:
+            return i, f"{nivel['taxa_erros']:.0%} de erros"
+        if base and nivel["p95"] > base * fator_p95:
+            return i, f"p95 de {nivel['p95']:.1f}s, mais de {fator_p95:g}× o de 1 sessão"
+        anterior = niveis[i - 1] if i else None
+        if anterior and nivel["vazao_por_minuto"] < anterior["vazao_por_minuto"] * (1 + GANHO_MINIMO):
+            return i, "a vazão parou de crescer"
+    return None, None
+
+
+def resumir(niveis, opcoes):
+    """Degraus, degrau de saturação e o maior degrau que o servidor aguentou."""
+    indice, motivo = ponto_de_saturacao(niveis, opcoes.max_erros, opcoes.fator_p95)
+    capacidade = niveis[indice - 1] if indice else (niveis[-1] if indice is None else None)
+    return {
+        "niveis": niveis,
+        "saturacao": None if indice is None else {"sessoes": niveis[indice]["sessoes"], "motivo": motivo},
+        "capacidade": None if capacidade is None else {
+            "sessoes": capacidade["sessoes"],
+            "vazao_por_minuto": capacidade["vazao_por_minuto"],
+            "p95": capacidade["p95"],
+        },
+    }
+
+
+def imprimir(app, resumo):
+    print(f"\n== {app} ==")
+    print(f"  {'sessões':>7} {'ger/min':>8} {'p50':>7} {'p95':>7} {'erros':>6} {'429':>5} {'memória':>9}")
+    for n in resumo["niveis"]:
+        print(f"  {n['sessoes']:>7} {n['vazao_por_minuto']:>8.1f} {n['p50']:>6.2f}s {n['p95']:>6.2f}s "
+              f"{n['taxa_erros']:>6.0%} {n['erros_429']:>5} {n['memoria_mb']:>7.0f}MB")
+        for erro in n["exemplos_erros"]:
+            print(f"          ↳ {erro}")
+    saturacao, capacidade = resumo["saturacao"], resumo["capacidade"]
+    if saturacao is None:
+        print(f"  ✅ Sem saturação até {capacidade['sessoes']} sessões.")
+    elif capacidade is None:
+        print(f"  🚨 Já satura com {saturacao['sessoes']} sessão(ões): {saturacao['motivo']}.")
+    else:
+        print(f"  🚨 Satura com {saturacao['sessoes']} sessões ({saturacao['motivo']}); "
+              f"aguenta {capacidade['sessoes']} sessões: {capacidade['vazao_por_minuto']:.1f} gerações/min, "
+              f"p95 {capacidade['p95']:.1f}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos apps com sessões simultâneas e LLM falso.")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=["aula_p", "dupla_exercicio"])
+    parser.add_argument("--niveis", nargs="+", type=int, default=[1, 2, 4, 8, 16], help="sessões simultâneas em cada degrau")
+    parser.add_argument("--geracoes", type=int, default=3, help="gerações por sessão em cada degrau")
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos até o primeiro token")
+    parser.add_argument("--tps", type=float, default=300, help="tokens por segundo do LLM falso")
+    parser.add_argument("--tokens-saida", type=int, default=250)
+    parser.add_argument("--rpm", type=int, default=300, help="requisições por minuto aceitas por modelo (0 = sem limite)")
+    parser.add_argument("--chaves", type=int, default=1, help="chaves da API no pool (o limite de RPM é por chave)")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração extra de chamadas com RateLimitError")
+    parser.add_argument("--com-limites", action="store_true", help="mantém os limites RPM/TPM locais do Groq")
+    parser.add_argument("--sem-streaming", action="store_true")
+    parser.add_argument("--fila-workers", type=int, help="FILA_WORKERS (padrão: o do ambiente)")
+    parser.add_argument("--fila-max", type=int, help="FILA_MAX (padrão: o do ambiente)")
+    parser.add_argument("--max-erros", type=float, default=0.05, help="taxa de erros que conta como saturação")
+    parser.add_argument("--fator-p95", type=float, default=3.0, help="p95 acima disto × o de 1 sessão é saturação")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--saida", default=SAIDA_PADRAO)
+    opcoes = parser.parse_args()
+    opcoes.sequencial = opcoes.sem_compactar = False  # como a página vem por padrão
+
+    # A fila lê o ambiente ao ser criada, na primeira geração
+    if opcoes.fila_workers:
+        os.environ["FILA_WORKERS"] = str(opcoes.fila_workers)
+    if opcoes.fila_max:
+        os.environ["FILA_MAX"] = str(opcoes.fila_max)
+    if opcoes.chaves > 1:
+        # O pool lê as chaves do ambiente na primeira geração
+        os.environ["GROQ_API_KEY"] = "stub1"
+        os.environ["GROQ_API_KEYS"] = ",".join(f"stub{i}" for i in range(1, opcoes.chaves + 1))
+    if not opcoes.com_limites:
+        # O limite de RPM fica do lado do LLM falso, como o da API
+        limitador.LIMITES_MODELOS.clear()
+        limitador.LIMITE_PADRAO = (10**6, 10**9)
+
+    from llm_stub import StubLLM
+
+    stub = StubLLM(opcoes.latencia, opcoes.tps, opcoes.tokens_saida, opcoes.taxa_429, rpm=opcoes.rpm or None)
+    resumo = {
+        "configuracao": {
+            campo: getattr(opcoes, campo)
+            for campo in ("niveis", "geracoes", "latencia", "tps", "tokens_saida", "rpm", "chaves", "taxa_429",
+                          "com_limites", "sem_streaming", "max_erros", "fator_p95")
+        },
+        "apps": {},
+    }
+    resumo["configuracao"]["fila_workers"] = int(os.environ.get("FILA_WORKERS", "4"))
+    resumo["configuracao"]["fila_max"] = int(os.environ.get("FILA_MAX", "16"))
+    permitir_sessoes_simultaneas()
+    with stub.instalado():
+        for app in opcoes.apps:
+            sessao_simulada(app, 0, 1, opcoes, [])  # aquecimento (imports e inicialização do CrewAI)
+            niveis = []
+            for sessoes in sorted(set(opcoes.niveis)):
+                print(f"{app}: {sessoes} sessão(ões)...", file=sys.stderr, flush=True)
+                niveis.append(rodar_nivel(app, sessoes, stub, opcoes))
+            resumo["apps"][app] = resumir(niveis, opcoes)
+            imprimir(app, resumo["apps"][app])
+
+    with open(opcoes.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResumo salvo em {opcoes.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
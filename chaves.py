@@ -0,0 +1,167 @@
+# ------------------------------------------------------------
+# 🔑 Pool de chaves da API (várias chaves do Groq no mesmo processo)
+# ------------------------------------------------------------
+# O limite de RPM/TPM do Groq é por chave: com uma chave só, a vazão do
+# servidor para no limite dela, por mais alunos que haja. Aqui as chaves
+# vêm do ambiente (GROQ_API_KEY, GROQ_API_KEYS e o arquivo GROQ_CHAVES_ARQUIVO)
+# e cada (modelo, chave) tem o seu limitador. Cada chamada vai para a chave
+# com mais folga agora (menor espera prevista; empate: mais orçamento livre,
+# menos chamadas em andamento); a chave que toma 429 seguidos fica de
+# quarentena por um tempo. O uso de cada chave aparece na página, mascarado.
+# ------------------------------------------------------------
+import os
+import re
+import threading
+import time
+
+from limitador import obter_limitador
+
+# 429 seguidos que põem a chave de quarentena, e por quantos segundos
+QUARENTENA_APOS = int(os.environ.get("CHAVES_QUARENTENA_APOS", "3"))
+QUARENTENA_SEGUNDOS = float(os.environ.get("CHAVES_QUARENTENA", "60"))
+
+
+def carregar_chaves():
+    """
+    Chaves do ambiente, sem repetição e nesta ordem: GROQ_API_KEY, GROQ_API_KEYS
+    (separadas por vírgula, espaço ou linha) e as linhas do arquivo GROQ_CHAVES_ARQUIVO
+    (linhas com # são ignoradas).
+    """
+    brutas = [os.environ.get("GROQ_API_KEY", "")]
+    brutas += re.split(r"[\s,;]+", os.environ.get("GROQ_API_KEYS", ""))
+    arquivo = os.environ.get("GROQ_CHAVES_ARQUIVO")
+    if arquivo:
+        with open(arquivo, encoding="utf-8") as linhas:
+            brutas += [linha.split("#", 1)[0] for linha in linhas]
+    return list(dict.fromkeys(c.strip() for c in brutas if c.strip()))
+
+
+def mascarar(chave):
+    """Só o fim da chave, para mostrar na tela e nos logs."""
+    return f"…{chave[-4:]}"
+
+
+class PoolChaves:
+    """
+    Chaves da API com balanceamento pela folga de cada uma.
+    - chaves: lista de chaves (a primeira é a principal)
+    - quarentena_apos: 429 seguidos até a chave sair do rodízio
+    - quarentena: segundos fora do rodízio
+    """
+
+    def __init__(self, chaves, quarentena_apos=QUARENTENA_APOS, quarentena=QUARENTENA_SEGUNDOS):
+        self.chaves = list(chaves)
+        self.quarentena_apos = quarentena_apos
+        self.quarentena = quarentena
+        self._lock = threading.Lock()
+        self._uso = {
+            chave: {"chamadas": 0, "em_andamento": 0, "tokens": 0, "erros_429": 0, "seguidos": 0,
+                    "quarentenas": 0, "quarentena_ate": 0.0}
+            for chave in self.chaves
+        }
+
+    def __contains__(self, chave):
+        return chave in self._uso
+
+    def __len__(self):
+        return len(self.chaves)
+
+    @property
+    def principal(self):
+        return self.chaves[0] if self.chaves else ""
+
+    def _no_rodizio(self, agora):
+        livres = [c for c in self.chaves if self._uso[c]["quarentena_ate"] <= agora]
+        # Todas de quarentena: melhor tentar a que sai primeiro do que parar tudo
+        return livres or [min(self.chaves, key=lambda c: self._uso[c]["quarentena_ate"])]
+
+    def escolher(self, modelo, tokens):
+        """Chave para uma chamada a `modelo` agora; conta a chamada como em andamento."""
+        with self._lock:
+            candidatas = self._no_rodizio(time.time())
+            if len(candidatas) > 1:
+                limitadores = {c: obter_limitador(modelo, c) for c in candidatas}
+                candidatas.sort(key=lambda c: (
+                    round(limitadores[c].espera_prevista(tokens), 1),
+                    -round(limitadores[c].folga(), 2),
+                    self._uso[c]["em_andamento"],
+                    self._uso[c]["chamadas"],
+                ))
+            chave = candidatas[0]
+            self._uso[chave]["em_andamento"] += 1
+            return chave
+
+    def registrar(self, chave, tokens=0, erro_429=False, falha=False):
+        """
+        Fim de uma chamada com a chave: tokens gastos ou 429 (que pode abrir a quarentena).
+        - falha: a chamada não chegou ao fim por outro motivo (timeout, erro de rede):
+          só libera a vaga em andamento; não conta chamada, tokens nem zera os 429 seguidos
+        """
+        with self._lock:
+            uso = self._uso[chave]
+            uso["em_andamento"] = max(0, uso["em_andamento"] - 1)
+            if falha:
+                return
+            if not erro_429:
+                uso["chamadas"] += 1
+                uso["tokens"] += tokens
+                uso["seguidos"] = 0
+                return
+            uso["erros_429"] += 1
+            uso["seguidos"] += 1
+            if uso["seguidos"] >= self.quarentena_apos and len(self.chaves) > 1:
+                uso["seguidos"] = 0
+                uso["quarentenas"] += 1
+                uso["quarentena_ate"] = time.time() + self.quarentena
+
+    def espera_prevista(self, modelo, tokens):
+        """Menor espera, entre as chaves no rodízio, para uma chamada a `modelo`."""
+        with self._lock:
+            candidatas = self._no_rodizio(time.time())
+        return min(obter_limitador(modelo, c).espera_prevista(tokens) for c in candidatas)
+
+    def folga(self, modelo):
+        """Maior fração de orçamento livre de `modelo` entre as chaves no rodízio."""
+        with self._lock:
+            candidatas = self._no_rodizio(time.time())
+        return max(obter_limitador(modelo, c).folga() for c in candidatas)
+
+    def uso(self):
+        """Uso de cada chave (mascarada): chamadas, tokens, 429, quarentenas e segundos restantes dela."""
+        agora = time.time()
+        with self._lock:
+            return [
+                {
+                    "chave": mascarar(chave), "chamadas": uso["chamadas"], "em_andamento": uso["em_andamento"],
+                    "tokens": uso["tokens"], "erros_429": uso["erros_429"], "quarentenas": uso["quarentenas"],
+                    "quarentena_restante": max(0.0, uso["quarentena_ate"] - agora),
+                }
+                for chave, uso in self._uso.items()
+            ]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    """Pool único do processo, com as chaves do ambiente (lidas na primeira chamada)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolChaves(carregar_chaves())
+        return _pool
+
+
+def mostrar_chaves():
+    """Legenda com o uso de cada chave (só quando há mais de uma)."""
+    import streamlit as st
+
+    pool = obter_pool()
+    if len(pool) < 2:
+        return
+    partes = []
+    for uso in pool.uso():
+        estado = f" · 🚧 quarentena {uso['quarentena_restante']:.0f}s" if uso["quarentena_restante"] else ""
+        partes.append(f"{uso['chave']}: {uso['chamadas']} chamadas, {uso['tokens']} tokens, {uso['erros_429']}×429{estado}")
+    st.caption("🔑 Chaves: " + " | ".join(partes))
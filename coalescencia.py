@@ -0,0 +1,145 @@
+# ------------------------------------------------------------
+# 🔗 Coalescência de chamadas idênticas em andamento (single-flight)
+# ------------------------------------------------------------
+# Quando o professor pede para a turma inteira gerar o mesmo tema, 30
+# sessões mandam os mesmos prompts ao Groq ao mesmo tempo; o cache de
+# respostas só ajuda depois que a primeira resposta volta. Aqui a primeira
+# chamada com uma chave vira a "líder" e as que chegam com a mesma chave
+# enquanto ela está no ar esperam por ela e recebem o mesmo texto (com
+# streaming, os mesmos pedaços, na hora). Se a líder falhar, cada uma tenta
+# por conta própria. A fila de jobs faz o mesmo com pedidos inteiros
+# (fila_jobs.py): pedido idêntico a um job no ar passa a acompanhar esse job.
+# ------------------------------------------------------------
+import hashlib
+import json
+import threading
+
+# Segundos entre as olhadas de quem acompanha no evento de cancelamento do job dele
+INTERVALO_CANCELAMENTO = 0.5
+
+
+class EsperaCancelada(Exception):
+    """Quem acompanhava uma chamada em andamento desistiu: o job dele foi cancelado."""
+
+
+def normalizar_mensagens(mensagens):
+    """Mensagens com os espaços normalizados ("Algoritmos  " e "Algoritmos" dão o mesmo prompt)."""
+    if isinstance(mensagens, str):
+        return " ".join(mensagens.split())
+    return [{**m, "content": " ".join(str(m.get("content", "")).split())} for m in mensagens]
+
+
+def chave_chamada(modelo, temperatura, mensagens):
+    """Chave (sha256) de uma chamada: modelo, temperatura e mensagens normalizadas."""
+    bruto = json.dumps(
+        {"modelo": modelo, "temperatura": temperatura, "mensagens": normalizar_mensagens(mensagens)},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+class Voo:
+    """Uma chamada em andamento: pedaços já gerados, texto final ou erro."""
+
+    def __init__(self):
+        self.pedacos = []
+        self.rodada = 0  # muda quando a líder recomeça o texto (nova tentativa)
+        self.texto = None
+        self.erro = None
+        self.terminado = False
+        self._cond = threading.Condition()
+
+    def publicar(self, pedaco):
+        """Repassa um pedaço do streaming da líder (None = recomeçar do zero)."""
+        with self._cond:
+            if pedaco is None:
+                self.pedacos = []
+                self.rodada += 1
+            else:
+                self.pedacos.append(pedaco)
+            self._cond.notify_all()
+
+    def concluir(self, texto=None, erro=None):
+        with self._cond:
+            self.texto, self.erro, self.terminado = texto, erro, True
+            self._cond.notify_all()
+
+    def acompanhar(self, receptor=None, cancelar=None):
+        """
+        Espera a líder terminar e devolve o mesmo texto (ou levanta o erro dela).
+        - receptor: como no transmitindo_para; recebe os pedaços já gerados e os próximos
+        - cancelar: threading.Event do job de quem espera; ligado, a espera acaba com
+          EsperaCancelada (a líder segue para os outros)
+        """
+        rodada, vistos = None, 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self.terminado or self.rodada != rodada or len(self.pedacos) > vistos,
+                    INTERVALO_CANCELAMENTO,
+                )
+                recomecar = self.rodada != rodada
+                if recomecar:
+                    rodada, vistos = self.rodada, 0
+                novos = self.pedacos[vistos:]
+                vistos += len(novos)
+                terminado = self.terminado
+            if receptor is not None:
+                if recomecar:
+                    receptor(None)
+                for pedaco in novos:
+                    receptor(pedaco)
+            if terminado:
+                break
+            if cancelar is not None and cancelar.is_set():
+                raise EsperaCancelada()
+        if self.erro is not None:
+            raise self.erro
+        return self.texto
+
+
+class Coalescedor:
+    """Voos em andamento por chave, compartilhados entre threads e sessões."""
+
+    def __init__(self):
+        self.lideres = 0
+        self.deduplicadas = 0
+        self._voos = {}
+        self._lock = threading.Lock()
+
+    def entrar(self, chave):
+        """Devolve (voo, lider): lider=True se esta chamada deve ir à API e depois chamar sair()."""
+        with self._lock:
+            voo = self._voos.get(chave)
+            if voo is not None:
+                return voo, False
+            voo = self._voos[chave] = Voo()
+            self.lideres += 1
+            return voo, True
+
+    def sair(self, chave, voo, texto=None, erro=None):
+        """A líder terminou: quem espera recebe o texto (ou o erro) e a chave fica livre."""
+        with self._lock:
+            if self._voos.get(chave) is voo:
+                del self._voos[chave]
+        voo.concluir(texto, erro)
+
+    def contar(self, chamadas=1):
+        """
+        Soma chamadas poupadas: só quando quem esperava recebeu de fato o resultado
+        (se a líder falha, quem esperava vai à API por conta própria e não conta).
+        """
+        with self._lock:
+            self.deduplicadas += chamadas
+
+    def estatisticas(self):
+        with self._lock:
+            return {"em_andamento": len(self._voos), "lideres": self.lideres, "deduplicadas": self.deduplicadas}
+
+
+_coalescedor = Coalescedor()
+
+
+def obter_coalescedor():
+    """Coalescedor único do processo (todas as sessões do Streamlit)."""
+    return _coalescedor
@@ -1,11 +1,19 @@
 # ------------------------------------------------------------
 # 🧙 Agentes de IA para Criação de Personagens de D&D
 # ------------------------------------------------------------
-import os
 import time
 import streamlit as st
-from crewai import Agent, Task, Crew, Process, LLM
-from litellm.exceptions import RateLimitError
+from cache_respostas import obter_cache
+from chaves import mostrar_chaves, obter_pool
+from coalescencia import obter_coalescedor
+from rastreamento import mostrar_desempenho
+from prompts import compactar_prompts, mostrar_prompts
+from recursos import aquecer, obter_llm
+from orcamento import aplicar_orcamentos
+from roteamento import SLO_FILA, TEMPO_LIMITE, reservas_de
+from sessao import INTERVALO, ResultadosSessao
+from regras_dnd import METODOS, entradas_ficha
+from historico import mostrar_historico
 
 # ------------------------------------------------------------
 # INTERFACE STREAMLIT
@@ -18,160 +26,250 @@ nome = st.text_input("Nome do personagem", placeholder="Ex.: Thalindra Sombrasol
 raca = st.text_input("Raça", placeholder="Ex.: Elfo, Anão, Tiefling, etc.")
 classe = st.text_input("Classe", placeholder="Ex.: Mago, Guerreiro, Ladino, etc.")
 tema = st.text_area("Tema ou estilo (opcional)", placeholder="Ex.: sombrio, cômico, trágico, aventureiro...")
+# Atributos, PV, CA e equipamento da ficha são calculados localmente (regras_dnd.py)
+metodo = st.selectbox("Atributos da ficha", list(METODOS), format_func=METODOS.get)
+
+# As três tarefas só usam nome/raça/classe/tema: podem rodar ao mesmo tempo
+paralelo = st.toggle("Gerar conceito, ficha e descrição em paralelo", value=True)
+
+# Ligado: ignora respostas guardadas e pede tudo de novo à API
+refazer = st.toggle("Ignorar cache e gerar de novo", value=False)
+# Mostra o texto de cada aba enquanto o modelo escreve
+transmitir = st.toggle("Mostrar o texto enquanto é gerado", value=True)
+# Tira dos goals dos agentes o que as tarefas já pedem (menos tokens de entrada por chamada)
+compactar = st.toggle("Compactar prompts (menos tokens de entrada)", value=True)
+
+# Modo grupo: vários personagens (um por linha) numa só geração
+modo_grupo = st.toggle("Modo grupo (vários personagens de uma vez)", value=False)
+if modo_grupo:
+    lista_grupo = st.text_area(
+        "Personagens (um por linha: nome, raça, classe, tema)",
+        placeholder="Ex.:\nThalindra Sombrasol, Elfo, Mago, sombrio\nBrom Martelo-Rubro, Anão, Guerreiro, cômico",
+        height=200,
+    )
+    # Quantos personagens vão juntos em cada chamada ao modelo (1 = um por vez, 3 chamadas cada).
+    # Um por vez é o mais rápido enquanto o RPM do modelo sobra; o lote só compensa
+    # quando o limite aperta (muitos personagens, outras sessões gerando)
+    por_chamada = st.slider("Personagens por chamada ao modelo", min_value=1, max_value=5, value=1,
+                            help="1 é o mais rápido com folga no limite de requisições; "
+                                 "lotes maiores fazem menos chamadas e gastam menos tokens.")
 
 executar = st.button("🎲 Gerar Personagem")
+# Geração do modo grupo desta sessão: id do job e personagens já prontos
+CHAVE_GRUPO = "grupo_dupla_exercicio"
 
-api_key = ""  # Substitua pela sua API key válida (Groq ou OpenAI)
+api_key = obter_pool().principal  # GROQ_API_KEY (e, para mais vazão, GROQ_API_KEYS: ver chaves.py)
 
-# ------------------------------------------------------------
-# FUNÇÃO DE EXECUÇÃO SEGURA COM RE-TENTATIVA
-# ------------------------------------------------------------
-def tentar_executar(crew, inputs, tentativas=3, espera=5):
-    """
-    Executa o Crew com tratamento de erros e re-tentativas automáticas.
-    - crew: objeto Crew()
-    - inputs: dicionário de variáveis para o processo
-    - tentativas: número máximo de tentativas antes de desistir
-    - espera: segundos entre tentativas em caso de erro
-    """
-    for i in range(tentativas):
-        try:
-            st.info(f"🧠 Gerando personagem... (Tentativa {i+1}/{tentativas})")
-            resultado = crew.kickoff(inputs=inputs)
-            return resultado
-        except RateLimitError:
-            if i < tentativas - 1:
-                st.warning(f"🚦 Limite atingido. Tentando novamente em {espera} segundos...")
-                time.sleep(espera)
-            else:
-                st.error("🚫 Falha após várias tentativas. Tente novamente mais tarde.")
-                return None
-        except Exception as e:
-            st.error(f"Ocorreu um erro inesperado: {e}")
-            return None
+# Espaços sobrando não mudam o pedido ("Algoritmos " e "Algoritmos" viram o mesmo prompt)
+nome, raca, classe, tema = (" ".join(campo.split()) for campo in (nome, raca, classe, tema))
+inputs = {
+    "nome": nome,
+    "raca": raca,
+    "classe": classe,
+    "tema": tema or "não especificado"
+}
+# A ficha usa os números calculados localmente: o LLM só escreve a parte narrativa
+inputs.update(entradas_ficha(inputs, metodo))
+# Saídas guardadas na sessão: o que já foi gerado para estas entradas não roda de novo
+resultados = ResultadosSessao("dupla_exercicio", inputs)
+titulos = {"conceito": "🧩 Conceito", "ficha": "📜 Ficha", "descricao": "🎨 Descrição"}
+# Gerações anteriores (qualquer sessão) na barra lateral, mostradas sem chamar a API
+mostrar_historico(resultados.app, titulos)
+a_gerar = [] if modo_grupo else resultados.a_gerar(list(titulos), executar, refazer)
 
 # ------------------------------------------------------------
 # EXECUÇÃO PRINCIPAL
 # ------------------------------------------------------------
-if executar:
-    if not api_key or not nome or not raca or not classe:
-        st.error("Por favor, preencha o nome, raça, classe e informe a API key.")
+if executar and modo_grupo:
+    # Imports pesados só quando a geração é pedida (a tela abre sem esperar por eles)
+    from fila_jobs import FilaCheia, obter_fila
+    from grupo import ler_personagens, rodar_grupo
+
+    personagens, ignoradas = ler_personagens(lista_grupo)
+    if not api_key or not personagens:
+        st.error("Por favor, informe ao menos um personagem (nome, raça, classe) e a API key.")
         st.stop()
+    if ignoradas:
+        st.warning("Linhas ignoradas (faltou nome, raça ou classe): " + "; ".join(ignoradas))
 
-    # ------------------------------------------------------------
-    # CONFIGURAÇÃO DO MODELO DE LINGUAGEM
-    # ------------------------------------------------------------
-    llm = LLM(
-        model="groq/llama-3.1-8b-instant",  # Pode trocar por "gpt-4o-mini"
+    llm = obter_llm(
+        model="groq/llama-3.1-8b-instant",
         api_key=api_key,
-        temperature=0.7
+        usar_cache=not refazer,
+        temperature=0.7,
+        # Se o 8B estourar o limite ou a fila passar do SLO, a chamada vai para o 70B
+        reservas=reservas_de("groq/llama-3.1-8b-instant"),
+        slo_fila=SLO_FILA,
+        timeout=TEMPO_LIMITE,
     )
+    max_paralelo = None if paralelo else 1
 
     # ------------------------------------------------------------
-    # DEFINIÇÃO DOS AGENTES
+    # O GRUPO VIRA UM JOB NA FILA (a página só acompanha, como no modo individual)
     # ------------------------------------------------------------
-    agente_conceito = Agent(
-        role="Criador de Conceito de Personagem",
-        goal=(
-            "Criar um conceito único e interessante para um personagem de D&D "
-            "chamado {nome}, que é da raça {raca} e classe {classe}. "
-            "Deve descrever sua personalidade, motivações e um breve resumo da história."
-        ),
-        backstory=(
-            "Você é um mestre de RPG criativo que entende o equilíbrio entre narrativa e jogabilidade. "
-            "Seu trabalho é criar personagens cativantes e coerentes com o universo de D&D."
-        ),
-        llm=llm,
-        verbose=False
-    )
+    try:
+        job = obter_fila().submeter(
+            "dupla_grupo", lambda job: rodar_grupo(job, llm, personagens, por_chamada, max_paralelo, metodo)
+        )
+    except FilaCheia as erro:
+        st.error(f"🚦 Servidor ocupado ({erro}). Tente de novo em alguns segundos.")
+    else:
+        anterior = st.session_state.get(CHAVE_GRUPO)
+        if anterior and anterior["id"] and (job_anterior := obter_fila().obter(anterior["id"])):
+            job_anterior.desistir()
+        # Personagens prontos ficam na sessão: sobrevivem aos reruns e ao fim do job
+        st.session_state[CHAVE_GRUPO] = {
+            "id": job.id, "personagens": personagens, "prontos": {}, "erros": {}, "entregues": 0,
+        }
 
-    agente_ficha = Agent(
-        role="Construtor de Ficha de Personagem",
-        goal=(
-            "Gerar uma ficha básica de D&D 5e para o personagem {nome}, "
-            "incluindo atributos (FOR, DES, CON, INT, SAB, CAR), alinhamento, "
-            "equipamentos iniciais e habilidades de classe."
-        ),
-        backstory=(
-            "Você é um especialista em regras de D&D 5e e entende como montar fichas equilibradas "
-            "para personagens de qualquer nível e classe."
-        ),
-        llm=llm,
-        verbose=False
-    )
+if modo_grupo and st.session_state.get(CHAVE_GRUPO):
+    from fila_jobs import CANCELADO, NA_FILA, obter_fila
+    from grupo import formatar_personagem, montar_pacote
 
-    agente_descricao = Agent(
-        role="Descritor Artístico",
-        goal=(
-            "Gerar uma descrição física e visual do personagem {nome}, "
-            "incluindo aparência, vestimentas, expressões e estilo de fala. "
-            "O texto deve ser descritivo e inspirar arte conceitual."
-        ),
-        backstory=(
-            "Você é um ilustrador de fantasia acostumado a transformar palavras em imagens vívidas. "
-            "Você descreve personagens de forma que o leitor visualize claramente cada detalhe."
-        ),
-        llm=llm,
-        verbose=False
-    )
+    grupo = st.session_state[CHAVE_GRUPO]
+    personagens = grupo["personagens"]
+    job = obter_fila().obter(grupo["id"]) if grupo["id"] else None
+    concluidas = []
+    if job is not None:
+        job.visto_em = time.time()
+        concluidas = job.concluidas[:]
+        for indice, partes in concluidas[grupo["entregues"]:]:
+            if isinstance(partes, Exception):
+                grupo["erros"][indice] = str(partes)
+            else:
+                grupo["prontos"][indice] = partes
+        grupo["entregues"] = len(concluidas)
+        if job.estado == NA_FILA:
+            st.info(f"⏳ Na fila de geração: posição {obter_fila().posicao(job)}. As abas se preenchem quando começar.")
+        elif job.estado == CANCELADO:
+            st.warning("✖️ Geração cancelada.")
+        elif job.erro is not None:
+            st.error(f"🚫 Falha ao gerar o grupo: {job.erro}")
+        if not job.terminado:
+            st.button("✖️ Cancelar geração", key="cancelar_dupla_grupo", on_click=job.desistir)
+    gerando = job is not None and not job.terminado
 
     # ------------------------------------------------------------
-    # TAREFAS
+    # UMA ABA POR PERSONAGEM, PREENCHIDA QUANDO ELE FICA PRONTO
     # ------------------------------------------------------------
-    t_conceito = Task(
-        description="Crie o CONCEITO do personagem {nome} ({raca}, {classe}).",
-        agent=agente_conceito,
-        expected_output="Texto de 2 a 3 parágrafos descrevendo conceito e história."
-    )
+    abas = st.tabs([f"{i}. {p['nome']}" for i, p in enumerate(personagens, 1)])
+    for indice, aba in enumerate(abas):
+        with aba:
+            if indice in grupo["prontos"]:
+                st.markdown(formatar_personagem(personagens[indice], grupo["prontos"][indice]))
+            elif indice in grupo["erros"]:
+                st.error(f"🚫 Falha ao gerar este personagem: {grupo['erros'][indice]}")
+            elif gerando:
+                st.info("🧠 Gerando...")
+            else:
+                st.info("Não gerado. Clique no botão de gerar.")
+    prontos = len(grupo["prontos"]) + len(grupo["erros"])
+    if gerando:
+        st.progress(prontos / len(personagens), text=f"{prontos}/{len(personagens)} personagens")
+        job.esperar(INTERVALO, vistas=len(concluidas))
+        st.rerun()
 
-    t_ficha = Task(
-        description="Monte a FICHA de D&D 5e para {nome}, com atributos e informações básicas.",
-        agent=agente_ficha,
-        expected_output="Ficha de personagem em Markdown, com tabela de atributos e seções nomeadas."
-    )
+    if grupo["prontos"]:
+        st.download_button(
+            "⬇️ Baixar o grupo (Markdown)",
+            data=montar_pacote(personagens, grupo["prontos"]),
+            file_name="grupo_personagens.md",
+            mime="text/markdown",
+        )
 
-    t_descricao = Task(
-        description="Crie uma DESCRIÇÃO física e visual detalhada do personagem {nome}.",
-        agent=agente_descricao,
-        expected_output="Texto descritivo em tom literário curto (1-2 parágrafos)."
-    )
+    if job is not None:
+        # Job recém-terminado: medidas uma vez, e a sessão deixa de acompanhá-lo
+        grupo["id"] = None
+        rastro = job.rastro
+        if rastro is not None:
+            decorrido = max((rastro.fim or time.time()) - rastro.inicio, 1e-9)
+            # Chamadas que foram de fato à API (acertos de cache não contam; re-tentativas contam)
+            chamadas = sum(s.tentativas for s in rastro.spans if s.tipo == "llm" and not s.cache)
+            st.caption(
+                f"⚡ {len(grupo['prontos'])} personagens em {decorrido:.1f}s "
+                f"({len(grupo['prontos']) / decorrido * 60:.1f} por minuto) · "
+                f"{chamadas / len(personagens):.2f} chamadas à API por personagem"
+            )
+            mostrar_desempenho(rastro)
+
+        stats = obter_cache().estatisticas()
+        voos = obter_coalescedor().estatisticas()
+        st.caption(
+            f"💾 Cache: {stats['acertos']} acertos, {stats['falhas']} falhas ({stats['taxa_acerto']:.0%} de acerto)"
+            f" · 🔗 {voos['deduplicadas']} chamadas idênticas deduplicadas"
+        )
+        mostrar_chaves()
+
+if a_gerar:
+    if not api_key or not nome or not raca or not classe:
+        st.error("Por favor, preencha o nome, raça, classe e informe a API key.")
+        st.stop()
+
+    # Imports pesados só quando a geração é pedida (a tela abre sem esperar por eles)
+    from litellm.exceptions import RateLimitError
+    from equipes import montar_dupla
 
     # ------------------------------------------------------------
-    # ORGANIZAÇÃO DOS AGENTES (CREW)
+    # CONFIGURAÇÃO DO MODELO DE LINGUAGEM
     # ------------------------------------------------------------
-    crew = Crew(
-        agents=[agente_conceito, agente_ficha, agente_descricao],
-        tasks=[t_conceito, t_ficha, t_descricao],
-        process=Process.sequential
+    llm = obter_llm(
+        model="groq/llama-3.1-8b-instant",  # Pode trocar por "gpt-4o-mini"
+        api_key=api_key,
+        # "Gerar só esta aba de novo" também pula o cache (senão volta o mesmo texto)
+        usar_cache=not refazer and not resultados.pular_cache,
+        temperature=0.7,
+        # Se o 8B estourar o limite ou a fila passar do SLO, a chamada vai para o 70B
+        reservas=reservas_de("groq/llama-3.1-8b-instant"),
+        slo_fila=SLO_FILA,
+        timeout=TEMPO_LIMITE,
     )
 
     # ------------------------------------------------------------
-    # EXECUÇÃO COM SEGURANÇA E RETENTATIVA
+    # AGENTES E TAREFAS (definidos em equipes.py, compartilhados com o modo grupo)
+    # ------------------------------------------------------------
+    agents, tasks = montar_dupla(llm)
+    # max_tokens de cada tarefa tirado do tamanho que ela pede (orcamento.py)
+    aplicar_orcamentos(tasks)
+
+    # Só rodam as partes sem saída guardada para estas entradas (ex.: só a descrição)
+    tasks, prontas = resultados.preparar(tasks, a_gerar)
+    rodar = [t for t in tasks if id(t) not in prontas]
+    # Mede os prompts finais e, se ligado, compacta antes da geração
+    relatorio_prompts = compactar_prompts(agents, rodar, inputs, aplicar=compactar)
+
+    # ------------------------------------------------------------
+    # EXECUÇÃO NA FILA DE JOBS (cada aba é preenchida pela sua tarefa)
     # ------------------------------------------------------------
-    resultado = tentar_executar(crew, {
-        "nome": nome,
-        "raca": raca,
-        "classe": classe,
-        "tema": tema or "não especificado"
-    })
-
-    if resultado:
-        # Pausas pequenas para evitar rate limit durante leitura
-        time.sleep(2)
-        conceito_out = getattr(t_conceito, "output", "") or getattr(t_conceito, "result", "")
-        time.sleep(2)
-        ficha_out = getattr(t_ficha, "output", "") or getattr(t_ficha, "result", "")
-        time.sleep(2)
-        descricao_out = getattr(t_descricao, "output", "") or getattr(t_descricao, "result", "")
-
-        # Exibição organizada
-        aba1, aba2, aba3 = st.tabs(["🧩 Conceito", "📜 Ficha", "🎨 Descrição"])
-
-        with aba1:
-            st.markdown(conceito_out)
-
-        with aba2:
-            st.markdown(ficha_out)
-
-        with aba3:
-            st.markdown(descricao_out)
+    # Só a tarefa que falhou é repetida; as outras seguem normalmente.
+    # Sem espera fixa: o limitador já segura a chamada pelo tempo pedido pela API.
+    resultados.submeter(
+        agents, tasks, inputs, a_gerar,
+        extras={"prompts": relatorio_prompts},
+        max_paralelo=None if paralelo else 1,
+        tentativas=3, espera=0, repetir_em=(RateLimitError,),
+        devolver_erros=True,
+        transmitir=transmitir,
+        prontas=prontas,
+    )
+
+if not modo_grupo:
+    # Abas do job desta sessão (na fila, gerando ou recém-terminado) ou, sem job, as guardadas
+    job = resultados.acompanhar(titulos, transmitir)
+    if job is None:
+        if any(resultados.ultima(parte) for parte in titulos):
+            resultados.abas(titulos)
+    elif job.rastro is not None:
+        resultados.arquivar(titulos, job)
+        mostrar_desempenho(job.rastro)
+        mostrar_prompts(job.extras["prompts"])
+
+        stats = obter_cache().estatisticas()
+        voos = obter_coalescedor().estatisticas()
+        st.caption(
+            f"💾 Cache: {stats['acertos']} acertos, {stats['falhas']} falhas ({stats['taxa_acerto']:.0%} de acerto)"
+            f" · 🔗 {voos['deduplicadas']} chamadas idênticas deduplicadas"
+        )
+        mostrar_chaves()
+
+# Com a tela já desenhada, importa crewai/litellm uma vez por processo
+aquecer()
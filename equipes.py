@@ -0,0 +1,525 @@
+# ------------------------------------------------------------
+# 👥 Equipes (agentes + tarefas) reaproveitadas fora da interface
+# ------------------------------------------------------------
+# As definições do aula_p.py e do dupla_exercicio.py ficam aqui para que
+# os apps e os modos em lote (lote_aula.py, grupo.py) montem exatamente os
+# mesmos agentes e tarefas.
+# ------------------------------------------------------------
+import re
+
+from crewai import Agent, Task
+from crewai.tasks.task_output import TaskOutput
+from pydantic import PrivateAttr
+
+from regras_dnd import renderizar_ficha
+
+# Linha que separa exercícios e respostas no modo fundido (tolerante a negrito/cabeçalho)
+MARCADOR_GABARITO = "=== GABARITO ==="
+_MARCADOR_GABARITO = re.compile(r"^[#*\s]*=+\s*GABARITO\s*=+[*\s]*$", re.M | re.I)
+_INICIO_MARCADOR = re.compile(r"^[#*\s]*=", re.M)
+# Títulos de seção (##, não ###) do núcleo do modo vários níveis
+_SECAO = re.compile(r"^##(?!#)\s*(.+?)\s*$", re.M)
+
+# O que vai para a aba "Gabarito" se o modelo não separou as respostas
+SEM_GABARITO = "⚠️ O modelo não devolveu o gabarito separado. Use “Gerar só esta aba de novo”."
+
+
+def separar_gabarito(texto):
+    """Divide a resposta do modo fundido em (exercícios, gabarito); sem o marcador, o gabarito vem vazio."""
+    partes = _MARCADOR_GABARITO.split(texto, maxsplit=1)
+    if len(partes) < 2:
+        return texto.strip(), ""
+    return partes[0].strip(), partes[1].strip()
+
+
+def recortar_secoes(texto, secoes):
+    """Só as seções `secoes` (títulos ## do Markdown) do texto, na ordem dele; sem nenhuma delas, o texto inteiro."""
+    partes = _SECAO.split(texto or "")  # [antes, título 1, corpo 1, título 2, corpo 2...]
+    escolhidas = [
+        f"## {titulo}\n{corpo.strip()}"
+        for titulo, corpo in zip(partes[1::2], partes[2::2])
+        if any(titulo.strip("*# ").lower().startswith(secao.lower()) for secao in secoes)
+    ]
+    return "\n\n".join(escolhidas) or texto
+
+
+class TarefaComRecorte(Task):
+    """
+    Tarefa que recebe do context só algumas seções (ex.: os Cenários do núcleo
+    no modo vários níveis): menos tokens de entrada em cada adaptação.
+    Sem `recorte`, o context vai inteiro.
+    """
+
+    recorte: tuple = ()
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        if self.recorte and context:
+            context = recortar_secoes(context, self.recorte)
+        return super().execute_sync(agent=agent, context=context, tools=tools)
+
+
+class TarefaFicha(Task):
+    """
+    Tarefa da ficha de D&D: o LLM devolve só o JSON dos campos narrativos e a
+    ficha em Markdown é montada localmente (regras_dnd.py) com as entradas do
+    personagem, guardadas na interpolação. `output.raw` já sai renderizado.
+    """
+
+    _personagem: dict = PrivateAttr(default_factory=dict)
+
+    def interpolate_inputs_and_add_conversation_history(self, inputs):
+        super().interpolate_inputs_and_add_conversation_history(inputs)
+        if inputs:  # o executar_dag interpola de novo, sem inputs, o que já veio interpolado
+            self._personagem = dict(inputs)
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        saida = super().execute_sync(agent=agent, context=context, tools=tools)
+        saida.raw = renderizar_ficha(self._personagem, saida.raw)
+        return saida
+
+    def parcial_visivel(self, texto):
+        # O JSON cru não vai para a aba: ela fica em "Gerando..." até a ficha ser montada
+        return ""
+
+
+class TarefaExerciciosComGabarito(TarefaComRecorte):
+    """
+    Exercícios e gabarito numa única chamada ao LLM (modo fundido). A resposta
+    é dividida no MARCADOR_GABARITO: `output.raw` fica só com os exercícios e as
+    respostas ficam guardadas para a TarefaGabaritoLocal que depende desta.
+    """
+
+    _gabarito: str = PrivateAttr(default="")
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        saida = super().execute_sync(agent=agent, context=context, tools=tools)
+        saida.raw, self._gabarito = separar_gabarito(saida.raw)
+        return saida
+
+    def parcial_visivel(self, texto):
+        # Enquanto o modelo escreve, as respostas não aparecem na aba dos exercícios
+        return _INICIO_MARCADOR.split(texto, maxsplit=1)[0].rstrip()
+
+    @property
+    def gabarito(self):
+        return self._gabarito
+
+    def ponto_de_retomada(self):
+        # O ponto leva também as respostas: a TarefaGabaritoLocal ainda pode precisar delas
+        return f"{self.output.raw}\n\n{MARCADOR_GABARITO}\n\n{self._gabarito}"
+
+    def retomar(self, texto):
+        exercicios, self._gabarito = separar_gabarito(texto)
+        return exercicios
+
+
+class TarefaGabaritoLocal(Task):
+    """Gabarito do modo fundido: sem chamada ao LLM, só as respostas separadas da tarefa do context."""
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        self.output = TaskOutput(
+            name=self.name, description=self.description, expected_output=self.expected_output,
+            raw=self.context[0].gabarito or SEM_GABARITO, agent="local",
+        )
+        return self.output
+
+
+def fundir_gabarito(t_exercicios, t_gabarito, pedido, itens):
+    """
+    Troca o par exercícios → gabarito (duas chamadas, o gabarito recebe os exercícios
+    como context) por uma só chamada que devolve os dois, separados localmente.
+    - t_exercicios, t_gabarito: as Task do modo normal (o agente do gabarito sai)
+    - pedido: o que os exercícios devem ser, sem o "não inclua respostas" da tarefa
+      normal (ex.: "Crie 3 exercícios simples sobre {tema} em PT-BR. Varie formatos.")
+    - itens: quantos exercícios (numera os exercícios e as respostas)
+    Devolve (t_exercicios, t_gabarito) do modo fundido, com os mesmos `name`.
+    """
+    # Descrição própria: a da tarefa normal proíbe respostas, e o modelo que
+    # obedece a ela deixa o gabarito de fora
+    fundida = TarefaExerciciosComGabarito(
+        description=(
+            "EXERCÍCIOS E GABARITO\n"
+            f"{pedido} Entregue os enunciados em lista numerada (1 a {itens}) em Markdown.\n"
+            f"Depois dos exercícios, escreva a linha {MARCADOR_GABARITO} e as respostas dos itens 1–{itens}, "
+            "em lista numerada: para cada item, **Resposta:** (letra/valor/solução) e "
+            "**Comentário:** justificativa breve (1–2 frases)."
+        ),
+        name=t_exercicios.name,
+        agent=t_exercicios.agent,
+        expected_output=(
+            f"Lista numerada (1–{itens}) com os exercícios, a linha {MARCADOR_GABARITO} "
+            f"e a lista numerada (1–{itens}) com resposta e comentário por exercício."
+        ),
+        context=t_exercicios.context,
+        recorte=getattr(t_exercicios, "recorte", ()),
+    )
+    local = TarefaGabaritoLocal(
+        description="GABARITO (respostas separadas da resposta dos exercícios, sem chamada ao LLM)",
+        name=t_gabarito.name,
+        expected_output=t_gabarito.expected_output,
+        context=[fundida],
+    )
+    return fundida, local
+
+
+def montar_aula_p(llm, mostrar_gabarito=True, fundido=False):
+    """
+    Agentes e tarefas do aula_p.py.
+    - llm: modelo usado por todos os agentes
+    - mostrar_gabarito: inclui o agente/tarefa de gabarito
+    - fundido: exercícios e gabarito numa só chamada (ver fundir_gabarito)
+    Devolve (agents, tasks) na ordem resumo, exemplos, exercicios[, gabarito].
+    """
+    # ---------------------------
+    # Agentes
+    # ---------------------------
+    agente_resumo = Agent(
+        role="Redator(a) de Resumo Didático",
+        goal=(
+            "Escrever um RESUMO claro e didático sobre {tema} para o público {nivel}, "
+            "alinhado ao objetivo {objetivo}. "
+            "A linguagem deve ser direta, com contexto prático e sem jargões desnecessários."
+        ),
+        backstory="Você transforma temas técnicos/Acadêmicos em explicações curtas e precisas.",
+        llm=llm, verbose=False
+    )
+
+    agente_exemplos = Agent(
+        role="Criador(a) de Exemplos Contextualizados",
+        goal=(
+            "Gerar 4 EXEMPLOS CURTOS sobre {tema}, cada um com contexto realista. "
+            "Cada exemplo com título (em negrito), cenário, dados (se houver), aplicação e resultado."
+        ),
+        backstory="Você mostra o conceito em ação com exemplos breves e concretos.",
+        llm=llm, verbose=False
+    )
+
+    agente_exercicios = Agent(
+        role="Autor(a) de Exercícios Práticos",
+        goal=(
+            "Criar 3 EXERCÍCIOS SIMPLES sobre {tema}. "
+            "Variar formato (múltipla escolha, V/F, completar, resolução curta). "
+            # No modo fundido a mesma chamada escreve o gabarito, depois dos exercícios
+            + ("Enunciados claros; respostas só no gabarito, depois dos enunciados." if mostrar_gabarito and fundido
+               else "Enunciados claros. NÃO incluir respostas.")
+        ),
+        backstory="Você cria atividades rápidas que fixam os conceitos essenciais.",
+        llm=llm, verbose=False
+    )
+
+    # Opcional: agente de gabarito (só se toggle estiver ligado)
+    if mostrar_gabarito:
+        agente_gabarito = Agent(
+            role="Revisor(a) e Gabaritador(a)",
+            goal=(
+                "Ler os EXERCÍCIOS sobre {tema} e produzir o GABARITO oficial, "
+                "com respostas corretas e justificativa breve (1–2 frases) por item."
+            ),
+            backstory="Você confere consistência e explica rapidamente o porquê da resposta.",
+            llm=llm, verbose=False
+        )
+
+    # ---------------------------
+    # Tarefas
+    # ---------------------------
+    t_resumo = Task(
+        description=(
+            "RESUMO\n"
+            "Escreva em PT-BR um resumo didático sobre {tema} para o nível {nivel} e objetivo {objetivo}. "
+            "Inclua: definição (2–3 frases), por que importa (1–2), onde se aplica (1–2) e 3–5 ideias-chave em bullets. "
+            "150–220 palavras. Formate em Markdown com título."
+        ),
+        name="resumo",
+        agent=agente_resumo,
+        expected_output="Resumo em Markdown com título, parágrafos curtos e 3–5 bullets."
+    )
+
+    t_exemplos = Task(
+        description=(
+            "EXEMPLOS\n"
+            "Produza 4 exemplos curtos e contextualizados sobre {tema}. "
+            "Padrão (até 5 linhas cada): **Título**; cenário; dados/entrada; como aplicar (1–2 frases); resultado."
+        ),
+        name="exemplos",
+        agent=agente_exemplos,
+        expected_output="Lista numerada (1–4) em Markdown com exemplos curtos e completos."
+    )
+
+    pedido_exercicios = "Crie 3 exercícios simples sobre {tema} em PT-BR."
+    t_exercicios = Task(
+        description=(
+            "EXERCÍCIOS\n"
+            f"{pedido_exercicios} "
+            "Varie formatos e não inclua respostas. "
+            "Entregue lista numerada (1 a 3) em Markdown."
+        ),
+        name="exercicios",
+        agent=agente_exercicios,
+        expected_output="Lista numerada (1–3) com exercícios simples, sem respostas."
+    )
+
+    # Tarefa de gabarito condicionada
+    if mostrar_gabarito:
+        t_gabarito = Task(
+            description=(
+                "GABARITO\n"
+                "Com base nos EXERCÍCIOS fornecidos no contexto, produza as respostas corretas dos itens 1–3. "
+                "Para cada item, dê:\n"
+                "- **Resposta:** (letra/valor/solução) \n"
+                "- **Comentário:** justificativa breve e direta (1–2 frases), citando o conceito-chave.\n"
+                "Formato: lista numerada (1 a 3) em Markdown."
+            ),
+            name="gabarito",
+            agent=agente_gabarito,
+            expected_output="Lista numerada (1–3) com resposta e comentário por exercício.",
+            context=[t_exercicios]
+        )
+
+    # ---------------------------
+    # Ordem de execução
+    # ---------------------------
+    agents = [agente_resumo, agente_exemplos, agente_exercicios]
+    tasks = [t_resumo, t_exemplos, t_exercicios]
+    if mostrar_gabarito and fundido:
+        tasks[2:] = fundir_gabarito(t_exercicios, t_gabarito, f"{pedido_exercicios} Varie formatos.", 3)
+    elif mostrar_gabarito:
+        agents.append(agente_gabarito)
+        tasks.append(t_gabarito)
+
+    return agents, tasks
+
+
+def montar_aula_niveis(llm, quantos, mostrar_gabarito=True, fundido=False):
+    """
+    Agentes e tarefas do modo vários níveis do aula_p.py: um núcleo comum
+    (conceitos, cenários e ideias de exercício, sem nível) gerado uma vez e,
+    para cada nível, resumo, exemplos e exercícios adaptados desse núcleo.
+    - llm: modelo usado por todos os agentes (o rotear_variantes troca depois)
+    - quantos: número de níveis; o nível i vem da entrada {nivel_i}
+    - mostrar_gabarito, fundido: como no montar_aula_p, por nível
+    Devolve (agents, tasks): nucleo e, por nível, resumo_i, exemplos_i, exercicios_i[, gabarito_i].
+    """
+    agente_nucleo = Agent(
+        role="Planejador(a) de Material Didático",
+        goal="Reunir o conteúdo essencial sobre {tema}, alinhado ao objetivo {objetivo}, para ser adaptado a vários públicos.",
+        backstory="Você separa o que é conteúdo do que é adaptação ao público.",
+        llm=llm, verbose=False
+    )
+    t_nucleo = Task(
+        description=(
+            "NÚCLEO\n"
+            "Prepare em PT-BR o núcleo do material sobre {tema}, objetivo {objetivo}, sem escrever para um público específico. "
+            "Use três seções em Markdown: ## Conceitos (definição em 2–3 frases e 5 ideias-chave em bullets), "
+            "## Cenários (4 cenários de exemplo, com título, dados e resultado) e "
+            "## Exercícios (3 ideias de exercício com formatos variados, sem respostas)."
+        ),
+        name="nucleo",
+        agent=agente_nucleo,
+        expected_output="Markdown com as seções Conceitos, Cenários e Exercícios."
+    )
+
+    agents, tasks = [agente_nucleo], [t_nucleo]
+    for i in range(1, quantos + 1):
+        nivel = f"{{nivel_{i}}}"
+        pedido_exercicios = (
+            f"A partir das ideias de exercício do NÚCLEO, escreva 3 exercícios sobre {{tema}} na dificuldade do público {nivel}."
+        )
+        # Cada adaptação depende só do núcleo (os níveis rodam ao mesmo tempo) e recebe
+        # dele só as seções que usa
+        # (parte, papel, descrição, saída esperada, seções do núcleo que ela recebe)
+        adaptacoes = [
+            ("resumo", "Adaptador(a) de Resumo", (
+                f"RESUMO ({nivel})\n"
+                f"Com base no NÚCLEO do contexto, escreva em PT-BR um resumo didático sobre {{tema}} para o público {nivel}: "
+                "definição, por que importa, onde se aplica e 3–5 ideias-chave em bullets, no vocabulário desse público. "
+                "150–220 palavras. Formate em Markdown com título."
+            ), "Resumo em Markdown com título, parágrafos curtos e 3–5 bullets.", ("Conceitos",)),
+            ("exemplos", "Adaptador(a) de Exemplos", (
+                f"EXEMPLOS ({nivel})\n"
+                f"Reescreva os 4 cenários do NÚCLEO para o público {nivel}. "
+                "Padrão (até 5 linhas cada): **Título**; cenário; dados/entrada; como aplicar (1–2 frases); resultado."
+            ), "Lista numerada (1–4) em Markdown com exemplos curtos e completos.", ("Cenários",)),
+            ("exercicios", "Adaptador(a) de Exercícios", (
+                f"EXERCÍCIOS ({nivel})\n"
+                f"{pedido_exercicios} "
+                "Varie formatos e não inclua respostas. Entregue lista numerada (1 a 3) em Markdown."
+            ), "Lista numerada (1–3) com exercícios, sem respostas.", ("Conceitos", "Exercícios")),
+        ]
+        nivel_tarefas = {}
+        for nome, papel, descricao, saida, secoes in adaptacoes:
+            agente = Agent(
+                role=papel,
+                goal=f"Adaptar o núcleo do material sobre {{tema}} ao público {nivel}.",
+                backstory="Você ajusta vocabulário, profundidade e dificuldade sem mudar o conteúdo.",
+                llm=llm, verbose=False
+            )
+            nivel_tarefas[nome] = TarefaComRecorte(
+                description=descricao, name=f"{nome}_{i}", agent=agente, expected_output=saida,
+                context=[t_nucleo], recorte=secoes,
+            )
+            agents.append(agente)
+        tasks += nivel_tarefas.values()
+
+        if mostrar_gabarito:
+            agente_gabarito = Agent(
+                role="Revisor(a) e Gabaritador(a)",
+                goal=f"Produzir o gabarito dos exercícios sobre {{tema}} para o público {nivel}.",
+                backstory="Você confere consistência e explica rapidamente o porquê da resposta.",
+                llm=llm, verbose=False
+            )
+            t_gabarito = Task(
+                description=(
+                    f"GABARITO ({nivel})\n"
+                    "Com base nos EXERCÍCIOS fornecidos no contexto, produza as respostas corretas dos itens 1–3. "
+                    "Para cada item, dê **Resposta:** (letra/valor/solução) e **Comentário:** justificativa breve (1–2 frases). "
+                    "Formato: lista numerada (1 a 3) em Markdown."
+                ),
+                name=f"gabarito_{i}",
+                agent=agente_gabarito,
+                expected_output="Lista numerada (1–3) com resposta e comentário por exercício.",
+                context=[nivel_tarefas["exercicios"]]
+            )
+            if fundido:
+                tasks[-1:] = fundir_gabarito(
+                    nivel_tarefas["exercicios"], t_gabarito, f"{pedido_exercicios} Varie formatos.", 3
+                )
+            else:
+                agents.append(agente_gabarito)
+                tasks.append(t_gabarito)
+
+    return agents, tasks
+
+
+def montar_dupla(llm):
+    """
+    Agentes e tarefas do dupla_exercicio.py (um personagem).
+    - llm: modelo usado por todos os agentes
+    Devolve (agents, tasks) na ordem conceito, ficha, descricao.
+    """
+    # ------------------------------------------------------------
+    # DEFINIÇÃO DOS AGENTES
+    # ------------------------------------------------------------
+    agente_conceito = Agent(
+        role="Criador de Conceito de Personagem",
+        goal=(
+            "Criar um conceito único e interessante para um personagem de D&D "
+            "chamado {nome}, que é da raça {raca} e classe {classe}. "
+            "Deve descrever sua personalidade, motivações e um breve resumo da história."
+        ),
+        backstory=(
+            "Você é um mestre de RPG criativo que entende o equilíbrio entre narrativa e jogabilidade. "
+            "Seu trabalho é criar personagens cativantes e coerentes com o universo de D&D."
+        ),
+        llm=llm,
+        verbose=False
+    )
+
+    agente_ficha = Agent(
+        role="Construtor de Ficha de Personagem",
+        goal=(
+            "Preencher a parte narrativa da ficha de D&D 5e do personagem {nome}: "
+            "alinhamento, antecedente e traços de personalidade coerentes com os atributos."
+        ),
+        backstory=(
+            "Você é um especialista em regras de D&D 5e e entende como montar fichas equilibradas "
+            "para personagens de qualquer nível e classe."
+        ),
+        llm=llm,
+        verbose=False
+    )
+
+    agente_descricao = Agent(
+        role="Descritor Artístico",
+        goal=(
+            "Gerar uma descrição física e visual do personagem {nome}, "
+            "incluindo aparência, vestimentas, expressões e estilo de fala. "
+            "O texto deve ser descritivo e inspirar arte conceitual."
+        ),
+        backstory=(
+            "Você é um ilustrador de fantasia acostumado a transformar palavras em imagens vívidas. "
+            "Você descreve personagens de forma que o leitor visualize claramente cada detalhe."
+        ),
+        llm=llm,
+        verbose=False
+    )
+
+    # ------------------------------------------------------------
+    # TAREFAS
+    # ------------------------------------------------------------
+    t_conceito = Task(
+        description="Crie o CONCEITO do personagem {nome} ({raca}, {classe}).",
+        name="conceito",
+        agent=agente_conceito,
+        expected_output="Texto de 2 a 3 parágrafos descrevendo conceito e história."
+    )
+
+    # Atributos, PV, CA e equipamento são calculados em regras_dnd.py; o LLM só
+    # escreve os campos narrativos, em JSON (a ficha em Markdown é montada localmente)
+    t_ficha = TarefaFicha(
+        description=(
+            "Complete a FICHA de D&D 5e de {nome} ({raca}, {classe}, tema {tema}). "
+            "Os números já estão calculados: {atributos}. "
+            "Responda só com um objeto JSON, sem Markdown, com frases curtas em PT-BR:\n"
+            '{"alinhamento": "", "antecedente": "", "personalidade": "", "ideal": "", "vinculo": "", "defeito": ""}'
+        ),
+        name="ficha",
+        agent=agente_ficha,
+        expected_output="Um objeto JSON com alinhamento, antecedente, personalidade, ideal, vinculo e defeito."
+    )
+
+    t_descricao = Task(
+        description="Crie uma DESCRIÇÃO física e visual detalhada do personagem {nome}.",
+        name="descricao",
+        agent=agente_descricao,
+        expected_output="Texto descritivo em tom literário curto (1-2 parágrafos)."
+    )
+
+    return [agente_conceito, agente_ficha, agente_descricao], [t_conceito, t_ficha, t_descricao]
+
+
+def montar_grupo(llm):
+    """
+    Agente e tarefa que criam vários personagens numa única chamada (modo grupo).
+    - llm: modelo usado pelo agente
+    A tarefa recebe {personagens} (uma linha por personagem) e responde com
+    marcadores "=== PERSONAGEM: ... ===" e "--- PARTE ---", que o grupo.py separa.
+    Devolve (agente, tarefa).
+    """
+    agente_mestre = Agent(
+        role="Mestre de RPG e Criador de Grupos",
+        goal=(
+            "Criar vários personagens de D&D 5e de uma vez, cada um com conceito, "
+            "dados narrativos da ficha e descrição física, mantendo cada personagem único e coerente."
+        ),
+        backstory=(
+            "Você é um mestre de RPG experiente que prepara grupos de aventureiros e NPCs inteiros "
+            "para as mesas de jogo, dominando tanto a narrativa quanto as regras de D&D 5e."
+        ),
+        llm=llm,
+        verbose=False
+    )
+
+    t_grupo = Task(
+        description=(
+            "Crie os personagens de D&D 5e abaixo (nome | raça | classe | tema):\n"
+            "{personagens}\n\n"
+            "Para CADA personagem, escreva três partes:\n"
+            "- CONCEITO: 2 a 3 parágrafos com personalidade, motivações e um breve resumo da história.\n"
+            "- FICHA: só um objeto JSON, sem Markdown (atributos e equipamento são calculados à parte):\n"
+            '  {"alinhamento": "", "antecedente": "", "personalidade": "", "ideal": "", "vinculo": "", "defeito": ""}\n'
+            "- DESCRIÇÃO: 1 a 2 parágrafos literários com aparência, vestimentas, expressões e estilo de fala.\n\n"
+            "Use exatamente estes marcadores, cada um sozinho na sua linha, na ordem da lista:\n"
+            "=== PERSONAGEM: <nome> ===\n"
+            "--- CONCEITO ---\n"
+            "--- FICHA ---\n"
+            "--- DESCRIÇÃO ---"
+        ),
+        name="grupo",
+        agent=agente_mestre,
+        expected_output=(
+            "Um bloco por personagem, começando em '=== PERSONAGEM: <nome> ===', "
+            "com as seções '--- CONCEITO ---', '--- FICHA ---' e '--- DESCRIÇÃO ---'."
+        )
+    )
+
+    return agente_mestre, t_grupo
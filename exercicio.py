@@ -1,10 +1,19 @@
 # ------------------------------------------------------------
 # 📘 Agentes de IA para ensinar GML (versão com controle de erros)
 # ------------------------------------------------------------
-import os
 import streamlit as st
-from crewai import Agent, Task, Crew, Process, LLM
-from litellm.exceptions import RateLimitError  # Importa o tipo de erro que ocorre com limite de tokens
+from cache_respostas import obter_cache
+from chaves import mostrar_chaves, obter_pool
+from coalescencia import obter_coalescedor
+from rastreamento import mostrar_desempenho
+from prompts import compactar_prompts, mostrar_prompts
+from recursos import aquecer, obter_llm
+from orcamento import aplicar_orcamentos
+from roteamento import SLO_FILA, TEMPO_LIMITE, reservas_de, rotear
+from sessao import ResultadosSessao
+from historico import mostrar_historico
+from cache_semantico import LIMIAR_PADRAO
+from antecipacao import Antecipacao, mostrar_estatisticas
 
 # ------------------------------------------------------------
 # INTERFACE STREAMLIT
@@ -16,14 +25,55 @@ tema = st.text_input("Tema de estudo", placeholder="Ex.: variáveis, loops, even
 nivel = st.text_input("Nível do público (opcional)", placeholder="Ex.: iniciante, intermediário, avançado")
 objetivo = st.text_area("Objetivo (opcional)", placeholder="Ex.: entender a lógica da GML e aplicar em scripts simples")
 
-executar = st.button("Gerar material sobre GML")
+# Ligado: ignora respostas guardadas e pede tudo de novo à API
+refazer = st.toggle("Ignorar cache e gerar de novo", value=False)
+# Mostra o texto de cada aba enquanto o modelo escreve
+transmitir = st.toggle("Mostrar o texto enquanto é gerado", value=True)
+# Tira dos goals dos agentes o que as tarefas já pedem (menos tokens de entrada por chamada)
+compactar = st.toggle("Compactar prompts (menos tokens de entrada)", value=True)
+# Resumo no modelo pequeno; exemplos de código no grande
+rotear_modelos = st.toggle("Escolher o modelo de cada tarefa (rápido/forte)", value=True)
+# Serve o material de um pedido parecido ("Algoritmos" ≈ "algoritimos") sem chamar o modelo
+reaproveitar = st.toggle("Reaproveitar material de pedidos parecidos (cache semântico)", value=False)
+if reaproveitar:
+    limiar = st.slider("Semelhança mínima para reaproveitar", min_value=0.5, max_value=1.0,
+                       value=LIMIAR_PADRAO, step=0.01)
+# Enquanto o formulário é preenchido, gera em segundo plano o que as entradas já permitem
+antecipar = st.toggle("Antecipar a geração enquanto o formulário é preenchido", value=False)
 
-api_key = ""  # Substitua pela sua chave Groq válida
+executar = st.button("Gerar material sobre GML")
 
-if executar:
-    if not api_key or not tema:
-        st.error("Por favor, informe a API key e o tema de estudo.")
-        st.stop()
+api_key = obter_pool().principal  # GROQ_API_KEY (e, para mais vazão, GROQ_API_KEYS: ver chaves.py)
+
+# Espaços sobrando não mudam o pedido ("Algoritmos " e "Algoritmos" viram o mesmo prompt)
+tema, nivel, objetivo = (" ".join(campo.split()) for campo in (tema, nivel, objetivo))
+inputs = {
+    "tema": tema,
+    "nivel": nivel or "não informado",
+    "objetivo": objetivo or "não informado",
+}
+# Saídas guardadas na sessão: o que já foi gerado para estas entradas não roda de novo
+resultados = ResultadosSessao("exercicio", inputs)
+titulos = {"resumo": "Resumo", "exemplos": "Exemplos"}
+# Gerações anteriores (qualquer sessão) na barra lateral, mostradas sem chamar a API
+mostrar_historico(resultados.app, titulos)
+a_gerar = resultados.a_gerar(list(titulos), executar, refazer)
+if reaproveitar and not refazer:
+    a_gerar = resultados.reaproveitar_parecido(list(titulos), a_gerar, limiar)
+
+# O que a antecipação já gerou para estas entradas vai direto para as abas; o que
+# ainda está no ar é adotado pela geração (origem/adotadas)
+origem, adotadas = None, []
+if antecipar and not refazer:
+    antecipacao = Antecipacao(resultados)
+    if a_gerar and not resultados.pular_cache:
+        origem, adotadas = antecipacao.aproveitar(a_gerar)
+
+
+def montar_tarefas(usar_cache=True):
+    """Agentes e tarefas com o LLM e as opções da tela (geração e antecipação)."""
+    # Imports pesados só quando a geração é pedida (a tela abre sem esperar por eles)
+    from crewai import Agent, Task
 
     # ------------------------------------------------------------
     # MODELO DE LINGUAGEM
@@ -31,10 +81,15 @@ if executar:
     # Alteramos o modelo para uma versão mais leve: "groq/llama-3.1-8b-instant"
     # Essa versão consome menos tokens e responde mais rápido.
     # ------------------------------------------------------------
-    llm = LLM(
+    llm = obter_llm(
         model="groq/llama-3.1-8b-instant",
         api_key=api_key,
-        temperature=0.3
+        usar_cache=usar_cache,
+        temperature=0.3,
+        # Se o 8B estourar o limite ou a fila passar do SLO, a chamada vai para o 70B
+        reservas=reservas_de("groq/llama-3.1-8b-instant"),
+        slo_fila=SLO_FILA,
+        timeout=TEMPO_LIMITE,
     )
 
     # ------------------------------------------------------------
@@ -81,6 +136,7 @@ if executar:
             "e 3–5 pontos-chave em forma de lista. "
             "Formato: Markdown com título e subtítulos."
         ),
+        name="resumo",
         agent=agente_resumo,
         expected_output="Texto em Markdown com título e lista de tópicos."
     )
@@ -91,6 +147,7 @@ if executar:
             "Cada exemplo deve ter: **título**, breve descrição e código GML formatado. "
             "Mostre o código entre blocos Markdown com ```gml```."
         ),
+        name="exemplos",
         agent=agente_exemplos,
         expected_output="Lista numerada (1–3) com exemplos curtos, cada um com explicação e código."
     )
@@ -98,41 +155,81 @@ if executar:
     # ------------------------------------------------------------
     # CREW (Orquestração dos agentes)
     # ------------------------------------------------------------
-    crew = Crew(
-        agents=[agente_resumo, agente_exemplos],
-        tasks=[t_resumo, t_exemplos],
-        process=Process.sequential
-    )
+    if rotear_modelos:
+        # Código GML precisa estar certo: exemplos vão para o modelo forte
+        rotear([t_resumo, t_exemplos], llm, niveis={"resumo": "rapido", "exemplos": "forte"})
+    # max_tokens do resumo tirado do tamanho que ele pede; os exemplos com código não dizem tamanho
+    aplicar_orcamentos([t_resumo, t_exemplos])
+    return [agente_resumo, agente_exemplos], [t_resumo, t_exemplos]
 
-    # ------------------------------------------------------------
-    # EXECUÇÃO SEGURA (com tratamento de RateLimitError)
-    # ------------------------------------------------------------
-    try:
-        # Tenta rodar o processo normalmente
-        crew.kickoff(inputs={
-            "tema": tema,
-            "nivel": nivel or "não informado",
-            "objetivo": objetivo or "não informado",
-        })
 
-        # Coleta as saídas de cada tarefa
-        resumo_out = getattr(t_resumo, "output", None) or getattr(t_resumo, "result", "") or ""
-        exemplos_out = getattr(t_exemplos, "output", None) or getattr(t_exemplos, "result", "") or ""
+def montar_antecipadas():
+    agents, tasks = montar_tarefas()
+    compactar_prompts(agents, tasks, inputs, aplicar=compactar)
+    return agents, tasks
 
-        # Mostra as abas no Streamlit
-        aba_resumo, aba_exemplos = st.tabs(["Resumo", "Exemplos"])
 
-        with aba_resumo:
-            st.markdown(resumo_out)
+if a_gerar:
+    if not api_key or not tema:
+        st.error("Por favor, informe a API key e o tema de estudo.")
+        st.stop()
 
-        with aba_exemplos:
-            st.markdown(exemplos_out)
+    # "Gerar só esta aba de novo" e "gerar do zero" também pulam o cache (senão volta o mesmo texto)
+    agents, tasks = montar_tarefas(usar_cache=not refazer and not resultados.pular_cache)
 
-    except RateLimitError as e:
+    # ------------------------------------------------------------
+    # EXECUÇÃO (erros, inclusive RateLimitError, aparecem quando o job termina)
+    # ------------------------------------------------------------
+    # Só rodam as tarefas sem saída guardada para estas entradas
+    tasks, prontas = resultados.preparar(tasks, a_gerar)
+    rodar = [t for t in tasks if id(t) not in prontas]
+    # Mede os prompts finais e, se ligado, compacta antes da geração
+    relatorio_prompts = compactar_prompts(agents, rodar, inputs, aplicar=compactar)
+
+    # A geração vai para a fila de jobs do processo (fila_jobs.py); esta página só
+    # acompanha. Resumo e exemplos são independentes e escrevem ao mesmo tempo
+    resultados.submeter(
+        agents, tasks, inputs, a_gerar,
+        extras={"prompts": relatorio_prompts},
+        transmitir=transmitir,
+        prontas=prontas,
+        origem=origem,
+        adotadas=adotadas,
+    )
+elif antecipar and not refazer and api_key and tema and resultados.job_atual() is None:
+    antecipacao.agendar(list(titulos), montar_antecipadas)
+
+# Abas do job desta sessão (na fila, gerando ou recém-terminado) ou, sem job, as guardadas
+job = resultados.acompanhar(titulos, transmitir)
+if job is None:
+    if any(resultados.ultima(nome) for nome in titulos):
+        resultados.abas(titulos)
+elif job.rastro is not None:
+    from litellm.exceptions import RateLimitError  # Importa o tipo de erro que ocorre com limite de tokens
+
+    if isinstance(job.erro, RateLimitError):
         # Se o limite de tokens for atingido, exibe mensagem amigável
         st.error("🚫 Limite de requisições da API atingido. Tente novamente em alguns segundos.")
         st.info("Dica: use um modelo menor ou aguarde 5–10 segundos antes de tentar novamente.")
+    elif job.erro is not None:
+        # Qualquer outro erro inesperado
+        st.error(f"Ocorreu um erro inesperado: {job.erro}")
+
+    # Material completo e novo entra no índice semântico (outras sessões podem reaproveitar)
+    resultados.indexar(titulos)
+    resultados.arquivar(titulos, job)
+    mostrar_desempenho(job.rastro)
+    mostrar_prompts(job.extras["prompts"])
+
+    stats = obter_cache().estatisticas()
+    voos = obter_coalescedor().estatisticas()
+    st.caption(
+        f"💾 Cache: {stats['acertos']} acertos, {stats['falhas']} falhas ({stats['taxa_acerto']:.0%} de acerto)"
+        f" · 🔗 {voos['deduplicadas']} chamadas idênticas deduplicadas"
+    )
+    mostrar_chaves()
+if antecipar:
+    mostrar_estatisticas()
 
-    except Exception as e:
-        # Captura qualquer outro erro inesperado
-        st.error(f"Ocorreu um erro inesperado: {e}")
+# Com a tela já desenhada, importa crewai/litellm uma vez por processo
+aquecer()
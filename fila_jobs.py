@@ -0,0 +1,279 @@
+# ------------------------------------------------------------
+# 🧵 Fila de gerações (jobs) com um pool de workers
+# ------------------------------------------------------------
+# A geração (30–60 s) rodava dentro da thread do script do Streamlit: a
+# sessão ficava presa e muitos alunos ao mesmo tempo empilhavam threads sem
+# controle. Agora cada geração vira um job numa fila única do processo:
+# - um número fixo de workers tira jobs da fila (FILA_WORKERS);
+# - a fila tem tamanho máximo: acima dele o pedido é recusado na hora
+#   (FILA_MAX), em vez de esperar sem fim;
+# - a página só consulta o job pelo id (estado, textos parciais e saídas)
+#   e se redesenha enquanto ele roda;
+# - job que ninguém consulta há FILA_ABANDONO segundos (aba fechada, outra
+#   página) é cancelado, e o botão "Cancelar" faz o mesmo na hora;
+# - pedido idêntico a um job ainda no ar (mesma chave) não entra na fila:
+#   passa a acompanhar esse job, e o cancelamento só vale quando todos desistem.
+# Os workers são threads do próprio processo, e não processos separados:
+# assim o limitador de requisições, o cache e o cliente HTTP continuam
+# únicos, e o trabalho deles é esperar a rede (não disputa a GIL).
+# ------------------------------------------------------------
+import os
+import queue
+import threading
+import time
+import uuid
+
+from orquestracao import executar_dag
+from rastreamento import Rastro, nome_tarefa
+from roteamento import modelo_da_tarefa
+
+WORKERS = int(os.environ.get("FILA_WORKERS", "4"))
+MAX_FILA = int(os.environ.get("FILA_MAX", "16"))
+ABANDONO = float(os.environ.get("FILA_ABANDONO", "30"))
+
+NA_FILA, RODANDO, CONCLUIDO, ERRO, CANCELADO = "na_fila", "rodando", "concluido", "erro", "cancelado"
+
+
+class FilaCheia(Exception):
+    """A fila já tem MAX_FILA jobs esperando: o pedido não foi aceito."""
+
+
+class Job:
+    """
+    Uma geração na fila.
+    - app: nome do app (vai para o rastro)
+    - funcao: função (job) que faz o trabalho na thread do worker
+    - lock: lock que protege `interessados` (o da fila, que também os soma em submeter)
+    O worker preenche `parciais` ({tarefa: texto}), `concluidas` ([(tarefa, saída ou erro)]),
+    `avisos` e `modelos` (das tarefas adotadas de outro job); quem acompanha só lê.
+    """
+
+    def __init__(self, app, funcao, lock=None):
+        self.id = uuid.uuid4().hex
+        self.app = app
+        self.funcao = funcao
+        self.estado = NA_FILA
+        self.parciais = {}
+        self.concluidas = []
+        self.avisos = {}
+        self.modelos = {}
+        self.erro = None
+        self.rastro = None
+        self.extras = {}
+        self.chave = None
+        self.interessados = 1  # sessões acompanhando (pedidos idênticos coalescidos)
+        self.criado_em = self.visto_em = time.time()
+        self._cancelar = threading.Event()
+        self._lock = lock or threading.Lock()
+        self._novidade = threading.Condition()
+
+    @property
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+    @property
+    def terminado(self):
+        return self.estado in (CONCLUIDO, ERRO, CANCELADO)
+
+    def cancelar(self):
+        self._cancelar.set()
+        self.avisar()
+
+    def desistir(self):
+        """Uma sessão deixou de acompanhar; o job é cancelado quando nenhuma acompanha mais."""
+        # Sob o mesmo lock do submeter: um pedido idêntico chegando agora ou soma
+        # antes (e o job segue) ou vê o job cancelado (e abre outro)
+        with self._lock:
+            self.interessados -= 1
+            if self.interessados <= 0:
+                self.cancelar()
+
+    def avisar(self):
+        """Acorda quem está em esperar() (tarefa concluída, fim do job)."""
+        with self._novidade:
+            self._novidade.notify_all()
+
+    def esperar(self, timeout, vistas=0):
+        """
+        Espera até `timeout` segundos por novidade: o job terminar ou ter mais de
+        `vistas` tarefas concluídas (volta na hora se isso já aconteceu).
+        """
+        with self._novidade:
+            self._novidade.wait_for(lambda: self.terminado or len(self.concluidas) > vistas, timeout)
+
+
+class FilaJobs:
+    """
+    Fila única de gerações com `workers` threads.
+    - workers: jobs rodando ao mesmo tempo
+    - max_fila: jobs esperando, no máximo (admissão: acima disso, FilaCheia)
+    - abandono: segundos sem consulta até o job ser cancelado
+    """
+
+    def __init__(self, workers=WORKERS, max_fila=MAX_FILA, abandono=ABANDONO):
+        self.workers = workers
+        self.max_fila = max_fila
+        self.abandono = abandono
+        self._fila = queue.Queue()
+        self._jobs = {}
+        self._esperando = []  # ids na ordem da fila (para mostrar a posição)
+        self._por_chave = {}  # chave do pedido -> job no ar
+        self._lock = threading.Lock()
+        for numero in range(workers):
+            threading.Thread(target=self._trabalhar, name=f"fila-worker-{numero + 1}", daemon=True).start()
+        threading.Thread(target=self._vigiar, name="fila-vigia", daemon=True).start()
+
+    def submeter(self, app, funcao, chave=None):
+        """
+        Põe o job na fila e devolve o Job; levanta FilaCheia se não houver vaga.
+        - chave: identifica o pedido; se um job com a mesma chave ainda está no ar,
+          ele é devolvido (com um interessado a mais) e nada entra na fila
+        """
+        with self._lock:
+            existente = self._por_chave.get(chave) if chave is not None else None
+            if existente is not None and not existente.terminado and not existente.cancelado:
+                existente.interessados += 1
+                return existente
+            if len(self._esperando) >= self.max_fila:
+                raise FilaCheia(f"{len(self._esperando)} gerações esperando na fila")
+            job = Job(app, funcao, lock=self._lock)
+            job.chave = chave
+            self._jobs[job.id] = job
+            self._esperando.append(job.id)
+            if chave is not None:
+                self._por_chave[chave] = job
+        self._fila.put(job)
+        return job
+
+    def obter(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def posicao(self, job):
+        """Posição do job na fila (1 = o próximo a rodar), ou 0 se já saiu dela."""
+        with self._lock:
+            return self._esperando.index(job.id) + 1 if job.id in self._esperando else 0
+
+    def estatisticas(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "esperando": sum(j.estado == NA_FILA for j in jobs),
+            "rodando": sum(j.estado == RODANDO for j in jobs),
+            "workers": self.workers,
+            "max_fila": self.max_fila,
+        }
+
+    def _trabalhar(self):
+        while True:
+            job = self._fila.get()
+            with self._lock:
+                self._esperando.remove(job.id)
+            if job.cancelado:
+                job.estado = CANCELADO
+                self._soltar(job)
+                continue
+            job.estado = RODANDO
+            try:
+                job.funcao(job)
+                job.estado = CANCELADO if job.cancelado else CONCLUIDO
+            except Exception as erro:
+                job.erro = erro
+                job.estado = ERRO
+            self._soltar(job)
+
+    def _soltar(self, job):
+        # Job terminado: pedidos novos com a mesma chave voltam a entrar na fila
+        with self._lock:
+            if self._por_chave.get(job.chave) is job:
+                del self._por_chave[job.chave]
+        job.avisar()
+
+    def _vigiar(self):
+        # Cancela o que ninguém acompanha e esquece jobs terminados há muito tempo
+        while True:
+            time.sleep(min(self.abandono, 5))
+            agora = time.time()
+            with self._lock:
+                jobs = list(self._jobs.values())
+            for job in jobs:
+                if not job.terminado and agora - job.visto_em > self.abandono:
+                    job.cancelar()
+                elif job.terminado and agora - job.visto_em > 10 * self.abandono:
+                    with self._lock:
+                        self._jobs.pop(job.id, None)
+
+
+def adotar(job, origem, nomes, tarefas):
+    """
+    Espera `origem` (outro job, ex.: a antecipação) entregar as tarefas `nomes` e as
+    passa para `job` como concluídas. Devolve {id(tarefa de `tarefas`): texto} das
+    adotadas, para irem como `prontas` ao executar_dag; o que a origem não entregar
+    (falha, cancelamento) fica de fora e roda normalmente. Se a origem tiver
+    `extras["ao_adotar"]`, ele é chamado com (nome, saída ou None) para cada adotada.
+    """
+    def entregues():
+        return {nome_tarefa(t): (t, s) for t, s in origem.concluidas[:] if not isinstance(s, Exception)}
+
+    while not job.cancelado and not origem.terminado and not set(nomes) <= set(entregues()):
+        origem.visto_em = time.time()  # quem adota acompanha: a origem não é abandonada
+        origem.esperar(1.0, vistas=len(origem.concluidas))
+    achadas = entregues()
+    ao_adotar = origem.extras.get("ao_adotar")
+    if ao_adotar is not None:
+        for nome in nomes:
+            ao_adotar(nome, achadas[nome][1] if nome in achadas else None)
+    prontas = {}
+    for tarefa in tarefas:
+        nome = nome_tarefa(tarefa)
+        if nome in nomes and nome in achadas:
+            feita, saida = achadas[nome]
+            prontas[id(tarefa)] = saida.raw
+            job.modelos[nome] = modelo_da_tarefa(origem.rastro, feita)
+            job.concluidas.append((feita, saida))
+    job.avisar()
+    return prontas
+
+
+def rodar_tarefas(job, agentes, tarefas, inputs, origem=None, adotadas=(), **kwargs):
+    """
+    Trabalho padrão de um job: roda as tarefas no DAG, com o rastro de desempenho.
+    - agentes, tarefas, inputs: como no executar_dag
+    - origem, adotadas: job que já está gerando as tarefas `adotadas` (ver adotar())
+    - kwargs: outros parâmetros do executar_dag (max_paralelo, prontas, tentativas...)
+    Os textos parciais (com streaming) vão para `job.parciais`; as re-tentativas, para `job.avisos`.
+    """
+    def guardar_parcial(tarefa, texto):
+        job.parciais[nome_tarefa(tarefa)] = texto
+
+    def avisar_repeticao(tarefa, tentativa, erro):
+        job.avisos[nome_tarefa(tarefa)] = (
+            f"🚦 Limite atingido. Tentando só esta parte de novo ({tentativa}/{kwargs.get('tentativas', 1)})..."
+        )
+
+    job.rastro = Rastro(job.app, inputs).ativar()
+    try:
+        if origem is not None and adotadas:
+            kwargs["prontas"] = {**(kwargs.get("prontas") or {}), **adotar(job, origem, adotadas, tarefas)}
+        for tarefa, saida in executar_dag(
+            agentes, tarefas, inputs,
+            ao_transmitir=guardar_parcial if kwargs.pop("transmitir", True) else None,
+            ao_repetir=avisar_repeticao, cancelar=job._cancelar, **kwargs,
+        ):
+            job.concluidas.append((tarefa, saida))
+            job.avisar()
+    finally:
+        job.rastro.encerrar()
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def obter_fila():
+    """Fila única do processo (compartilhada por todas as sessões do Streamlit)."""
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            _fila = FilaJobs()
+        return _fila
@@ -0,0 +1,214 @@
+# ------------------------------------------------------------
+# 🎲 Modo grupo: vários personagens de D&D numa só geração
+# ------------------------------------------------------------
+# Um personagem avulso custa 3 chamadas ao LLM (conceito, ficha, descrição).
+# No modo grupo, até `por_chamada` personagens vão juntos numa única tarefa
+# e a resposta é separada pelos marcadores "=== PERSONAGEM ===" e
+# "--- PARTE ---". Os lotes rodam em paralelo sob o limitador do modelo; quem
+# não vier completo na resposta do lote é gerado do jeito avulso, com as três
+# tarefas do dupla_exercicio.py, também em paralelo. A parte FICHA vem como
+# JSON narrativo e é completada com as regras locais (regras_dnd.py).
+# ------------------------------------------------------------
+import re
+import time
+import unicodedata
+
+from equipes import montar_dupla, montar_grupo
+from orcamento import aplicar_orcamentos
+from orquestracao import executar_dag, interpolar_entradas
+from rastreamento import Rastro, rastro_atual
+from regras_dnd import entradas_ficha, renderizar_ficha
+from roteamento import modelo_da_tarefa
+
+PARTES = ("conceito", "ficha", "descricao")
+TITULOS = {"conceito": "🧩 Conceito", "ficha": "📜 Ficha", "descricao": "🎨 Descrição"}
+
+# Tolerantes a negrito/cabeçalho em volta e a maiúsculas/minúsculas
+_MARCADOR_PERSONAGEM = re.compile(r"^[#*\s]*=+\s*PERSONAGEM\s*:\s*(.+?)\s*=+[*\s]*$", re.M | re.I)
+_MARCADOR_PARTE = re.compile(r"^[#*\s]*-{3,}\s*(CONCEITO|FICHA|DESCRI\w+)\s*-{3,}[*\s]*$", re.M | re.I)
+
+
+def ler_personagens(texto):
+    """
+    Lê um personagem por linha: "nome, raça, classe, tema" (tema opcional).
+    Também aceita ";" ou "|" como separador.
+    Devolve (personagens, linhas_ignoradas).
+    """
+    personagens, ignoradas = [], []
+    for linha in texto.splitlines():
+        if not linha.strip():
+            continue
+        campos = [c.strip() for c in re.split(r"[,;|]", linha, maxsplit=3)]
+        campos += [""] * (4 - len(campos))
+        nome, raca, classe, tema = campos
+        if not (nome and raca and classe):
+            ignoradas.append(linha.strip())
+            continue
+        personagens.append({"nome": nome, "raca": raca, "classe": classe, "tema": tema or "não especificado"})
+    return personagens, ignoradas
+
+
+def formatar_lote(lote):
+    """Lista numerada que vai no lugar de {personagens} na tarefa do grupo."""
+    return "\n".join(
+        f"{i}. {p['nome']} | {p['raca']} | {p['classe']} | {p['tema']}" for i, p in enumerate(lote, 1)
+    )
+
+
+def _normalizar(nome):
+    sem_acento = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    return " ".join(sem_acento.lower().split())
+
+
+def _separar_partes(corpo):
+    pedacos = _MARCADOR_PARTE.split(corpo)
+    partes = {}
+    for rotulo, texto in zip(pedacos[1::2], pedacos[2::2]):
+        chave = _normalizar(rotulo)
+        chave = "descricao" if chave.startswith("descri") else chave
+        partes[chave] = texto.strip()
+    # Personagem só conta se vieram as três partes
+    return partes if all(partes.get(p) for p in PARTES) else None
+
+
+def separar_respostas(texto, lote):
+    """
+    Separa a resposta de um lote por personagem.
+    - texto: resposta do agente (com os marcadores)
+    - lote: personagens pedidos, na ordem da lista
+    Devolve uma lista alinhada com o lote: {conceito, ficha, descricao} ou None
+    para quem faltou ou veio incompleto.
+    """
+    pedacos = _MARCADOR_PERSONAGEM.split(texto)
+    em_ordem, por_nome = [], {}
+    for nome, corpo in zip(pedacos[1::2], pedacos[2::2]):
+        partes = _separar_partes(corpo)
+        em_ordem.append(partes)
+        por_nome.setdefault(_normalizar(nome), partes)
+
+    respostas = []
+    for i, personagem in enumerate(lote):
+        partes = por_nome.get(_normalizar(personagem["nome"]))
+        if partes is None and len(em_ordem) == len(lote):
+            partes = em_ordem[i]  # nome escrito de outro jeito, mas a ordem bate
+        respostas.append(partes)
+    return respostas
+
+
+def _modelo(llm, tarefa):
+    # Modelo que respondeu de fato (a reserva, se o principal estourou o limite), pelo rastro ativo
+    rastro = rastro_atual()
+    return modelo_da_tarefa(rastro, tarefa) if rastro is not None else llm.model.split("/", 1)[-1]
+
+
+def gerar_grupo(llm, personagens, por_chamada=1, max_paralelo=None, metodo="padrao", cancelar=None):
+    """
+    Gera os personagens e devolve (índice, partes, modelos) à medida que ficam prontos.
+    - llm: modelo usado por todos os agentes
+    - personagens: lista de dicts com nome, raca, classe, tema
+    - por_chamada: quantos personagens vão juntos numa chamada (1 = todos avulsos)
+    - max_paralelo: máximo de tarefas simultâneas (padrão: todas)
+    - metodo: como os atributos das fichas são gerados (ver regras_dnd.METODOS)
+    - cancelar: threading.Event; quando ligado, nada mais é disparado (ver executar_dag)
+    `partes` é {conceito, ficha, descricao} ou a exceção, se o personagem falhou de vez;
+    `modelos` é {parte: modelo que a escreveu}.
+    """
+    personagens = [{**p, **entradas_ficha(p, metodo)} for p in personagens]
+    faltando = list(range(len(personagens)))
+    if por_chamada > 1 and len(personagens) > 1:
+        lotes = [faltando[i:i + por_chamada] for i in range(0, len(faltando), por_chamada)]
+        faltando = []
+        agentes, tarefas, lote_da_tarefa = [], [], {}
+        for numero, lote in enumerate(lotes, 1):
+            agente, tarefa = montar_grupo(llm)
+            tarefa.name = f"grupo_{numero}"
+            # Cada lote tem a sua lista: interpola aqui e roda o DAG sem inputs
+            interpolar_entradas([agente], [tarefa], {"personagens": formatar_lote([personagens[i] for i in lote])})
+            agentes.append(agente)
+            tarefas.append(tarefa)
+            lote_da_tarefa[id(tarefa)] = lote
+
+        for tarefa, saida in executar_dag(agentes, tarefas, {}, max_paralelo, devolver_erros=True, cancelar=cancelar):
+            lote = lote_da_tarefa[id(tarefa)]
+            if isinstance(saida, Exception):
+                respostas = [None] * len(lote)
+            else:
+                respostas = separar_respostas(saida.raw, [personagens[i] for i in lote])
+            for indice, partes in zip(lote, respostas):
+                if partes:
+                    partes["ficha"] = renderizar_ficha(personagens[indice], partes["ficha"])
+                    modelo = _modelo(llm, tarefa)
+                    yield indice, partes, dict.fromkeys(PARTES, modelo)
+                else:
+                    faltando.append(indice)
+
+    if not faltando or (cancelar is not None and cancelar.is_set()):
+        return
+
+    # Quem faltou: as três tarefas do modo avulso, todos os personagens juntos no mesmo DAG
+    agentes, tarefas, dono = [], [], {}
+    for indice in faltando:
+        agentes_p, tarefas_p = montar_dupla(llm)
+        aplicar_orcamentos(tarefas_p)
+        interpolar_entradas(agentes_p, tarefas_p, personagens[indice])
+        for parte, tarefa in zip(PARTES, tarefas_p):
+            tarefa.name = f"{parte}_{indice + 1}"
+            dono[id(tarefa)] = (indice, parte)
+        agentes += agentes_p
+        tarefas += tarefas_p
+
+    recebidas = {indice: {} for indice in faltando}
+    modelos = {indice: {} for indice in faltando}
+    for tarefa, saida in executar_dag(agentes, tarefas, {}, max_paralelo, devolver_erros=True, cancelar=cancelar):
+        indice, parte = dono[id(tarefa)]
+        if indice not in recebidas:
+            continue  # personagem já devolvido com erro
+        if isinstance(saida, Exception):
+            del recebidas[indice]
+            yield indice, saida, modelos.pop(indice)
+            continue
+        recebidas[indice][parte] = saida.raw
+        modelos[indice][parte] = _modelo(llm, tarefa)
+        if len(recebidas[indice]) == len(PARTES):
+            yield indice, recebidas.pop(indice), modelos.pop(indice)
+
+
+def rodar_grupo(job, llm, personagens, por_chamada=1, max_paralelo=None, metodo="padrao"):
+    """
+    Trabalho do job do modo grupo na fila (fila_jobs.py): roda o gerar_grupo com o
+    rastro de desempenho e põe cada (índice, partes ou exceção) em `job.concluidas`
+    assim que o personagem fica pronto. Cada personagem pronto entra no histórico
+    como uma geração do modo individual. O cancelamento do job para os disparos.
+    """
+    from historico import obter_historico
+
+    job.rastro = Rastro(job.app, {"personagens": len(personagens), "por_chamada": por_chamada}).ativar()
+    inicio = time.time()
+    try:
+        for indice, partes, modelos in gerar_grupo(
+            llm, personagens, por_chamada, max_paralelo, metodo, cancelar=job._cancelar
+        ):
+            if not isinstance(partes, Exception):
+                obter_historico().registrar(
+                    "dupla_exercicio", personagens[indice],
+                    {parte: {"texto": texto, "modelo": modelos[parte], "segundos": 0.0} for parte, texto in partes.items()},
+                    time.time() - inicio,
+                )
+            job.concluidas.append((indice, partes))
+            job.avisar()
+    finally:
+        job.rastro.encerrar()
+
+
+def formatar_personagem(personagem, partes):
+    """Markdown de um personagem (aba e pacote para download)."""
+    blocos = [f"## {personagem['nome']} ({personagem['raca']}, {personagem['classe']})"]
+    for parte in PARTES:
+        blocos.append(f"### {TITULOS[parte]}\n\n{partes[parte]}")
+    return "\n\n".join(blocos)
+
+
+def montar_pacote(personagens, resultados):
+    """Um único Markdown com todos os personagens gerados, na ordem da lista."""
+    corpo = [formatar_personagem(personagens[i], resultados[i]) for i in sorted(resultados)]
+    return "# 🎲 Grupo de personagens\n\n" + "\n\n---\n\n".join(corpo) + "\n"
@@ -0,0 +1,218 @@
+# ------------------------------------------------------------
+# 📜 Histórico das gerações (SQLite com o texto comprimido)
+# ------------------------------------------------------------
+# O material gerado só vivia na sessão do Streamlit: fechada a aba, ver de
+# novo uma aula ou um personagem custava outra geração. Aqui cada geração
+# concluída dos quatro apps vira uma linha com as entradas, o texto de cada
+# tarefa (JSON comprimido com zlib), o modelo e o tempo. A barra lateral lista
+# o histórico do app e mostra qualquer geração na hora, sem chamar a API.
+# Índices nas entradas normalizadas e na data; a retenção e o limite de bytes
+# mantêm o arquivo pequeno mesmo com a sala inteira gerando o dia todo.
+# ------------------------------------------------------------
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from cache_semantico import normalizar
+
+ARQUIVO_PADRAO = os.environ.get("HISTORICO_ARQUIVO", "historico.sqlite3")
+
+# Dias que uma geração fica no histórico e tamanho máximo (bytes comprimidos)
+RETENCAO_DIAS = float(os.environ.get("HISTORICO_RETENCAO_DIAS", "30"))
+MAX_BYTES = int(os.environ.get("HISTORICO_MAX_BYTES", "20000000"))
+
+# Quantas gerações a barra lateral lista
+MAX_LISTADAS = 30
+
+
+def chave_entradas(inputs):
+    """Entradas normalizadas ("Algoritmos " e "algoritmos" dão a mesma chave), em JSON ordenado."""
+    return json.dumps({campo: normalizar(str(valor)) for campo, valor in inputs.items()}, sort_keys=True)
+
+
+def _escapar_like(texto):
+    """Texto literal num padrão LIKE com ESCAPE '\\' ("%", "_" e "\\" deixam de ser curingas)."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class HistoricoGeracoes:
+    """
+    Gerações concluídas guardadas em SQLite.
+    - caminho: arquivo SQLite (":memory:" para não gravar nada)
+    - max_bytes: soma máxima dos textos comprimidos; acima disso saem as mais antigas
+    - retencao: segundos até uma geração sair do histórico
+    """
+
+    def __init__(self, caminho=ARQUIVO_PADRAO, max_bytes=MAX_BYTES, retencao=RETENCAO_DIAS * 24 * 3600):
+        self.max_bytes = max_bytes
+        self.retencao = retencao
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(caminho, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS geracoes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, app TEXT NOT NULL, chave TEXT NOT NULL, "
+            "inputs TEXT NOT NULL, tarefas TEXT NOT NULL, saidas BLOB NOT NULL, duracao REAL NOT NULL, "
+            "criado_em REAL NOT NULL, tamanho INTEGER NOT NULL, tamanho_original INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_geracoes_chave ON geracoes (app, chave, criado_em)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_geracoes_app ON geracoes (app, criado_em)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_geracoes_criado_em ON geracoes (criado_em)")
+        self._db.commit()
+
+    def registrar(self, app, inputs, saidas, duracao=0.0):
+        """
+        Guarda uma geração concluída e devolve o id.
+        - app: nome do app (ex.: "aula_p")
+        - inputs: entradas da geração (tema, nivel... ou nome, raca...)
+        - saidas: {tarefa: {"texto", "modelo", "segundos"}}
+        - duracao: segundos da geração inteira
+        A geração anterior com as mesmas entradas sai se esta já contém todo o texto
+        dela (ex.: o gabarito ligado depois gera outra linha, com as quatro abas).
+        """
+        agora = time.time()
+        chave = chave_entradas(inputs)
+        bruto = json.dumps(saidas, ensure_ascii=False).encode("utf-8")
+        comprimido = zlib.compress(bruto, 6)
+        with self._lock:
+            anterior = self._db.execute(
+                "SELECT id, saidas FROM geracoes WHERE app = ? AND chave = ? ORDER BY criado_em DESC LIMIT 1",
+                (app, chave),
+            ).fetchone()
+            if anterior is not None:
+                textos = json.loads(zlib.decompress(anterior[1]))
+                if all(saidas.get(nome, {}).get("texto") == dados["texto"] for nome, dados in textos.items()):
+                    self._db.execute("DELETE FROM geracoes WHERE id = ?", (anterior[0],))
+            cursor = self._db.execute(
+                "INSERT INTO geracoes (app, chave, inputs, tarefas, saidas, duracao, criado_em, tamanho, tamanho_original) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (app, chave, json.dumps(inputs, ensure_ascii=False), ",".join(saidas), comprimido,
+                 duracao, agora, len(comprimido), len(bruto)),
+            )
+            self._aplicar_limites(agora)
+            self._db.commit()
+            return cursor.lastrowid
+
+    def _aplicar_limites(self, agora):
+        # Primeiro o que passou da retenção, depois as mais antigas até caber no limite de bytes
+        self._db.execute("DELETE FROM geracoes WHERE criado_em < ?", (agora - self.retencao,))
+        total = self._db.execute("SELECT COALESCE(SUM(tamanho), 0) FROM geracoes").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for id_, tamanho in self._db.execute("SELECT id, tamanho FROM geracoes ORDER BY criado_em").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM geracoes WHERE id = ?", (id_,))
+            total -= tamanho
+
+    def listar(self, app, busca="", limite=MAX_LISTADAS):
+        """Gerações mais recentes do app (sem o texto), filtradas pelas entradas normalizadas."""
+        # Busca só nos valores das entradas (json_each), não nos nomes dos campos nem
+        # nas aspas do JSON; "_" sobrevive à normalização e é curinga no LIKE
+        busca = normalizar(busca)
+        filtro, parametros = "", (app, limite)
+        if busca:
+            filtro = "AND EXISTS (SELECT 1 FROM json_each(chave) WHERE value LIKE ? ESCAPE '\\') "
+            parametros = (app, f"%{_escapar_like(busca)}%", limite)
+        with self._lock:
+            linhas = self._db.execute(
+                "SELECT id, inputs, tarefas, duracao, criado_em FROM geracoes "
+                f"WHERE app = ? {filtro}ORDER BY criado_em DESC LIMIT ?",
+                parametros,
+            ).fetchall()
+        return [
+            {"id": id_, "inputs": json.loads(inputs), "tarefas": tarefas.split(","), "duracao": duracao, "criado_em": criado_em}
+            for id_, inputs, tarefas, duracao, criado_em in linhas
+        ]
+
+    def obter(self, id_):
+        """Geração completa (com o texto de cada tarefa) ou None se já saiu do histórico."""
+        with self._lock:
+            linha = self._db.execute(
+                "SELECT app, inputs, saidas, duracao, criado_em FROM geracoes WHERE id = ?", (id_,)
+            ).fetchone()
+        if linha is None:
+            return None
+        app, inputs, saidas, duracao, criado_em = linha
+        return {
+            "id": id_, "app": app, "inputs": json.loads(inputs),
+            "saidas": json.loads(zlib.decompress(saidas)), "duracao": duracao, "criado_em": criado_em,
+        }
+
+    def estatisticas(self):
+        """Quantas gerações e quantos bytes (comprimidos e originais) o histórico guarda."""
+        with self._lock:
+            geracoes, comprimidos, originais = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COALESCE(SUM(tamanho_original), 0) FROM geracoes"
+            ).fetchone()
+        return {"geracoes": geracoes, "bytes": comprimidos, "bytes_originais": originais}
+
+    def limpar(self):
+        """Apaga todo o histórico."""
+        with self._lock:
+            self._db.execute("DELETE FROM geracoes")
+            self._db.commit()
+
+
+_historico = None
+_historico_lock = threading.Lock()
+
+
+def obter_historico():
+    """Histórico único do processo (compartilhado por todas as sessões do Streamlit)."""
+    global _historico
+    with _historico_lock:
+        if _historico is None:
+            _historico = HistoricoGeracoes()
+        return _historico
+
+
+def mostrar_historico(app, titulos):
+    """
+    Barra lateral com o histórico do app; a geração escolhida aparece na página na hora.
+    - app: nome do app
+    - titulos: {nome da tarefa: título da aba}
+    """
+    import streamlit as st
+
+    chave = f"historico_{app}"
+    historico = obter_historico()
+    with st.sidebar:
+        st.subheader("📜 Histórico")
+        busca = st.text_input("Buscar no histórico", key=f"busca_historico_{app}")
+        itens = historico.listar(app, busca)
+        if not itens:
+            st.caption("Nenhuma geração encontrada." if busca else "Nenhuma geração guardada ainda.")
+        for item in itens:
+            entradas = item["inputs"]
+            rotulo = entradas.get("tema") if "nome" not in entradas else f"{entradas['nome']} ({entradas.get('classe', '')})"
+            quando = time.strftime("%d/%m %H:%M", time.localtime(item["criado_em"]))
+            st.button(
+                f"{rotulo or '?'} · {quando}", key=f"historico_{app}_{item['id']}",
+                on_click=st.session_state.__setitem__, args=(chave, item["id"]),
+            )
+        stats = historico.estatisticas()
+        st.caption(
+            f"{stats['geracoes']} gerações · {stats['bytes'] / 1024:.0f} KB "
+            f"({stats['bytes_originais'] / 1024:.0f} KB sem compressão)"
+        )
+
+    escolhida = st.session_state.get(chave)
+    registro = historico.obter(escolhida) if escolhida is not None else None
+    if registro is None:
+        st.session_state.pop(chave, None)
+        return
+    with st.container(border=True):
+        entradas = " · ".join(f"{campo}: {valor}" for campo, valor in registro["inputs"].items())
+        quando = time.strftime("%d/%m/%Y %H:%M", time.localtime(registro["criado_em"]))
+        st.markdown(f"**📜 Do histórico** ({quando}, gerado em {registro['duracao']:.1f}s) — {entradas}")
+        st.button("✖️ Fechar", key=f"fechar_historico_{app}", on_click=st.session_state.pop, args=(chave, None))
+        nomes = [n for n in titulos if n in registro["saidas"]] + [n for n in registro["saidas"] if n not in titulos]
+        for nome, aba in zip(nomes, st.tabs([titulos.get(n, n) for n in nomes])):
+            with aba:
+                saida = registro["saidas"][nome]
+                st.markdown(saida["texto"])
+                tempo = f" · {saida['segundos']:.1f}s" if saida.get("segundos") else ""
+                st.caption(f"🤖 {saida.get('modelo') or '?'}{tempo}")
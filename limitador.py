@@ -0,0 +1,151 @@
+# ------------------------------------------------------------
+# 🚦 Limitador de requisições (token bucket por modelo)
+# ------------------------------------------------------------
+# O Groq limita requisições por minuto (RPM) e tokens por minuto (TPM) de
+# cada modelo. Em vez de disparar tudo e tomar RateLimitError, cada chamada
+# espera na fila até caber no orçamento. Os limitadores são únicos por
+# processo, então todas as sessões do Streamlit dividem o mesmo orçamento.
+# O limite é de cada chave da API: com várias (chaves.py), cada par
+# (modelo, chave) tem o seu limitador.
+# ------------------------------------------------------------
+import random
+import re
+import threading
+import time
+
+# Limites do plano gratuito do Groq: (requisições/min, tokens/min)
+LIMITES_MODELOS = {
+    "groq/llama-3.1-8b-instant": (30, 6000),
+    "groq/llama-3.3-70b-versatile": (30, 12000),
+}
+LIMITE_PADRAO = (30, 6000)
+
+# Tokens reservados para a resposta quando a chamada não define max_tokens
+RESERVA_SAIDA = 600
+
+
+class BaldeDeTokens:
+    """
+    Token bucket simples.
+    - capacidade: quanto cabe no balde (ex.: 30 requisições)
+    - por_segundo: quanto é reposto a cada segundo (ex.: 30/60)
+    """
+
+    def __init__(self, capacidade, por_segundo):
+        self.capacidade = capacidade
+        self.por_segundo = por_segundo
+        self.disponivel = capacidade
+        self.atualizado_em = time.monotonic()
+
+    def _repor(self, agora):
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado_em) * self.por_segundo)
+        self.atualizado_em = agora
+
+    def espera_para(self, quantidade, agora):
+        """Segundos até `quantidade` caber no balde (0 se já cabe)."""
+        self._repor(agora)
+        quantidade = min(quantidade, self.capacidade)
+        if self.disponivel >= quantidade:
+            return 0.0
+        return (quantidade - self.disponivel) / self.por_segundo
+
+    def consumir(self, quantidade):
+        self.disponivel -= min(quantidade, self.capacidade)
+
+
+class LimitadorModelo:
+    """Orçamento de RPM e TPM de um modelo, compartilhado entre threads."""
+
+    def __init__(self, rpm, tpm):
+        self.requisicoes = BaldeDeTokens(rpm, rpm / 60)
+        self.tokens = BaldeDeTokens(tpm, tpm / 60)
+        self.pausado_ate = 0.0
+        self._cond = threading.Condition()
+
+    def _espera(self, tokens_estimados, agora):
+        return max(
+            self.pausado_ate - agora,
+            self.requisicoes.espera_para(1, agora),
+            self.tokens.espera_para(tokens_estimados, agora),
+        )
+
+    def espera_prevista(self, tokens_estimados):
+        """Quanto uma chamada esperaria agora na fila, sem descontar nada do orçamento."""
+        with self._cond:
+            return max(0.0, self._espera(tokens_estimados, time.monotonic()))
+
+    def folga(self):
+        """Fração do orçamento livre agora, de 0 a 1 (a menor entre requisições e tokens; 0 se pausado)."""
+        with self._cond:
+            agora = time.monotonic()
+            if self.pausado_ate > agora:
+                return 0.0
+            self.requisicoes._repor(agora)
+            self.tokens._repor(agora)
+            return max(0.0, min(
+                self.requisicoes.disponivel / self.requisicoes.capacidade,
+                self.tokens.disponivel / self.tokens.capacidade,
+            ))
+
+    def aguardar(self, tokens_estimados):
+        """Bloqueia até a chamada caber no orçamento e então a desconta. Devolve o tempo esperado."""
+        inicio = time.monotonic()
+        with self._cond:
+            while True:
+                espera = self._espera(tokens_estimados, time.monotonic())
+                if espera <= 0:
+                    self.requisicoes.consumir(1)
+                    self.tokens.consumir(tokens_estimados)
+                    return time.monotonic() - inicio
+                self._cond.wait(espera)
+
+    def pausar(self, segundos):
+        """Depois de um 429, segura todas as chamadas deste modelo por `segundos`."""
+        with self._cond:
+            self.pausado_ate = max(self.pausado_ate, time.monotonic() + segundos)
+            # A API recusou: o balde local estava otimista, então zeramos
+            self.requisicoes.disponivel = 0
+            self._cond.notify_all()
+
+
+_limitadores = {}
+_limitadores_lock = threading.Lock()
+
+
+def obter_limitador(modelo, chave=""):
+    """Limitador único do processo para o modelo com esta chave da API."""
+    with _limitadores_lock:
+        if (modelo, chave) not in _limitadores:
+            _limitadores[modelo, chave] = LimitadorModelo(*LIMITES_MODELOS.get(modelo, LIMITE_PADRAO))
+        return _limitadores[modelo, chave]
+
+
+def estimar_tokens(mensagens, max_tokens=None):
+    """Estimativa barata (~4 caracteres por token) da entrada + reserva para a saída."""
+    if isinstance(mensagens, str):
+        texto = mensagens
+    else:
+        texto = "".join(str(m.get("content", "")) for m in mensagens)
+    return len(texto) // 4 + (RESERVA_SAIDA if max_tokens is None else max_tokens)
+
+
+def tempo_de_espera(erro, tentativa, base=2.0, teto=60.0):
+    """
+    Quanto esperar depois de um RateLimitError.
+    Usa o retry-after do servidor (cabeçalho ou "try again in Xs" na mensagem)
+    e, se não houver, um backoff exponencial; sempre com jitter aleatório
+    para as sessões não voltarem todas no mesmo instante.
+    """
+    sugerido = None
+    resposta = getattr(erro, "response", None)
+    cabecalhos = getattr(resposta, "headers", None) or {}
+    try:
+        sugerido = float(cabecalhos.get("retry-after"))
+    except (TypeError, ValueError):
+        achado = re.search(r"try again in (?:(\d+)m)?([\d.]+)s", str(erro))
+        if achado:
+            sugerido = int(achado.group(1) or 0) * 60 + float(achado.group(2))
+
+    exponencial = min(teto, base * 2 ** tentativa)
+    espera = sugerido if sugerido is not None else exponencial
+    return espera + random.uniform(0, exponencial / 2)
@@ -0,0 +1,321 @@
+# ------------------------------------------------------------
+# 🤖 LLM usado pelos apps (crewai.LLM + camadas de desempenho)
+# ------------------------------------------------------------
+# Os quatro apps criam o modelo com LLMGroq(...) em vez de LLM(...).
+# A chamada continua a mesma do CrewAI; por baixo, cada resposta passa
+# pelo cache de respostas e, se for à API, pelo limitador de requisições;
+# se o modelo estiver no limite (429, fila longa ou demora demais), a chamada
+# passa para um dos modelos de reserva. Prompts idênticos em andamento (de
+# qualquer sessão) viram uma chamada só (coalescencia.py). Cada chamada vira
+# um span no rastro de desempenho (rastreamento.py), com o modelo que de
+# fato respondeu. Com várias chaves da API (chaves.py), cada chamada vai
+# para a chave com mais folga. Com max_tokens (orcamento.py), a resposta cortada no meio
+# ganha uma continuação curta em vez de a tarefa rodar de novo.
+# Quem quiser o texto enquanto ele é gerado usa `transmitindo_para(...)`.
+# ------------------------------------------------------------
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import litellm
+from crewai import LLM
+from litellm.exceptions import RateLimitError, Timeout
+
+from cache_respostas import CacheRespostas, obter_cache
+from chaves import obter_pool
+from coalescencia import EsperaCancelada, chave_chamada, obter_coalescedor
+from limitador import estimar_tokens, obter_limitador, tempo_de_espera
+from rastreamento import registrar_uso, span_llm
+
+# Receptor de streaming da tarefa atual. ContextVar (e não threading.local)
+# porque o CrewAI chama o LLM em outra thread copiando o contexto.
+_receptor = ContextVar("receptor_transmissao", default=None)
+
+# Evento de cancelamento do job da tarefa atual (quem espera uma chamada coalescida desiste)
+_cancelar = ContextVar("cancelar_tarefa", default=None)
+
+# Pedido feito quando a resposta bate no max_tokens no meio do texto
+PEDIDO_CONTINUACAO = (
+    "Sua resposta acima foi cortada pelo limite de tamanho. Continue exatamente de onde parou, "
+    "sem repetir nada, e termine o quanto antes (feche a frase, o item da lista ou o JSON)."
+)
+
+# Teto da continuação: fração do max_tokens da chamada, com um mínimo
+FRACAO_CONTINUACAO = 0.25
+MINIMO_CONTINUACAO = 64
+
+
+@contextmanager
+def transmitindo_para(receptor):
+    """
+    Enquanto ativo, as chamadas do LLMGroq nesta thread são feitas em streaming.
+    - receptor: função chamada com cada pedaço de texto; recebe None no
+      início de cada chamada ao LLM (para quem acumula recomeçar do zero)
+    """
+    marcador = _receptor.set(receptor)
+    try:
+        yield
+    finally:
+        _receptor.reset(marcador)
+
+
+@contextmanager
+def cancelavel_por(evento):
+    """
+    Enquanto ativo, a espera por uma chamada idêntica em andamento (coalescida)
+    nesta thread acaba com EsperaCancelada quando `evento` (threading.Event) liga.
+    """
+    marcador = _cancelar.set(evento)
+    try:
+        yield
+    finally:
+        _cancelar.reset(marcador)
+
+
+def incompleta(texto):
+    """A resposta parou no meio: JSON ou bloco de código aberto, ou a última linha sem fechamento."""
+    if texto.count("{") > texto.count("}") or texto.count("[") > texto.count("]") or texto.count("```") % 2:
+        return True
+    ultima = texto.rstrip().rsplit("\n", 1)[-1].strip()
+    return bool(ultima) and ultima[-1] not in ".!?:;)]}*\"'`|…"
+
+
+class LLMGroq(LLM):
+    """
+    LLM do CrewAI com cache de respostas e limite de requisições.
+    - usar_cache: se False, ignora o que está guardado e gera de novo
+      (a resposta nova substitui a antiga no cache)
+    - tentativas_limite: quantas vezes repetir a chamada após RateLimitError
+    - reservas: modelos usados, nesta ordem, quando este está no limite
+    - slo_fila: segundos de fila aceitos antes de passar para uma reserva
+      com fila menor (0 = só troca depois de erro)
+    """
+
+    usar_cache: bool = True
+    tentativas_limite: int = 5
+    reservas: list[str] = []
+    slo_fila: float = 0.0
+
+    def variante(self, modelo, reservas=(), max_tokens=None, api_key=None):
+        """
+        Mesmo LLM (chave, temperatura, cache, cliente HTTP...) com outro modelo
+        (e, se dados, outro max_tokens ou outra chave da API).
+        """
+        return LLMGroq(
+            model=modelo,
+            api_key=api_key or self.api_key,
+            temperature=self.temperature,
+            max_tokens=max_tokens or self.max_tokens,
+            timeout=self.timeout,
+            usar_cache=self.usar_cache,
+            tentativas_limite=self.tentativas_limite,
+            reservas=list(reservas),
+            slo_fila=self.slo_fila,
+            **self.additional_params,  # ex.: o cliente HTTP compartilhado (recursos.py)
+        )
+
+    def call(self, messages, *args, **kwargs):
+        with span_llm(self.model, kwargs.get("from_task")) as span:
+            ferramentas = kwargs.get("tools", args[0] if args else None)
+            if ferramentas or kwargs.get("response_model"):
+                # Chamadas com ferramentas/saída estruturada não são só texto: não guardamos
+                return self._chamar_api(span, messages, *args, **kwargs)
+
+            cache = obter_cache()
+            chave = CacheRespostas.chave(self.model, self.temperature, messages)
+            if self.usar_cache:
+                guardado = cache.obter(chave)
+                if guardado is not None:
+                    span.cache = True
+                    receptor = _receptor.get()
+                    if receptor:
+                        receptor(None)
+                        receptor(guardado)
+                    return guardado
+                return self._chamar_coalescido(span, cache, chave, messages, *args, **kwargs)
+
+            resposta = self._chamar_api(span, messages, *args, **kwargs)
+            self._guardar(span, cache, chave, messages, resposta)
+            return resposta
+
+    def _guardar(self, span, cache, chave, messages, resposta):
+        if isinstance(resposta, str) and resposta:
+            if span.modelo and span.modelo != self.model:
+                # Quem respondeu foi uma reserva: o texto fica na chave dela, e não na deste
+                # modelo (senão o próximo acerto serviria o texto do modelo menor como deste)
+                chave = CacheRespostas.chave(span.modelo, self.temperature, messages)
+            cache.guardar(chave, resposta)
+            if not span.tokens_saida:
+                # A API não informou o uso: fica a estimativa (~4 caracteres por token)
+                span.tokens_entrada = estimar_tokens(messages, 0)
+                span.tokens_saida = len(resposta) // 4
+                span.tokens_estimados = True
+
+    def _chamar_coalescido(self, span, cache, chave, messages, *args, **kwargs):
+        """
+        Uma chamada à API por prompt idêntico em andamento: as outras esperam a líder
+        e recebem o mesmo texto. Só com cache ligado ("gerar de novo" quer texto novo).
+        """
+        voos = obter_coalescedor()
+        chave_voo = chave_chamada(self.model, self.temperature, messages)
+        receptor = _receptor.get()
+        while True:
+            voo, lider = voos.entrar(chave_voo)
+            if lider:
+                break
+            try:
+                resposta = voo.acompanhar(receptor, _cancelar.get())
+            except EsperaCancelada:
+                raise
+            except Exception:
+                continue  # a líder falhou: esta tenta de novo (como líder ou atrás de outra)
+            voos.contar()
+            span.coalescida = True
+            return resposta
+
+        def repassar(pedaco):
+            receptor(pedaco)
+            voo.publicar(pedaco)
+
+        try:
+            # Com streaming, os pedaços da líder também vão para quem está esperando
+            with transmitindo_para(repassar if receptor else None):
+                resposta = self._chamar_api(span, messages, *args, **kwargs)
+            self._guardar(span, cache, chave, messages, resposta)
+        except Exception as erro:
+            voos.sair(chave_voo, voo, erro=erro)
+            raise
+        voos.sair(chave_voo, voo, texto=resposta)
+        return resposta
+
+    def _pool(self):
+        """Pool de chaves do processo, se a chave deste LLM faz parte dele (senão, None: só esta chave)."""
+        pool = obter_pool()
+        return pool if self.api_key in pool else None
+
+    def _escolher_modelo(self, tokens, evitar, pool):
+        """Primeiro modelo (principal, depois reservas) com fila dentro do SLO; senão, o de menor fila."""
+        candidatos = [m for m in [self.model, *self.reservas] if m not in evitar] or [self.model]
+        if len(candidatos) == 1:
+            return candidatos[0]
+        esperas = {
+            m: pool.espera_prevista(m, tokens) if pool else obter_limitador(m, self.api_key).espera_prevista(tokens)
+            for m in candidatos
+        }
+        for modelo in candidatos:
+            if esperas[modelo] <= self.slo_fila:
+                return modelo
+        return min(candidatos, key=esperas.get)
+
+    def _chamar_api(self, span, messages, *args, **kwargs):
+        """
+        Espera a vez no limitador e repete só esta chamada em caso de 429 ou timeout.
+        Com reservas, a repetição vai para outro modelo em vez de esperar o mesmo;
+        com várias chaves, cada tentativa vai para a chave com mais folga.
+        """
+        tokens = estimar_tokens(messages, self.max_tokens)
+        receptor = _receptor.get()
+        ferramentas = kwargs.get("tools", args[0] if args else None)
+        evitar = set()
+        pool = self._pool()
+        for tentativa in range(self.tentativas_limite):
+            modelo = self._escolher_modelo(tokens, evitar, pool)
+            chave = pool.escolher(modelo, tokens) if pool else self.api_key
+            llm = self if modelo == self.model and chave == self.api_key else self.variante(modelo, api_key=chave)
+            limitador = obter_limitador(modelo, chave)
+            span.tentativas = tentativa + 1
+            span.modelo = modelo
+            span.teto_saida = llm.max_tokens or 0
+            span.espera_fila += limitador.aguardar(tokens)
+            entrada_antes, saida_antes = span.tokens_entrada, span.tokens_saida
+            so_texto = not ferramentas and not kwargs.get("response_model")
+            try:
+                if receptor and so_texto:
+                    resposta = llm._transmitir(messages, receptor)
+                else:
+                    resposta = super(LLMGroq, llm).call(messages, *args, **kwargs)
+                if so_texto:
+                    resposta = llm._continuar(span, messages, resposta, span.tokens_saida - saida_antes, receptor)
+            except (RateLimitError, Timeout) as erro:
+                if pool:
+                    pool.registrar(chave, erro_429=isinstance(erro, RateLimitError), falha=isinstance(erro, Timeout))
+                if tentativa == self.tentativas_limite - 1:
+                    raise
+                if isinstance(erro, RateLimitError):
+                    limitador.pausar(tempo_de_espera(erro, tentativa))
+                if self.reservas:
+                    evitar.add(modelo)
+            except Exception:
+                if pool:
+                    pool.registrar(chave, falha=True)
+                raise
+            else:
+                if pool:
+                    pool.registrar(chave, span.tokens_entrada - entrada_antes + span.tokens_saida - saida_antes)
+                return resposta
+
+    def _continuar(self, span, messages, resposta, tokens_saida, receptor):
+        """
+        Se a resposta bateu no max_tokens no meio de uma frase, lista ou JSON, faz uma
+        chamada curta pedindo o resto (o texto cortado vai como resposta do assistente)
+        e devolve o texto emendado. Se a continuação falhar, fica o texto cortado.
+        - tokens_saida: tokens da resposta informados pela API (0 = estimar pelo texto)
+        """
+        if not self.max_tokens or not isinstance(resposta, str):
+            return resposta
+        if (tokens_saida or len(resposta) // 4) < self.max_tokens * 0.95 or not incompleta(resposta):
+            return resposta
+        teto = max(MINIMO_CONTINUACAO, int(self.max_tokens * FRACAO_CONTINUACAO))
+        llm = self.variante(self.model, max_tokens=teto)
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        pedido = [*messages, {"role": "assistant", "content": resposta}, {"role": "user", "content": PEDIDO_CONTINUACAO}]
+        span.espera_fila += obter_limitador(self.model, self.api_key).aguardar(estimar_tokens(pedido, teto))
+        try:
+            if receptor:
+                continuacao = llm._transmitir(pedido, receptor, recomecar=False)
+            else:
+                continuacao = super(LLMGroq, llm).call(pedido)
+        except (RateLimitError, Timeout):
+            return resposta
+        span.continuacoes += 1
+        return resposta + (continuacao or "")
+
+    def _track_token_usage_internal(self, usage_data):
+        # O CrewAI chama isto com o uso informado pela API; repassamos ao span atual
+        super()._track_token_usage_internal(usage_data)
+        registrar_uso(usage_data)
+
+    def _transmitir(self, messages, receptor, recomecar=True):
+        """
+        Chama a API em streaming, repassando cada pedaço ao receptor; devolve o texto todo.
+        - recomecar: avisa o receptor (None) que o texto começa do zero; a
+          continuação de uma resposta cortada emenda no que já foi mostrado
+        """
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        parametros = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "api_key": self.api_key,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        if self.max_tokens:
+            parametros["max_tokens"] = self.max_tokens
+        if self.stop:
+            parametros["stop"] = self.stop
+        if self.timeout:
+            parametros["timeout"] = self.timeout
+        parametros.update(self.additional_params)
+
+        if recomecar:
+            receptor(None)
+        partes = []
+        for pedaco in litellm.completion(**parametros):
+            registrar_uso(getattr(pedaco, "usage", None))
+            texto = (pedaco.choices[0].delta.content or "") if pedaco.choices else ""
+            if texto:
+                partes.append(texto)
+                receptor(texto)
+        return "".join(partes)
@@ -0,0 +1,181 @@
+# ------------------------------------------------------------
+# 🧪 LLM falso (stub) para medir desempenho sem rede e sem API key
+# ------------------------------------------------------------
+# Substitui litellm.completion por uma versão local que espera uma
+# latência configurável, "gera" tokens a uma taxa fixa e pode devolver
+# RateLimitError (429) de propósito ou ao passar de um limite de RPM. O
+# CrewAI e o LLMGroq chamam o litellm normalmente, então todo o resto do
+# caminho é o de verdade.
+# ------------------------------------------------------------
+import json
+import random
+import re
+import threading
+import time
+import types
+from collections import deque
+from contextlib import contextmanager
+
+import litellm
+from litellm.exceptions import RateLimitError
+
+from regras_dnd import CAMPOS_NARRATIVOS
+
+PALAVRAS = (
+    "conceito exemplo aplicação resultado dados cenário definição importância "
+    "algoritmo estrutura passo prática aluno objetivo variável função"
+).split()
+
+
+class StubLLM:
+    """
+    Backend falso do litellm.
+    - latencia: segundos até o primeiro token
+    - tokens_por_segundo: velocidade de geração depois do primeiro token
+    - tokens_saida: tamanho aproximado de cada resposta
+    - taxa_429: fração das chamadas que devolve RateLimitError
+    - retry_after: segundos sugeridos na mensagem do 429
+    - semente: semente do sorteio dos 429 (resultados reproduzíveis)
+    - rpm: requisições por minuto aceitas por modelo e chave, como o limite da
+      API; acima disso devolve 429 com o tempo até liberar (None = sem limite)
+    """
+
+    def __init__(self, latencia=0.3, tokens_por_segundo=300, tokens_saida=250,
+                 taxa_429=0.0, retry_after=0.5, semente=42, rpm=None):
+        self.latencia = latencia
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_saida = tokens_saida
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self._janela = {}  # (modelo, chave) -> deque com o horário das chamadas aceitas no último minuto
+        self._sorteio = random.Random(semente)
+        self._lock = threading.Lock()
+        self.chamadas = 0
+        self.erros_429 = 0
+        self.intervalos = []  # (inicio, fim) de cada chamada que gerou texto
+
+    def _texto(self, mensagens):
+        # Resposta determinística por prompt, no formato que o agente espera
+        pedido = str(mensagens[-1].get("content", "")) if mensagens else ""
+        if pedido.startswith("Sua resposta acima foi cortada"):
+            # Continuação (llm_groq.PEDIDO_CONTINUACAO): o modelo só fecha a frase
+            return " e assim termina o resultado."
+        semente = sum(map(ord, pedido[:60]))
+        palavras, tamanho, i = [], 0, 0
+        while tamanho < self.tokens_saida * 4:  # ~4 caracteres por token
+            palavra = PALAVRAS[(semente + i) % len(PALAVRAS)]
+            i += 1
+            palavras.append(palavra + ("." if i % 12 == 0 else ""))  # frases de 12 palavras
+            tamanho += len(palavras[-1]) + 1
+        corpo = " ".join(palavras).rstrip(".") + "."
+        if "## Conceitos" in pedido and "## Cenários" in pedido:
+            # Núcleo do modo vários níveis: as três seções pedidas, como o modelo faria
+            terco = len(palavras) // 3
+            secoes = zip(("Conceitos", "Cenários", "Exercícios"), (0, terco, 2 * terco), (terco, 2 * terco, None))
+            corpo = "\n\n".join(f"## {titulo}\n{' '.join(palavras[de:ate])}" for titulo, de, ate in secoes)
+        if "=== PERSONAGEM: <nome> ===" in pedido:
+            # Modo grupo (equipes.montar_grupo): um bloco por personagem da lista, com os
+            # marcadores pedidos; conceito e descrição do tamanho de uma resposta avulsa
+            nomes = re.findall(r"^\s*\d+\.\s*(.+?)\s*\|", pedido, re.M)
+            ficha = json.dumps({campo: " ".join(palavras[:12]) for campo in CAMPOS_NARRATIVOS}, ensure_ascii=False)
+            corpo = "\n\n".join(
+                f"=== PERSONAGEM: {nome} ===\n--- CONCEITO ---\n{corpo}\n--- FICHA ---\n{ficha}\n"
+                f"--- DESCRIÇÃO ---\n{corpo}"
+                for nome in nomes
+            )
+        if any("=== GABARITO ===" in str(m.get("content", "")) for m in mensagens):
+            # Modo fundido: exercícios e gabarito na mesma resposta, como o modelo faria
+            corpo = f"{corpo}\n\n=== GABARITO ===\n\n{corpo}"
+        return f"Thought: I now can give a great answer\nFinal Answer: # Resposta\n\n{corpo}"
+
+    def _cortar(self, texto, max_tokens):
+        """Corta no max_tokens da chamada, como a API; devolve (texto, finish_reason)."""
+        if max_tokens and len(texto) // 4 > max_tokens:
+            return texto[:max_tokens * 4], "length"
+        return texto, "stop"
+
+    def _talvez_429(self, modelo, chave=None):
+        agora = time.time()
+        with self._lock:
+            self.chamadas += 1
+            falhar = self._sorteio.random() < self.taxa_429
+            espera = self.retry_after
+            if not falhar and self.rpm:
+                janela = self._janela.setdefault((modelo, chave), deque())
+                while janela and janela[0] <= agora - 60:
+                    janela.popleft()
+                falhar = len(janela) >= self.rpm
+                if falhar:
+                    espera = round(janela[0] + 60 - agora, 2)
+                else:
+                    janela.append(agora)
+            if falhar:
+                self.erros_429 += 1
+        if falhar:
+            time.sleep(0.02)
+            raise RateLimitError(
+                message=f"Rate limit reached for model {modelo}. Please try again in {espera}s.",
+                llm_provider="groq",
+                model=modelo,
+            )
+
+    def _uso(self, mensagens, texto):
+        entrada = sum(len(str(m.get("content", ""))) for m in mensagens) // 4
+        saida = len(texto) // 4
+        return {"prompt_tokens": entrada, "completion_tokens": saida, "total_tokens": entrada + saida}
+
+    def completion(self, model, messages, stream=False, max_tokens=None, **kwargs):
+        self._talvez_429(model, kwargs.get("api_key"))
+        texto, motivo = self._cortar(self._texto(messages), max_tokens)
+        uso = self._uso(messages, texto)
+        if stream:
+            return self._transmitir(texto, uso)
+
+        inicio = time.time()
+        time.sleep(self.latencia + uso["completion_tokens"] / self.tokens_por_segundo)
+        with self._lock:
+            self.intervalos.append((inicio, time.time()))
+        return litellm.ModelResponse(
+            model=model,
+            choices=[{"index": 0, "finish_reason": motivo, "message": {"role": "assistant", "content": texto}}],
+            usage=uso,
+        )
+
+    def _transmitir(self, texto, uso):
+        inicio = time.time()
+        time.sleep(self.latencia)
+        pedacos = [texto[i:i + 16] for i in range(0, len(texto), 16)]  # ~4 tokens por pedaço
+        for pedaco in pedacos:
+            time.sleep(4 / self.tokens_por_segundo)
+            delta = types.SimpleNamespace(content=pedaco)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+        with self._lock:
+            self.intervalos.append((inicio, time.time()))
+        yield types.SimpleNamespace(choices=[], usage=uso)
+
+    def tempo_ocupado(self, inicio, fim):
+        """Tempo de parede, entre inicio e fim, em que pelo menos uma chamada estava gerando."""
+        with self._lock:
+            trechos = sorted((max(a, inicio), min(b, fim)) for a, b in self.intervalos if b > inicio and a < fim)
+        total, atual_ini, atual_fim = 0.0, None, None
+        for a, b in trechos:
+            if atual_fim is None or a > atual_fim:
+                if atual_fim is not None:
+                    total += atual_fim - atual_ini
+                atual_ini, atual_fim = a, b
+            else:
+                atual_fim = max(atual_fim, b)
+        if atual_fim is not None:
+            total += atual_fim - atual_ini
+        return total
+
+    @contextmanager
+    def instalado(self):
+        """Troca litellm.completion pelo stub enquanto o bloco roda."""
+        original = litellm.completion
+        litellm.completion = self.completion
+        try:
+            yield self
+        finally:
+            litellm.completion = original
@@ -0,0 +1,149 @@
+# ------------------------------------------------------------
+# 📦 Geração em lote de material de estudo (sem interface)
+# ------------------------------------------------------------
+# Lê uma lista de temas (CSV ou JSONL com tema, nivel, objetivo), monta
+# para cada tema os mesmos agentes e tarefas do aula_p.py e gera vários
+# temas ao mesmo tempo, com um número limitado de workers. Todas as
+# chamadas passam pelo mesmo limitador de requisições do modelo.
+# Cada tema vira uma linha no JSONL de saída; rodando de novo com a mesma
+# saída, os temas já gerados são pulados (retomada após interrupção); num
+# tema que falhou no meio, só as tarefas que faltaram rodam (retomada.py).
+#
+# Uso:
+#   GROQ_API_KEY=... python lote_aula.py temas.csv --saida material.jsonl --workers 4
+# ------------------------------------------------------------
+import argparse
+import concurrent.futures as cf
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+from chaves import obter_pool
+from equipes import montar_aula_p
+from llm_groq import LLMGroq
+from orcamento import aplicar_orcamentos
+from orquestracao import executar_em_paralelo
+from rastreamento import Rastro
+
+MODELO_PADRAO = "groq/llama-3.3-70b-versatile"
+CAMPOS_SAIDA = ("resumo", "exemplos", "exercicios", "gabarito")
+
+
+def ler_temas(caminho):
+    """Lê os temas de um CSV (com cabeçalho) ou de um JSONL; linhas sem tema são ignoradas."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        if caminho.lower().endswith((".jsonl", ".json")):
+            linhas = [json.loads(linha) for linha in arquivo if linha.strip()]
+        else:
+            linhas = list(csv.DictReader(arquivo))
+    temas = []
+    for linha in linhas:
+        tema = (linha.get("tema") or "").strip()
+        if tema:
+            temas.append({
+                "tema": tema,
+                "nivel": (linha.get("nivel") or "").strip() or "não informado",
+                "objetivo": (linha.get("objetivo") or "").strip() or "não informado",
+            })
+    return temas
+
+
+def chave_tema(inputs):
+    return (inputs["tema"], inputs["nivel"], inputs["objetivo"])
+
+
+def temas_concluidos(caminho):
+    """Temas que já têm registro com status "ok" na saída (os com erro são refeitos)."""
+    concluidos = set()
+    if not os.path.exists(caminho):
+        return concluidos
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue  # linha cortada por uma interrupção no meio da escrita
+            if registro.get("status") == "ok":
+                concluidos.add(chave_tema(registro))
+    return concluidos
+
+
+def gerar_tema(llm, inputs, mostrar_gabarito=True):
+    """Gera o material de um tema; devolve o registro a gravar no JSONL."""
+    inicio = time.time()
+    registro = dict(inputs, modelo=llm.model)
+    rastro = Rastro("lote_aula", inputs).ativar()
+    try:
+        agents, tasks = montar_aula_p(llm, mostrar_gabarito)
+        aplicar_orcamentos(tasks)
+        # Com --refazer o pedido é por texto novo: pontos de um lote interrompido ficam de fora
+        saidas = executar_em_paralelo(agents, tasks, inputs, retomada="lote_aula" if llm.usar_cache else None)
+        registro.update({campo: saida.raw for campo, saida in zip(CAMPOS_SAIDA, saidas)})
+        registro["status"] = "ok"
+    except Exception as erro:
+        registro.update(status="erro", erro=repr(erro))
+    finally:
+        rastro.encerrar()
+    registro["duracao"] = round(time.time() - inicio, 2)
+    return registro
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera material de estudo para vários temas (aula_p em lote).")
+    parser.add_argument("entrada", help="CSV ou JSONL com as colunas tema, nivel, objetivo")
+    parser.add_argument("--saida", default="material.jsonl", help="JSONL de saída (também usado para retomar)")
+    parser.add_argument("--workers", type=int, default=4, help="temas gerados ao mesmo tempo")
+    parser.add_argument("--modelo", default=MODELO_PADRAO)
+    parser.add_argument("--sem-gabarito", action="store_true")
+    parser.add_argument("--refazer", action="store_true", help="ignora o cache de respostas")
+    opcoes = parser.parse_args()
+
+    # Com várias chaves (GROQ_API_KEYS), cada chamada vai para a que tem mais folga
+    api_key = obter_pool().principal
+    if not api_key:
+        print("Defina a variável de ambiente GROQ_API_KEY (ou GROQ_API_KEYS).", file=sys.stderr)
+        return 2
+
+    temas = ler_temas(opcoes.entrada)
+    concluidos = temas_concluidos(opcoes.saida)
+    pendentes = [t for t in temas if chave_tema(t) not in concluidos]
+    print(f"{len(temas)} temas, {len(temas) - len(pendentes)} já gerados, {len(pendentes)} pendentes")
+    if not pendentes:
+        return 0
+
+    # Um LLM só: o limitador e o cache já são únicos por processo
+    llm = LLMGroq(model=opcoes.modelo, api_key=api_key, usar_cache=not opcoes.refazer, temperature=0.3)
+
+    escrita = threading.Lock()
+    inicio = time.time()
+    feitos = erros = 0
+    with open(opcoes.saida, "a", encoding="utf-8") as saida, \
+            cf.ThreadPoolExecutor(max_workers=max(1, opcoes.workers)) as pool:
+        futuros = [pool.submit(gerar_tema, llm, t, not opcoes.sem_gabarito) for t in pendentes]
+        for futuro in cf.as_completed(futuros):
+            registro = futuro.result()
+            with escrita:
+                saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                saida.flush()
+            feitos += 1
+            erros += registro["status"] != "ok"
+            por_minuto = feitos / max(time.time() - inicio, 1e-9) * 60
+            marca = "✅" if registro["status"] == "ok" else "❌"
+            print(f"[{feitos}/{len(pendentes)}] {marca} {registro['tema']} "
+                  f"({registro['duracao']:.1f}s) · {por_minuto:.1f} temas/min")
+
+    decorrido = time.time() - inicio
+    print(f"\nConcluído em {decorrido:.1f}s: {feitos - erros} ok, {erros} com erro, "
+          f"{feitos / max(decorrido, 1e-9) * 60:.1f} temas/min")
+    if len(obter_pool()) > 1:
+        for uso in obter_pool().uso():
+            print(f"  🔑 {uso['chave']}: {uso['chamadas']} chamadas, {uso['tokens']} tokens, "
+                  f"{uso['erros_429']}×429, {uso['quarentenas']} quarentena(s)")
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
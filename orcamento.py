@@ -0,0 +1,145 @@
+# ------------------------------------------------------------
+# ✂️ Orçamento de saída por tarefa (max_tokens tirado do expected_output)
+# ------------------------------------------------------------
+# Cada tarefa já diz o tamanho que quer ("150–220 palavras", "até 5 linhas
+# cada", "1-2 parágrafos"), mas nenhuma chamada tinha max_tokens: quando o
+# modelo se estende, a tarefa demora mais e gasta mais TPM. Aqui o tamanho
+# pedido na descrição e no expected_output vira um teto de tokens, com folga,
+# e o LLM do agente passa a chamar a API com esse max_tokens (a reserva no
+# limitador também cai para o teto). Se a resposta bater no teto no meio de
+# uma frase, lista ou JSON, o LLMGroq faz uma continuação curta em vez de
+# rodar a tarefa de novo.
+# ------------------------------------------------------------
+import math
+import os
+import re
+
+from rastreamento import nome_tarefa
+
+# Desligado com ORCAMENTO_SAIDA=0 (o benchmark --orcamento liga e desliga aqui)
+ATIVO = os.environ.get("ORCAMENTO_SAIDA", "1") != "0"
+
+# Conversões grosseiras para PT-BR no tokenizador do Llama
+TOKENS_POR_PALAVRA = 1.6
+PALAVRAS_POR_PARAGRAFO = 90
+PALAVRAS_POR_LINHA = 12
+PALAVRAS_POR_FRASE = 20
+PALAVRAS_POR_MARCADOR = 15
+PALAVRAS_POR_ITEM = 15  # título, "**Resposta:**", numeração...
+
+# Folga sobre o tamanho pedido, tokens do "Thought: ... Final Answer:" do CrewAI
+# e o menor teto aceito
+FOLGA = 1.5
+TOKENS_FIXOS = 40
+TETO_MINIMO = 200
+
+# Teto por `name` da tarefa, acima do que vem do texto (None = sem teto)
+ORCAMENTO_DAS_TAREFAS = {
+    "ficha": 300,  # JSON com seis frases curtas
+    "exercicios": None,  # a descrição não dá tamanho; no modo fundido traz também o gabarito
+    "nucleo": None,  # conceitos, cenários e ideias de exercício de todos os níveis de uma vez
+}
+
+_FAIXA = r"(?:(\d+)\s*(?:[–-]|a|,)\s*)?(\d+)"
+_PALAVRAS = re.compile(rf"{_FAIXA}\s*palavras", re.I)
+_PARAGRAFOS = re.compile(rf"{_FAIXA}\s*par[áa]grafos?", re.I)
+_LINHAS_CADA = re.compile(r"até\s*(\d+)\s*linhas?\s*cada", re.I)
+_FRASES = re.compile(rf"{_FAIXA}\s*\)?\s*frases?", re.I)
+_MARCADORES = re.compile(rf"{_FAIXA}\s*(?:bullets|marcadores|ideias|pontos)", re.I)
+_ITENS = re.compile(r"\b(\d+)\s*(?:exemplos|exercícios|itens|perguntas)", re.I)
+_LISTA = re.compile(r"(?:\(|itens\s*|\b)1\s*(?:[–-]|a)\s*(\d+)\)?", re.I)
+_POR_ITEM = re.compile(r"cada item|por item|por exercício", re.I)
+# Faixa sozinha entre parênteses: "por que importa (2-3)" depois de "definição (3-4 frases)"
+_PARTE = re.compile(rf"\(\s*{_FAIXA}\s*\)")
+
+
+def _maior(padrao, texto):
+    """Maior limite superior das faixas encontradas ("150–220" -> 220), ou 0."""
+    return max((int(m.groups()[-1]) for m in padrao.finditer(texto)), default=0)
+
+
+def _soma(padrao, texto):
+    """Soma dos limites superiores das faixas encontradas ("2 a 3 ... 1 a 2" -> 5), ou 0."""
+    return sum(int(m.groups()[-1]) for m in padrao.finditer(texto))
+
+
+def _frases(texto):
+    """
+    Frases pedidas, somando as partes de cada trecho: "definição (3-4 frases), por que
+    importa (2-3), onde se aplica (2,3)" -> 10. A faixa sozinha entre parênteses só
+    conta depois de uma faixa de frases no mesmo trecho (antes dela, é numeração).
+    """
+    total = 0
+    for trecho in re.split(r"[.\n]", texto):
+        explicitas = list(_FRASES.finditer(trecho))
+        if not explicitas:
+            continue
+        total += sum(int(m.groups()[-1]) for m in explicitas)
+        for parte in _PARTE.finditer(trecho, explicitas[0].end()):
+            if not any(m.start() <= parte.start() < m.end() for m in explicitas):
+                total += int(parte.groups()[-1])
+    return total
+
+
+def palavras_pedidas(texto):
+    """
+    Quantas palavras, no máximo, o texto da tarefa pede; 0 se ele não diz.
+    Vale o primeiro que aparecer: palavras, parágrafos, linhas por item ou
+    frases + marcadores. Parágrafos e frases de partes diferentes somam
+    ("CONCEITO: 2 a 3 parágrafos ... DESCRIÇÃO: 1 a 2 parágrafos" -> 5); palavras
+    e marcadores são um total só, que a descrição e o expected_output costumam repetir.
+    """
+    if palavras := _maior(_PALAVRAS, texto):
+        return palavras
+    if paragrafos := _soma(_PARAGRAFOS, texto):
+        return paragrafos * PALAVRAS_POR_PARAGRAFO
+
+    itens = max(_maior(_LISTA, texto), *(int(m.group(1)) for m in _ITENS.finditer(texto)), 1)
+    extra = itens * PALAVRAS_POR_ITEM if itens > 1 else 0
+    linhas = max((int(m.group(1)) for m in _LINHAS_CADA.finditer(texto)), default=0)
+    if linhas:
+        return itens * linhas * PALAVRAS_POR_LINHA + extra
+    frases = _frases(texto) * PALAVRAS_POR_FRASE
+    if frases and _POR_ITEM.search(texto):
+        frases *= itens
+    marcadores = _maior(_MARCADORES, texto) * PALAVRAS_POR_MARCADOR
+    return frases + marcadores + extra if frases or marcadores else 0
+
+
+def orcamento_da_tarefa(tarefa, ajustes=None):
+    """
+    Teto de tokens de saída da tarefa, ou None (sem teto).
+    - tarefa: Task com description/expected_output
+    - ajustes: {name: tokens ou None} deste app, acima de ORCAMENTO_DAS_TAREFAS
+    """
+    tetos = {**ORCAMENTO_DAS_TAREFAS, **(ajustes or {})}
+    nome = nome_tarefa(tarefa)
+    if nome in tetos:
+        return tetos[nome]
+    palavras = palavras_pedidas(f"{tarefa.description}\n{tarefa.expected_output}")
+    if not palavras:
+        return None
+    return max(TETO_MINIMO, math.ceil(palavras * TOKENS_POR_PALAVRA * FOLGA) + TOKENS_FIXOS)
+
+
+def aplicar_orcamentos(tarefas, ajustes=None):
+    """
+    Dá a cada agente um LLM com o max_tokens da sua tarefa (um agente por tarefa,
+    como em equipes.py). Chamar depois do rotear(), que também troca o LLM.
+    - tarefas: lista de Task
+    - ajustes: {name: tokens ou None} deste app (ex.: {"exemplos": 900})
+    Devolve {name: teto} das tarefas que ficaram com teto.
+    """
+    tetos = {}
+    if not ATIVO:
+        return tetos
+    for tarefa in tarefas:
+        llm = getattr(tarefa.agent, "llm", None)
+        if llm is None or not hasattr(llm, "variante"):
+            continue  # tarefa local (sem agente) ou LLM que não é o LLMGroq
+        teto = orcamento_da_tarefa(tarefa, ajustes)
+        if teto is None or (llm.max_tokens and llm.max_tokens <= teto):
+            continue
+        tarefa.agent.llm = llm.variante(llm.model, llm.reservas, max_tokens=teto)
+        tetos[nome_tarefa(tarefa)] = teto
+    return tetos
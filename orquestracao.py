@@ -0,0 +1,240 @@
+# ------------------------------------------------------------
+# ⚙️ Orquestração por dependências (DAG) das tarefas do CrewAI
+# ------------------------------------------------------------
+# O Process.sequential roda uma tarefa depois da outra, mesmo quando elas
+# não dependem entre si. Aqui montamos um grafo a partir do `context` de
+# cada Task e disparamos em paralelo tudo que já tem as dependências prontas.
+# O tempo total fica perto do caminho mais longo, e não da soma das tarefas.
+# Com `retomada`, cada saída é gravada assim que a tarefa termina e uma
+# geração interrompida recomeça das tarefas que faltam (retomada.py).
+# ------------------------------------------------------------
+import concurrent.futures as cf
+import contextvars
+import queue
+import time
+from types import SimpleNamespace
+
+from crewai.tasks.task_output import TaskOutput
+
+from llm_groq import cancelavel_por, transmitindo_para
+from rastreamento import nome_tarefa, span_tarefa
+from retomada import chave_ponto, obter_pontos
+
+# Mesmo separador que o CrewAI usa para juntar as saídas do contexto
+SEPARADOR_CONTEXTO = "\n\n----------\n\n"
+
+
+def montar_dependencias(tarefas):
+    """
+    Monta o DAG {id(tarefa): [tarefas das quais ela depende]}.
+    - tarefas: lista de Task, na ordem em que seriam executadas no modo sequencial
+    Só o `context` explícito conta como dependência; tarefas sem context são
+    independentes (no modo sequencial elas recebiam a saída das anteriores).
+    """
+    ids = {id(t) for t in tarefas}
+    dependencias = {}
+    for tarefa in tarefas:
+        contexto = tarefa.context if isinstance(tarefa.context, list) else []
+        for dep in contexto:
+            if id(dep) not in ids:
+                raise ValueError(f"A tarefa '{tarefa.description[:40]}' depende de uma tarefa fora da lista.")
+        dependencias[id(tarefa)] = list(contexto)
+
+    # Verifica ciclos (ordenação topológica simples)
+    resolvidas = set()
+    restantes = list(tarefas)
+    while restantes:
+        prontas = [t for t in restantes if all(id(d) in resolvidas for d in dependencias[id(t)])]
+        if not prontas:
+            raise ValueError("Dependências circulares entre as tarefas.")
+        for t in prontas:
+            resolvidas.add(id(t))
+            restantes.remove(t)
+    return dependencias
+
+
+def interpolar_entradas(agentes, tarefas, inputs):
+    """Substitui {tema}, {nivel} etc. nos agentes e tarefas, como o crew.kickoff faz."""
+    for tarefa in tarefas:
+        if hasattr(tarefa, "interpolate_inputs_and_add_conversation_history"):
+            tarefa.interpolate_inputs_and_add_conversation_history(inputs)
+        else:
+            tarefa.interpolate_inputs(inputs)
+    for agente in agentes:
+        agente.interpolate_inputs(inputs)
+
+
+def resposta_parcial(texto):
+    """
+    Parte do texto transmitido que vai para a aba.
+    O agente responde no formato "Thought: ... Final Answer: ..."; enquanto o
+    "Final Answer:" não chega, não há nada para mostrar.
+    """
+    if "Final Answer:" in texto:
+        return texto.split("Final Answer:", 1)[1].lstrip()
+    return ""
+
+
+def _executar_tarefa(tarefa, contexto, espera=0, fila=None, tentativa=1, cancelar=None):
+    """Roda uma única tarefa na thread do pool (esperando antes, se for re-tentativa)."""
+    if espera:
+        time.sleep(espera)
+    with span_tarefa(tarefa, tentativa), cancelavel_por(cancelar):
+        if fila is None:
+            return tarefa.execute_sync(agent=tarefa.agent, context=contexto)
+        # Cada pedaço gerado pelo LLM vai para a fila; quem mostra é a thread principal
+        with transmitindo_para(lambda pedaco: fila.put((tarefa, pedaco))):
+            return tarefa.execute_sync(agent=tarefa.agent, context=contexto)
+
+
+def _texto_do_ponto(tarefa, saida):
+    # Tarefas que guardam mais do que o `raw` (ex.: exercícios com o gabarito
+    # do modo fundido) dizem o que precisa ir para o ponto de retomada
+    guardar = getattr(tarefa, "ponto_de_retomada", None)
+    return guardar() if guardar is not None else saida.raw
+
+
+def _retomar(tarefa, texto):
+    """Saída da tarefa tirada do ponto de retomada, sem chamar o LLM."""
+    with span_tarefa(tarefa) as span:
+        span.retomada = True
+        restaurar = getattr(tarefa, "retomar", None)
+        tarefa.output = TaskOutput(
+            name=tarefa.name, description=tarefa.description, expected_output=tarefa.expected_output,
+            raw=restaurar(texto) if restaurar is not None else texto, agent="retomada",
+        )
+    return tarefa.output
+
+
+def _submeter(pool, *args, **kwargs):
+    # Copia o contexto (rastro de desempenho etc.) para a thread do pool
+    return pool.submit(contextvars.copy_context().run, _executar_tarefa, *args, **kwargs)
+
+
+def executar_dag(agentes, tarefas, inputs, max_paralelo=None, tentativas=1, espera=5,
+                 repetir_em=(Exception,), devolver_erros=False, ao_repetir=None,
+                 ao_transmitir=None, prontas=None, cancelar=None, retomada=None):
+    """
+    Executa as tarefas respeitando o DAG e devolve (tarefa, saída) à medida que terminam.
+    - agentes: lista de Agent usados pelas tarefas
+    - tarefas: lista de Task
+    - inputs: dicionário de variáveis (o mesmo do crew.kickoff)
+    - max_paralelo: máximo de tarefas simultâneas (padrão: todas)
+    - tentativas: quantas vezes cada tarefa pode rodar; só a tarefa que falhou é repetida
+    - espera: segundos antes de repetir uma tarefa que falhou
+    - repetir_em: tipos de erro que justificam nova tentativa (ex.: RateLimitError)
+    - devolver_erros: se True, uma tarefa que falhou de vez vem como (tarefa, exceção)
+      e as outras continuam; se False, o erro é levantado
+    - ao_repetir: função (tarefa, tentativa, erro) chamada antes de cada re-tentativa
+    - ao_transmitir: função (tarefa, texto_parcial) chamada a cada pedaço gerado;
+      liga o modo streaming do LLMGroq
+    - prontas: {id(tarefa): texto} de tarefas da lista que já têm saída (ex.: guardada
+      na sessão); elas não rodam de novo e o texto vai como context para quem depende delas
+    - cancelar: threading.Event; quando ligado, nada mais é disparado e o gerador
+      termina (a chamada ao LLM que já está no ar segue até voltar, sem ser usada)
+    - retomada: nome do app para os pontos de retomada (None = sem pontos); tarefa com
+      ponto gravado por uma geração interrompida com as mesmas entradas não roda de novo
+    As funções de retorno rodam na thread que consome o gerador (a do Streamlit).
+    Cada saída também fica em `tarefa.output`, igual ao modo sequencial.
+    """
+    dependencias = montar_dependencias(tarefas)
+    interpolar_entradas(agentes, tarefas, inputs)
+
+    prontas = prontas or {}
+    pendentes = [t for t in tarefas if id(t) not in prontas]
+    concluidas = {i: SimpleNamespace(raw=texto) for i, texto in prontas.items()}
+    falhas = set()
+    em_execucao = {}
+    fila = queue.Queue() if ao_transmitir else None
+    transmitido = {}
+    pool = cf.ThreadPoolExecutor(max_workers=max_paralelo or len(pendentes) or 1)
+    pontos = obter_pontos() if retomada else None
+    chaves = {}  # id(tarefa) -> chave do ponto de retomada
+
+    def repassar_transmissao():
+        while fila is not None and not fila.empty():
+            tarefa, pedaco = fila.get_nowait()
+            if pedaco is None:
+                # Nova chamada ao LLM dentro da mesma tarefa: recomeça o texto
+                transmitido[id(tarefa)] = ""
+                continue
+            transmitido[id(tarefa)] = transmitido.get(id(tarefa), "") + pedaco
+            parcial = resposta_parcial(transmitido[id(tarefa)])
+            # Tarefas que pós-processam a resposta (ex.: ficha, exercícios com gabarito)
+            # escolhem o que do texto parcial pode aparecer na aba
+            visivel = getattr(tarefa, "parcial_visivel", None)
+            if parcial and visivel is not None:
+                parcial = visivel(parcial)
+            if parcial:
+                ao_transmitir(tarefa, parcial)
+
+    try:
+        while pendentes or em_execucao:
+            if cancelar is not None and cancelar.is_set():
+                return
+            # Dispara toda tarefa cujas dependências já terminaram
+            for tarefa in list(pendentes):
+                deps = dependencias[id(tarefa)]
+                if any(id(d) in falhas for d in deps):
+                    # Dependência falhou de vez: esta tarefa também não tem como rodar
+                    pendentes.remove(tarefa)
+                    falhas.add(id(tarefa))
+                    yield tarefa, RuntimeError("Uma tarefa da qual esta depende falhou.")
+                elif all(id(d) in concluidas for d in deps):
+                    contexto = SEPARADOR_CONTEXTO.join(concluidas[id(d)].raw for d in deps) or None
+                    if pontos is not None:
+                        chaves[id(tarefa)] = chave_ponto(retomada, inputs, tarefa, contexto)
+                        texto = pontos.obter(chaves[id(tarefa)])
+                        if texto is not None:
+                            pendentes.remove(tarefa)
+                            concluidas[id(tarefa)] = _retomar(tarefa, texto)
+                            yield tarefa, concluidas[id(tarefa)]
+                            continue
+                    futuro = _submeter(pool, tarefa, contexto, 0, fila, cancelar=cancelar)
+                    em_execucao[futuro] = (tarefa, contexto, 1)
+                    pendentes.remove(tarefa)
+            if not em_execucao:
+                continue
+
+            # Com streaming (ou podendo ser cancelado), acorda de tempos em tempos
+            feitos, _ = cf.wait(
+                em_execucao, timeout=0.1 if fila or cancelar else None, return_when=cf.FIRST_COMPLETED
+            )
+            repassar_transmissao()
+            for futuro in feitos:
+                tarefa, contexto, tentativa = em_execucao.pop(futuro)
+                try:
+                    saida = futuro.result()
+                except repetir_em as erro:
+                    if tentativa < tentativas and not (cancelar is not None and cancelar.is_set()):
+                        if ao_repetir:
+                            ao_repetir(tarefa, tentativa + 1, erro)
+                        futuro = _submeter(pool, tarefa, contexto, espera, fila, tentativa + 1, cancelar=cancelar)
+                        em_execucao[futuro] = (tarefa, contexto, tentativa + 1)
+                        continue
+                    if not devolver_erros:
+                        raise
+                    falhas.add(id(tarefa))
+                    yield tarefa, erro
+                    continue
+                except Exception as erro:
+                    if not devolver_erros:
+                        raise
+                    falhas.add(id(tarefa))
+                    yield tarefa, erro
+                    continue
+                concluidas[id(tarefa)] = saida
+                if pontos is not None:
+                    pontos.guardar(chaves[id(tarefa)], retomada, nome_tarefa(tarefa), _texto_do_ponto(tarefa, saida))
+                yield tarefa, saida
+        if pontos is not None and not falhas:
+            # Geração completa: nada a retomar
+            pontos.apagar(chaves.values())
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def executar_em_paralelo(agentes, tarefas, inputs, max_paralelo=None, retomada=None):
+    """Roda executar_dag até o fim e devolve a lista de saídas na ordem das tarefas."""
+    saidas = {id(t): s for t, s in executar_dag(agentes, tarefas, inputs, max_paralelo, retomada=retomada)}
+    return [saidas[id(t)] for t in tarefas]
@@ -0,0 +1,159 @@
+# ------------------------------------------------------------
+# 📝 Compilação e compactação dos prompts dos agentes
+# ------------------------------------------------------------
+# O CrewAI monta o prompt de cada chamada juntando role, backstory e goal
+# do agente com a descrição e o expected_output da tarefa. Nos apps, o goal
+# muitas vezes repete o que a descrição da tarefa já pede ("NÃO incluir
+# respostas", "resumo didático sobre {tema}..."), e essas repetições viram
+# tokens de entrada em toda chamada (contam no TPM e na latência).
+# Aqui o prompt final é renderizado e medido, as frases do goal já cobertas
+# pela tarefa saem, e os espaços ficam no formato canônico.
+# ------------------------------------------------------------
+import re
+import unicodedata
+
+from limitador import estimar_tokens
+
+# Fração das palavras de uma frase do goal que precisa aparecer na tarefa
+# para a frase ser considerada repetida
+LIMIAR_COBERTURA = 0.7
+
+PALAVRAS_VAZIAS = set(
+    "a o as os um uma uns umas de do da dos das em no na nos nas para por pelo pela com "
+    "sem sobre e ou que se ao aos cada seu sua seus suas ser deve devem como mais".split()
+)
+
+
+def _sem_acento(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+
+
+def _radical(palavra):
+    # Radical grosseiro: "criar"/"crie" -> "cri", "respostas" -> "respost"
+    palavra = _sem_acento(palavra.lower())
+    if palavra.startswith("{"):
+        return palavra
+    palavra = palavra.rstrip("s").rstrip("r")
+    return palavra.rstrip("aeiou") or palavra
+
+
+def _radicais(texto):
+    palavras = re.findall(r"\{\w+\}|\w+", texto)
+    return {
+        _radical(p) for p in palavras
+        if _sem_acento(p.lower()) not in PALAVRAS_VAZIAS and (len(p) > 2 or p.isdigit() or p.lower() == "não")
+    }
+
+
+def normalizar_espacos(texto):
+    """Forma canônica: espaço depois de pontuação colada ("objetivo}.A" -> "objetivo}. A") e sem espaços sobrando."""
+    texto = re.sub(r"([.!?:])(?=[A-ZÀ-Ý])", r"\1 ", texto)
+    linhas = [re.sub(r"[ \t]+", " ", linha).strip() for linha in texto.splitlines()]
+    return "\n".join(linhas).strip()
+
+
+def _frases(texto):
+    return [f.strip() for f in re.split(r"(?<=[.!?])\s+|\n+", texto) if f.strip()]
+
+
+def compactar_goal(goal, texto_tarefas):
+    """
+    Tira do goal as frases que a tarefa já diz.
+    - goal: goal do agente (template, com {tema} etc.)
+    - texto_tarefas: descrição + expected_output das tarefas do agente
+    A primeira frase fica se todas forem repetidas (o goal não pode ficar vazio).
+    """
+    cobertas = _radicais(texto_tarefas)
+    frases = _frases(normalizar_espacos(goal))
+    mantidas = []
+    for frase in frases:
+        radicais = _radicais(frase)
+        cobertura = len(radicais & cobertas) / len(radicais) if radicais else 1.0
+        if cobertura < LIMIAR_COBERTURA:
+            mantidas.append(frase)
+    return " ".join(mantidas or frases[:1])
+
+
+def _sem_frases_repetidas(texto):
+    vistas, linhas = set(), []
+    for linha in normalizar_espacos(texto).splitlines():
+        frases = []
+        for frase in re.split(r"(?<=[.!?])\s+", linha):
+            chave = _sem_acento(frase.lower()).strip(" .")
+            if chave and chave in vistas:
+                continue
+            vistas.add(chave)
+            frases.append(frase)
+        linhas.append(" ".join(frases))
+    return "\n".join(linhas)
+
+
+def _preencher(texto, inputs):
+    for chave, valor in (inputs or {}).items():
+        texto = texto.replace("{" + chave + "}", str(valor))
+    return texto
+
+
+def renderizar_prompt(agente, tarefa, inputs=None):
+    """Prompt que o agente manda ao LLM para a tarefa (system + user), com as entradas preenchidas."""
+    from crewai.utilities.prompts import Prompts
+
+    partes = Prompts(agent=agente, use_system_prompt=bool(agente.use_system_prompt)).task_execution()
+    if "system" in partes:
+        texto = partes["system"] + "\n" + partes["user"]
+    else:
+        texto = partes["prompt"]
+    return _preencher(texto.replace("{input}", tarefa.prompt()), inputs)
+
+
+def _definir(objeto, campo, valor):
+    # Se o objeto já foi interpolado, o CrewAI parte do "_original_*" na próxima vez
+    setattr(objeto, campo, valor)
+    if getattr(objeto, f"_original_{campo}", None) is not None:
+        setattr(objeto, f"_original_{campo}", valor)
+
+
+def compactar_prompts(agentes, tarefas, inputs=None, aplicar=True):
+    """
+    Mede o prompt de cada tarefa e, se `aplicar`, compacta agentes e tarefas.
+    - agentes: lista de Agent
+    - tarefas: lista de Task (cada uma com seu agente)
+    - inputs: entradas usadas só para medir (tema, nivel...)
+    - aplicar: se False, só mede
+    Devolve uma linha por tarefa: {"tarefa", "tokens_antes", "tokens_depois"}.
+    """
+    from rastreamento import nome_tarefa
+
+    antes = {id(t): estimar_tokens(renderizar_prompt(t.agent, t, inputs), 0) for t in tarefas if t.agent}
+    if aplicar:
+        for tarefa in tarefas:
+            _definir(tarefa, "description", _sem_frases_repetidas(tarefa.description))
+            _definir(tarefa, "expected_output", normalizar_espacos(tarefa.expected_output))
+        for agente in agentes:
+            texto_tarefas = "\n".join(
+                f"{t.description}\n{t.expected_output}" for t in tarefas if t.agent is agente
+            )
+            if texto_tarefas:
+                _definir(agente, "goal", compactar_goal(agente.goal, texto_tarefas))
+            _definir(agente, "backstory", normalizar_espacos(agente.backstory))
+
+    return [
+        {
+            "tarefa": nome_tarefa(t),
+            "tokens_antes": antes[id(t)],
+            "tokens_depois": estimar_tokens(renderizar_prompt(t.agent, t, inputs), 0),
+        }
+        for t in tarefas if t.agent
+    ]
+
+
+def mostrar_prompts(relatorio):
+    """Expander "Prompts" com os tokens de entrada de cada tarefa antes e depois da compactação."""
+    import streamlit as st
+
+    antes = sum(linha["tokens_antes"] for linha in relatorio)
+    depois = sum(linha["tokens_depois"] for linha in relatorio)
+    with st.expander("📝 Prompts", expanded=False):
+        economia = 1 - depois / antes if antes else 0.0
+        st.caption(f"Tokens de entrada por geração: {antes} → {depois} ({economia:.0%} a menos)")
+        st.dataframe(relatorio, width="stretch")
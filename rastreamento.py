@@ -0,0 +1,284 @@
+# ------------------------------------------------------------
+# ⏱️ Rastreamento de desempenho (spans por tarefa e por chamada ao LLM)
+# ------------------------------------------------------------
+# Cada geração vira um "rastro" com um span por tarefa (resumo, exemplos,
+# exercicios, gabarito, conceito, ficha, descricao) e um span por chamada
+# ao LLM: início/fim, espera na fila do limitador, tokens de entrada e
+# saída (e o teto), tokens/s, re-tentativas, continuações, acerto de cache,
+# retomada de uma geração interrompida e modelo.
+# O rastro aparece no expander "Desempenho" e é anexado a um JSONL.
+# ------------------------------------------------------------
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+ARQUIVO_PADRAO = os.environ.get("RASTRO_ARQUIVO", "rastros.jsonl")
+
+_rastro_atual = ContextVar("rastro_atual", default=None)
+_span_llm_atual = ContextVar("span_llm_atual", default=None)
+_arquivo_lock = threading.Lock()
+
+
+@dataclass
+class Span:
+    tipo: str  # "tarefa" ou "llm"
+    nome: str
+    modelo: str = ""
+    inicio: float = field(default_factory=time.time)
+    fim: float = 0.0
+    espera_fila: float = 0.0
+    tokens_entrada: int = 0
+    tokens_saida: int = 0
+    tokens_estimados: bool = False
+    tentativas: int = 1
+    cache: bool = False
+    coalescida: bool = False  # recebeu a resposta de uma chamada idêntica que já estava no ar
+    teto_saida: int = 0  # max_tokens da chamada (orcamento.py), 0 = sem teto
+    continuacoes: int = 0  # chamadas extras para terminar uma resposta cortada no teto
+    retomada: bool = False  # saída tirada do ponto de retomada de uma geração interrompida
+    erro: str = ""
+
+    @property
+    def duracao(self):
+        return max(0.0, (self.fim or time.time()) - self.inicio)
+
+    @property
+    def tokens_por_segundo(self):
+        # Só o tempo gerando conta (a espera na fila fica de fora)
+        gerando = self.duracao - self.espera_fila
+        return self.tokens_saida / gerando if self.tokens_saida and gerando > 0 else 0.0
+
+    def como_dict(self):
+        dados = asdict(self)
+        dados["duracao"] = round(self.duracao, 3)
+        dados["tokens_por_segundo"] = round(self.tokens_por_segundo, 1)
+        return dados
+
+
+class Rastro:
+    """
+    Spans de uma geração.
+    - app: nome do app (ex.: "aula_p")
+    - inputs: entradas da geração (tema, nivel... ou nome, raca...)
+    """
+
+    def __init__(self, app, inputs=None):
+        self.id = uuid.uuid4().hex
+        self.app = app
+        self.inputs = dict(inputs or {})
+        self.inicio = time.time()
+        self.fim = 0.0
+        self.spans = []
+        self._lock = threading.Lock()
+        self._marcador = None
+
+    def adicionar(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def ativar(self):
+        """Passa a receber os spans gerados nesta thread (e nas tarefas que ela disparar)."""
+        self._marcador = _rastro_atual.set(self)
+        return self
+
+    def encerrar(self, caminho=ARQUIVO_PADRAO):
+        """Para de receber spans, completa os spans de tarefa e anexa o rastro ao JSONL."""
+        if self._marcador is not None:
+            _rastro_atual.reset(self._marcador)
+            self._marcador = None
+        self.fim = time.time()
+        self._sintetizar_tarefas()
+        if caminho:
+            with _arquivo_lock, open(caminho, "a", encoding="utf-8") as arquivo:
+                arquivo.write(json.dumps(self.como_dict(), ensure_ascii=False) + "\n")
+
+    def _sintetizar_tarefas(self):
+        # O span da tarefa soma as chamadas ao LLM feitas por ela. No crew.kickoff
+        # não há como envolver cada tarefa: o span vai da primeira à última chamada
+        with self._lock:
+            por_tarefa = {}
+            for s in self.spans:
+                if s.tipo == "llm":
+                    por_tarefa.setdefault(s.nome, []).append(s)
+            tarefas = {s.nome: s for s in self.spans if s.tipo == "tarefa"}
+            for nome, chamadas in por_tarefa.items():
+                span = tarefas.get(nome)
+                if span is None:
+                    span = Span(
+                        tipo="tarefa", nome=nome, modelo=chamadas[0].modelo,
+                        inicio=min(c.inicio for c in chamadas), fim=max(c.fim for c in chamadas),
+                    )
+                    self.spans.append(span)
+                span.espera_fila = sum(c.espera_fila for c in chamadas)
+                span.tokens_entrada = sum(c.tokens_entrada for c in chamadas)
+                span.tokens_saida = sum(c.tokens_saida for c in chamadas)
+                span.tokens_estimados = any(c.tokens_estimados for c in chamadas)
+                span.cache = all(c.cache for c in chamadas)
+                span.coalescida = all(c.coalescida for c in chamadas)
+                span.teto_saida = max(c.teto_saida for c in chamadas)
+                span.continuacoes = sum(c.continuacoes for c in chamadas)
+
+    def como_dict(self):
+        with self._lock:
+            spans = [s.como_dict() for s in sorted(self.spans, key=lambda s: s.inicio)]
+        return {
+            "id": self.id,
+            "app": self.app,
+            "inputs": self.inputs,
+            "inicio": self.inicio,
+            "duracao": round((self.fim or time.time()) - self.inicio, 3),
+            "spans": spans,
+        }
+
+
+def rastro_atual():
+    return _rastro_atual.get()
+
+
+def nome_tarefa(tarefa):
+    """Nome curto da tarefa: o `name` da Task ou a primeira palavra da descrição."""
+    if tarefa is None:
+        return "?"
+    nome = getattr(tarefa, "name", None)
+    if nome:
+        return nome
+    descricao = (getattr(tarefa, "description", "") or "?").split()
+    return descricao[0].strip(":").lower() if descricao else "?"
+
+
+@contextmanager
+def span_tarefa(tarefa, tentativa=1):
+    """Span de uma tarefa inteira (usado pelo executar_dag)."""
+    span = Span(tipo="tarefa", nome=nome_tarefa(tarefa), tentativas=tentativa)
+    modelo = getattr(getattr(getattr(tarefa, "agent", None), "llm", None), "model", "")
+    span.modelo = modelo or ""
+    try:
+        yield span
+    except Exception as erro:
+        span.erro = repr(erro)
+        raise
+    finally:
+        span.fim = time.time()
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            rastro.adicionar(span)
+
+
+@contextmanager
+def span_llm(modelo, tarefa=None):
+    """Span de uma chamada ao LLM; quem chama preenche fila, tentativas, cache e tokens."""
+    span = Span(tipo="llm", nome=nome_tarefa(tarefa), modelo=modelo)
+    marcador = _span_llm_atual.set(span)
+    try:
+        yield span
+    except Exception as erro:
+        span.erro = repr(erro)
+        raise
+    finally:
+        _span_llm_atual.reset(marcador)
+        span.fim = time.time()
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            rastro.adicionar(span)
+
+
+def registrar_uso(uso):
+    """Soma os tokens informados pela API ao span da chamada atual."""
+    span = _span_llm_atual.get()
+    if span is None or not uso:
+        return
+    ler = uso.get if isinstance(uso, dict) else lambda chave: getattr(uso, chave, 0)
+    span.tokens_entrada += int(ler("prompt_tokens") or 0)
+    span.tokens_saida += int(ler("completion_tokens") or 0)
+
+
+def custo_tarefas(rastro, nomes):
+    """
+    Custo de um grupo de tarefas no rastro: (segundos, tokens de entrada + saída, chamadas).
+    Os segundos vão do início da primeira tarefa ao fim da última. Devolve None se
+    alguma tarefa não rodou neste rastro (ou veio de um ponto de retomada) ou se
+    alguma chamada veio do cache.
+    """
+    spans = list(rastro.spans)
+    tarefas = [s for s in spans if s.tipo == "tarefa" and s.nome in nomes]
+    chamadas = [s for s in spans if s.tipo == "llm" and s.nome in nomes]
+    if {s.nome for s in tarefas} != set(nomes) or any(s.retomada for s in tarefas) \
+            or any(s.cache or s.coalescida for s in chamadas):
+        return None
+    segundos = max(s.fim for s in tarefas) - min(s.inicio for s in tarefas)
+    return segundos, sum(s.tokens_entrada + s.tokens_saida for s in chamadas), len(chamadas)
+
+
+_comparacoes = {}
+_comparacoes_lock = threading.Lock()
+
+
+def comparar_modos(grupo, modo, rastro, nomes):
+    """
+    Soma o custo das tarefas `nomes` ao `modo` do `grupo` (ex.: "gabarito", "fundido"),
+    para comparar modos de gerar a mesma coisa no processo inteiro.
+    """
+    custo = custo_tarefas(rastro, nomes)
+    if custo is None:
+        return
+    with _comparacoes_lock:
+        _comparacoes.setdefault(grupo, {}).setdefault(modo, []).append(custo)
+
+
+def media_modo(grupo, modo):
+    """Média (segundos, tokens, chamadas, quantas medidas) do `modo` do `grupo`, ou None se não há medida."""
+    with _comparacoes_lock:
+        custos = list(_comparacoes.get(grupo, {}).get(modo, []))
+    if not custos:
+        return None
+    return (*(sum(valores) / len(custos) for valores in zip(*custos)), len(custos))
+
+
+def mostrar_comparacao(grupo, rotulos):
+    """
+    Legenda com a média de tempo, tokens e chamadas de cada modo do grupo.
+    - rotulos: {modo: texto mostrado}, na ordem da legenda
+    """
+    import streamlit as st
+
+    partes = []
+    for modo, rotulo in rotulos.items():
+        media = media_modo(grupo, modo)
+        if media is None:
+            continue
+        segundos, tokens, chamadas, medidas = media
+        partes.append(
+            f"{rotulo}: {segundos:.1f}s, {tokens:.0f} tokens, {chamadas:.0f} chamada(s) "
+            f"(média de {medidas})"
+        )
+    if partes:
+        st.caption(" · ".join(partes))
+
+
+def mostrar_desempenho(rastro):
+    """Expander "Desempenho" com um span por linha."""
+    import streamlit as st
+
+    dados = rastro.como_dict()
+    with st.expander("⏱️ Desempenho", expanded=False):
+        st.caption(f"Tempo total: {dados['duracao']:.1f}s · rastro {dados['id'][:8]}")
+        st.dataframe(
+            [
+                {
+                    "tipo": s["tipo"], "tarefa": s["nome"], "modelo": s["modelo"],
+                    "duração (s)": s["duracao"], "fila (s)": round(s["espera_fila"], 2),
+                    "tokens in": s["tokens_entrada"], "tokens out": s["tokens_saida"],
+                    "teto out": s["teto_saida"] or None, "continuações": s["continuacoes"],
+                    "tokens/s": s["tokens_por_segundo"], "tentativas": s["tentativas"],
+                    "cache": s["cache"], "coalescida": s["coalescida"], "retomada": s["retomada"],
+                    "erro": s["erro"],
+                }
+                for s in dados["spans"]
+            ],
+            width="stretch",
+        )
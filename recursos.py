@@ -0,0 +1,54 @@
+# ------------------------------------------------------------
+# 🚀 Recursos compartilhados do processo (Streamlit)
+# ------------------------------------------------------------
+# O Streamlit roda o script inteiro a cada interação. Importar crewai e
+# litellm leva vários segundos, então os apps só importam esses módulos
+# dentro do `if executar:`; a primeira tela aparece na hora e `aquecer()`
+# faz a importação uma única vez, depois que a tela já foi desenhada.
+# Os LLMs e o cliente HTTP (com conexões keep-alive) são criados uma vez
+# por processo com st.cache_resource e reaproveitados por todas as sessões.
+# ------------------------------------------------------------
+import streamlit as st
+
+
+@st.cache_resource(show_spinner=False)
+def aquecer():
+    """Importa os módulos pesados (uma vez por processo) para o primeiro clique não esperar por eles."""
+    import crewai  # noqa: F401
+    import litellm  # noqa: F401
+    import pandas  # noqa: F401  (usado pelo st.dataframe dos expanders de desempenho e prompts)
+
+    import equipes  # noqa: F401
+    import orquestracao  # noqa: F401
+    return True
+
+
+@st.cache_resource(show_spinner=False)
+def cliente_http():
+    """Cliente HTTP único do processo: as chamadas ao Groq reaproveitam as conexões abertas."""
+    from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+    return HTTPHandler()
+
+
+@st.cache_resource(show_spinner=False)
+def obter_llm(model, api_key, temperature, usar_cache=True, reservas=(), slo_fila=0.0, timeout=None):
+    """
+    LLMGroq compartilhado entre reruns e sessões (um por combinação de parâmetros).
+    - model, api_key, temperature: como no LLMGroq
+    - usar_cache, reservas, slo_fila, timeout: como no LLMGroq
+    O objeto não guarda estado da geração (isso fica nos agentes e tarefas),
+    então pode ser usado por várias sessões ao mesmo tempo.
+    """
+    from llm_groq import LLMGroq
+
+    return LLMGroq(
+        model=model,
+        api_key=api_key,
+        temperature=temperature,
+        usar_cache=usar_cache,
+        reservas=list(reservas),
+        slo_fila=slo_fila,
+        timeout=timeout,
+        client=cliente_http(),
+    )
@@ -0,0 +1,365 @@
+# ------------------------------------------------------------
+# 🎲 Regras de D&D 5e calculadas localmente (ficha de personagem)
+# ------------------------------------------------------------
+# A tarefa da ficha pedia ao LLM a ficha inteira em Markdown: os seis
+# atributos, os modificadores e o equipamento inicial. Isso gastava tokens
+# de saída com contas que o modelo muitas vezes errava. Aqui ficam as
+# regras do SRD para o nível 1: atributos (matriz padrão, compra de pontos
+# ou 4d6 descartando o menor, rolados de uma vez com numpy), bônus raciais,
+# modificadores, bônus de proficiência, PV, CA e o kit inicial da classe.
+# O LLM só escreve os campos narrativos, num JSON curto, e a ficha em
+# Markdown é montada aqui. A rolagem usa uma semente tirada de nome, raça e
+# classe: o mesmo personagem tem sempre a mesma ficha (cache e sessão valem).
+# ------------------------------------------------------------
+import hashlib
+import json
+import re
+import unicodedata
+
+ATRIBUTOS = ("FOR", "DES", "CON", "INT", "SAB", "CAR")
+
+# Métodos de geração dos atributos (chave: rótulo mostrado na tela e na ficha)
+METODOS = {
+    "padrao": "Matriz padrão (15, 14, 13, 12, 10, 8)",
+    "pontos": "Compra de pontos (27 pontos)",
+    "4d6": "4d6 descartando o menor",
+}
+
+MATRIZ_PADRAO = (15, 14, 13, 12, 10, 8)
+
+# Compra de pontos: custo de cada valor e a distribuição usada (dois atributos altos)
+CUSTO_PONTOS = {8: 0, 9: 1, 10: 2, 11: 3, 12: 4, 13: 5, 14: 7, 15: 9}
+PONTOS_COMPRA = 27
+DISTRIBUICAO_PONTOS = (15, 15, 13, 10, 10, 8)
+
+# Campos narrativos que o LLM preenche (o resto da ficha é calculado)
+CAMPOS_NARRATIVOS = ("alinhamento", "antecedente", "personalidade", "ideal", "vinculo", "defeito")
+
+# Raças do SRD: bônus de atributo e deslocamento (metros). Meio-elfo ganha
+# ainda +1 nos dois atributos mais importantes da classe (fora CAR).
+RACAS = {
+    "humano": ({atributo: 1 for atributo in ATRIBUTOS}, 9),
+    "elfo": ({"DES": 2}, 9),
+    "anao": ({"CON": 2}, 7.5),
+    "halfling": ({"DES": 2}, 7.5),
+    "draconato": ({"FOR": 2, "CAR": 1}, 9),
+    "gnomo": ({"INT": 2}, 7.5),
+    "meio-elfo": ({"CAR": 2}, 9),
+    "meio-orc": ({"FOR": 2, "CON": 1}, 9),
+    "tiefling": ({"CAR": 2, "INT": 1}, 9),
+}
+APELIDOS_RACAS = {
+    "human": "humano", "elf": "elfo", "dwarf": "anao", "pequenino": "halfling",
+    "dragonborn": "draconato", "gnome": "gnomo", "half-elf": "meio-elfo", "half-orc": "meio-orc",
+}
+
+# Classes do SRD no nível 1:
+# (dado de vida, atributos em ordem de importância, salvaguardas, armadura, escudo,
+#  equipamento inicial, habilidades de classe). Armadura: (nome, CA base, limite do
+# mod. de DES ou None, atributo extra da Defesa sem Armadura ou None); limite 0 é
+# armadura pesada, em que a DES não conta (nem o modificador negativo).
+CLASSES = {
+    "barbaro": (
+        12, ("FOR", "CON", "DES", "SAB", "CAR", "INT"), ("FOR", "CON"),
+        ("Defesa sem Armadura", 10, None, "CON"), False,
+        ["Machado grande", "Duas machadinhas", "Pacote de aventureiro", "Quatro azagaias"],
+        ["Fúria", "Defesa sem Armadura"],
+    ),
+    "bardo": (
+        8, ("CAR", "DES", "CON", "SAB", "INT", "FOR"), ("DES", "CAR"),
+        ("Armadura de couro", 11, None, None), False,
+        ["Rapieira", "Pacote de artista", "Alaúde", "Armadura de couro", "Adaga"],
+        ["Conjuração", "Inspiração de Bardo (d6)"],
+    ),
+    "bruxo": (
+        8, ("CAR", "CON", "DES", "SAB", "INT", "FOR"), ("SAB", "CAR"),
+        ("Armadura de couro", 11, None, None), False,
+        ["Besta leve e 20 virotes", "Foco arcano", "Pacote de estudioso", "Armadura de couro", "Duas adagas"],
+        ["Patrono Transcendental", "Magia de Pacto"],
+    ),
+    "clerigo": (
+        8, ("SAB", "CON", "FOR", "DES", "CAR", "INT"), ("SAB", "CAR"),
+        ("Brunea", 14, 2, None), True,
+        ["Maça", "Brunea", "Besta leve e 20 virotes", "Pacote de sacerdote", "Escudo", "Símbolo sagrado"],
+        ["Conjuração", "Domínio Divino"],
+    ),
+    "druida": (
+        8, ("SAB", "CON", "DES", "INT", "CAR", "FOR"), ("INT", "SAB"),
+        ("Armadura de couro", 11, None, None), True,
+        ["Escudo de madeira", "Cimitarra", "Armadura de couro", "Pacote de aventureiro", "Foco druídico"],
+        ["Druídico", "Conjuração"],
+    ),
+    "feiticeiro": (
+        6, ("CAR", "CON", "DES", "SAB", "INT", "FOR"), ("CON", "CAR"),
+        ("Sem armadura", 10, None, None), False,
+        ["Besta leve e 20 virotes", "Bolsa de componentes", "Pacote de aventureiro", "Duas adagas"],
+        ["Conjuração", "Origem de Feitiçaria"],
+    ),
+    "guerreiro": (
+        10, ("FOR", "CON", "DES", "SAB", "CAR", "INT"), ("FOR", "CON"),
+        ("Cota de malha", 16, 0, None), True,
+        ["Cota de malha", "Espada longa", "Escudo", "Besta leve e 20 virotes", "Pacote de aventureiro"],
+        ["Estilo de Luta", "Retomar o Fôlego"],
+    ),
+    "ladino": (
+        8, ("DES", "INT", "CON", "SAB", "CAR", "FOR"), ("DES", "INT"),
+        ("Armadura de couro", 11, None, None), False,
+        ["Rapieira", "Arco curto e 20 flechas", "Pacote de assaltante", "Armadura de couro",
+         "Duas adagas", "Ferramentas de ladrão"],
+        ["Especialização", "Ataque Furtivo (1d6)", "Gíria de Ladrão"],
+    ),
+    "mago": (
+        6, ("INT", "CON", "DES", "SAB", "CAR", "FOR"), ("INT", "SAB"),
+        ("Sem armadura", 10, None, None), False,
+        ["Bordão", "Bolsa de componentes", "Pacote de estudioso", "Grimório"],
+        ["Conjuração", "Recuperação Arcana"],
+    ),
+    "monge": (
+        8, ("DES", "SAB", "CON", "FOR", "INT", "CAR"), ("FOR", "DES"),
+        ("Defesa sem Armadura", 10, None, "SAB"), False,
+        ["Espada curta", "Pacote de aventureiro", "Dez dardos"],
+        ["Defesa sem Armadura", "Artes Marciais"],
+    ),
+    "paladino": (
+        10, ("FOR", "CAR", "CON", "SAB", "DES", "INT"), ("SAB", "CAR"),
+        ("Cota de malha", 16, 0, None), True,
+        ["Espada longa", "Escudo", "Cinco azagaias", "Pacote de sacerdote", "Cota de malha", "Símbolo sagrado"],
+        ["Sentido Divino", "Cura pelas Mãos"],
+    ),
+    "patrulheiro": (
+        10, ("DES", "SAB", "CON", "FOR", "INT", "CAR"), ("FOR", "DES"),
+        ("Armadura de couro", 11, None, None), False,
+        ["Armadura de couro", "Duas espadas curtas", "Pacote de explorador", "Arco longo e 20 flechas"],
+        ["Inimigo Favorito", "Explorador Natural"],
+    ),
+}
+APELIDOS_CLASSES = {
+    "barbarian": "barbaro", "bard": "bardo", "warlock": "bruxo", "cleric": "clerigo", "druid": "druida",
+    "sorcerer": "feiticeiro", "fighter": "guerreiro", "rogue": "ladino", "wizard": "mago", "monk": "monge",
+    "paladin": "paladino", "ranger": "patrulheiro", "guardiao": "patrulheiro",
+}
+
+# Classe fora do SRD (ex.: "Caçador de Bruxas"): valores genéricos de aventureiro
+CLASSE_GENERICA = (
+    8, ("FOR", "DES", "CON", "SAB", "INT", "CAR"), ("FOR", "DES"),
+    ("Armadura de couro", 11, None, None), False,
+    ["Arma simples", "Armadura de couro", "Pacote de aventureiro"],
+    [],
+)
+
+
+def _chave(texto):
+    sem_acento = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return "-".join(sem_acento.lower().replace("-", " ").split())
+
+
+def modificador(valor):
+    """Modificador de um valor de atributo (10–11 = +0, 15 = +2, 8 = -1)."""
+    return (valor - 10) // 2
+
+
+def bonus_proficiencia(nivel=1):
+    return 2 + (nivel - 1) // 4
+
+
+def _com_sinal(numero):
+    return f"{numero:+d}"
+
+
+def _metros(valor):
+    return f"{valor:g}".replace(".", ",")
+
+
+def semente(nome, raca, classe):
+    """Semente da rolagem: o mesmo personagem (nome, raça e classe normalizados) rola os mesmos dados."""
+    bruto = "|".join(_chave(campo) for campo in (nome, raca, classe))
+    return int.from_bytes(hashlib.sha256(bruto.encode("utf-8")).digest()[:8], "big")
+
+
+def rolar_4d6(gerador, vezes=6):
+    """
+    Rola 4d6 e descarta o menor, `vezes` vezes, numa só operação do numpy.
+    - gerador: numpy.random.Generator
+    Devolve os totais em ordem decrescente.
+    """
+    dados = gerador.integers(1, 7, size=(vezes, 4))
+    totais = dados.sum(axis=1) - dados.min(axis=1)
+    return sorted(totais.tolist(), reverse=True)
+
+
+def comprar_pontos(valores=DISTRIBUICAO_PONTOS, pontos=PONTOS_COMPRA):
+    """Confere uma distribuição da compra de pontos (valores de 8 a 15, custo até `pontos`)."""
+    if any(v not in CUSTO_PONTOS for v in valores):
+        raise ValueError("Na compra de pontos os valores vão de 8 a 15.")
+    custo = sum(CUSTO_PONTOS[v] for v in valores)
+    if custo > pontos:
+        raise ValueError(f"A distribuição custa {custo} pontos (máximo {pontos}).")
+    return sorted(valores, reverse=True)
+
+
+def valores_base(metodo, gerador=None):
+    """
+    Os seis valores antes dos bônus raciais, do maior para o menor.
+    - metodo: "padrao", "pontos" ou "4d6" (ver METODOS)
+    - gerador: numpy.random.Generator (só para "4d6")
+    """
+    if metodo == "padrao":
+        return list(MATRIZ_PADRAO)
+    if metodo == "pontos":
+        return comprar_pontos()
+    if metodo == "4d6":
+        return rolar_4d6(gerador)
+    raise ValueError(f"Método de atributos desconhecido: {metodo}")
+
+
+def calcular_ficha(nome, raca, classe, metodo="padrao"):
+    """
+    Parte mecânica da ficha de nível 1, sem LLM.
+    - nome, raca, classe: como digitados (acentos, maiúsculas e nomes em inglês são aceitos)
+    - metodo: como os atributos são gerados (ver METODOS)
+    Devolve um dict com atributos (valor final e bônus racial), modificadores,
+    salvaguardas, PV, CA, iniciativa, deslocamento, equipamento e habilidades.
+    Raça ou classe fora do SRD não têm bônus/kit próprios (ficam em `avisos`).
+    """
+    chave_raca = APELIDOS_RACAS.get(_chave(raca), _chave(raca))
+    chave_classe = APELIDOS_CLASSES.get(_chave(classe), _chave(classe))
+    avisos = []
+    if chave_raca not in RACAS:
+        avisos.append(f"Raça “{raca}” fora do SRD: sem bônus raciais.")
+    if chave_classe not in CLASSES:
+        avisos.append(f"Classe “{classe}” fora do SRD: dado de vida, kit e prioridades genéricos.")
+    bonus_raca, deslocamento = RACAS.get(chave_raca, ({}, 9))
+    dado_vida, prioridade, salvaguardas, armadura, escudo, equipamento, habilidades = CLASSES.get(
+        chave_classe, CLASSE_GENERICA
+    )
+
+    gerador = None
+    if metodo == "4d6":
+        import numpy as np  # só a rolagem precisa (a tela abre sem esperar por ele)
+
+        gerador = np.random.default_rng(semente(nome, raca, classe))
+    base = dict(zip(prioridade, valores_base(metodo, gerador)))
+    bonus = dict(bonus_raca)
+    if chave_raca == "meio-elfo":
+        for atributo in [a for a in prioridade if a != "CAR"][:2]:
+            bonus[atributo] = bonus.get(atributo, 0) + 1
+    atributos = {a: {"valor": min(20, base[a] + bonus.get(a, 0)), "racial": bonus.get(a, 0)} for a in ATRIBUTOS}
+    mods = {a: modificador(atributos[a]["valor"]) for a in ATRIBUTOS}
+    proficiencia = bonus_proficiencia(1)
+
+    nome_armadura, ca_base, limite_des, extra = armadura
+    if limite_des == 0:
+        ca = ca_base  # armadura pesada: ignora a DES, até um modificador negativo
+    else:
+        ca = ca_base + (mods["DES"] if limite_des is None else min(mods["DES"], limite_des))
+    if extra is not None:
+        ca += mods[extra]
+    if escudo:
+        ca += 2
+        nome_armadura += " + escudo"
+
+    return {
+        "metodo": metodo,
+        "atributos": atributos,
+        "modificadores": mods,
+        "salvaguardas": {a: mods[a] + (proficiencia if a in salvaguardas else 0) for a in ATRIBUTOS},
+        "proficientes": list(salvaguardas),
+        "proficiencia": proficiencia,
+        "dado_vida": dado_vida,
+        "pv": max(1, dado_vida + mods["CON"]),
+        "ca": ca,
+        "armadura": nome_armadura,
+        "iniciativa": mods["DES"],
+        "deslocamento": deslocamento,
+        "equipamento": list(equipamento),
+        "habilidades": list(habilidades),
+        "avisos": avisos,
+    }
+
+
+def resumo_ficha(ficha):
+    """Linha curta com os números da ficha (vai no prompt para a parte narrativa combinar com eles)."""
+    atributos = ", ".join(
+        f"{a} {ficha['atributos'][a]['valor']} ({_com_sinal(ficha['modificadores'][a])})" for a in ATRIBUTOS
+    )
+    return f"{atributos}; PV {ficha['pv']}; CA {ficha['ca']}"
+
+
+def entradas_ficha(personagem, metodo="padrao"):
+    """
+    Entradas que a tarefa da ficha usa além de nome, raça, classe e tema.
+    - personagem: dict com nome, raca, classe
+    - metodo: como os atributos são gerados (ver METODOS)
+    `atributos` vai no prompt (e muda a chave do cache quando o método muda); `metodo`
+    é lido de volta na renderização.
+    """
+    ficha = calcular_ficha(personagem["nome"], personagem["raca"], personagem["classe"], metodo)
+    return {"metodo": metodo, "atributos": f"{resumo_ficha(ficha)} ({METODOS[metodo]})"}
+
+
+def ler_narrativa(texto):
+    """
+    Campos narrativos do JSON devolvido pelo LLM (cercas ``` e texto em volta são tolerados).
+    Devolve (campos, sobra): `sobra` é o texto inteiro quando não veio um JSON válido.
+    """
+    achado = re.search(r"\{.*\}", texto or "", re.S)
+    if achado:
+        try:
+            dados = json.loads(achado.group(0))
+        except json.JSONDecodeError:
+            dados = None
+        if isinstance(dados, dict):
+            campos = {_chave(k).replace("-", "_"): str(v).strip() for k, v in dados.items() if v}
+            return {c: campos[c] for c in CAMPOS_NARRATIVOS if c in campos}, ""
+    return {}, (texto or "").strip()
+
+
+def renderizar_ficha(personagem, resposta):
+    """
+    Ficha completa em Markdown: números calculados aqui + campos narrativos do LLM.
+    - personagem: dict com nome, raca, classe e, opcional, metodo
+    - resposta: texto do LLM (o JSON dos CAMPOS_NARRATIVOS)
+    """
+    ficha = calcular_ficha(
+        personagem["nome"], personagem["raca"], personagem["classe"], personagem.get("metodo") or "padrao"
+    )
+    narrativa, sobra = ler_narrativa(resposta)
+    linhas = [
+        f"### {personagem['nome']} — {personagem['raca']} {personagem['classe']}, nível 1",
+        "",
+        f"**Alinhamento:** {narrativa.get('alinhamento', '—')} · **Antecedente:** {narrativa.get('antecedente', '—')}",
+        "",
+        "| Atributo | Valor | Modificador | Salvaguarda |",
+        "|---|---|---|---|",
+    ]
+    for a in ATRIBUTOS:
+        atributo = ficha["atributos"][a]
+        racial = f" ({_com_sinal(atributo['racial'])} racial)" if atributo["racial"] else ""
+        proficiente = " ✔" if a in ficha["proficientes"] else ""
+        linhas.append(
+            f"| {a} | {atributo['valor']}{racial} | {_com_sinal(ficha['modificadores'][a])} "
+            f"| {_com_sinal(ficha['salvaguardas'][a])}{proficiente} |"
+        )
+    linhas += [
+        "",
+        f"**PV:** {ficha['pv']} (d{ficha['dado_vida']}) · **CA:** {ficha['ca']} ({ficha['armadura']}) · "
+        f"**Iniciativa:** {_com_sinal(ficha['iniciativa'])} · **Deslocamento:** {_metros(ficha['deslocamento'])} m · "
+        f"**Bônus de proficiência:** {_com_sinal(ficha['proficiencia'])}",
+        "",
+        f"*Atributos: {METODOS[ficha['metodo']]}.*",
+        "",
+        "#### 🎒 Equipamento inicial",
+        *[f"- {item}" for item in ficha["equipamento"]],
+    ]
+    if ficha["habilidades"]:
+        linhas += ["", "#### ✨ Habilidades de classe", *[f"- {h}" for h in ficha["habilidades"]]]
+    rotulos = {"personalidade": "Traço de personalidade", "ideal": "Ideal", "vinculo": "Vínculo", "defeito": "Defeito"}
+    tracos = [f"- **{rotulo}:** {narrativa[campo]}" for campo, rotulo in rotulos.items() if campo in narrativa]
+    if tracos:
+        linhas += ["", "#### 🎭 Personalidade", *tracos]
+    if sobra:
+        linhas += ["", "#### 📝 Notas", sobra]
+    if ficha["avisos"]:
+        for aviso in ficha["avisos"]:
+            linhas += ["", f"> ⚠️ {aviso}"]
+    return "\n".join(linhas)
@@ -0,0 +1,119 @@
+# ------------------------------------------------------------
+# 🔖 Pontos de retomada por tarefa (SQLite)
+# ------------------------------------------------------------
+# O executar_dag já repete só a tarefa que falhou, mas, se ela falha de vez
+# (ou o job é cancelado, ou o processo cai), a próxima geração com as mesmas
+# entradas pagava de novo as tarefas que já tinham dado certo, sempre que o
+# cache de respostas estava desligado ("gerar de novo") ou tinha perdido a
+# resposta. Aqui a saída de cada tarefa é gravada assim que ela termina, com
+# uma chave do app, das entradas, do prompt interpolado, do modelo e do
+# context recebido. Uma geração com a mesma chave começa pelas tarefas que
+# faltam. Quando a geração termina sem falhas, os pontos dela são apagados:
+# só uma geração interrompida deixa pontos para a próxima.
+# ------------------------------------------------------------
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+ARQUIVO_PADRAO = os.environ.get("RETOMADA_ARQUIVO", "retomada.sqlite3")
+
+# Horas que um ponto de retomada vale (depois disso a tarefa roda de novo)
+VALIDADE_HORAS = float(os.environ.get("RETOMADA_VALIDADE_HORAS", "24"))
+
+
+def chave_ponto(escopo, inputs, tarefa, contexto):
+    """
+    Chave (sha256) da saída de uma tarefa numa geração.
+    - escopo: nome do app (ex.: "dupla_exercicio")
+    - inputs: entradas da geração
+    - tarefa: Task já interpolada
+    - contexto: texto do context que a tarefa recebe (ou None)
+    """
+    agente = tarefa.agent
+    llm = getattr(agente, "llm", None)
+    bruto = json.dumps(
+        {
+            "escopo": escopo,
+            "inputs": {chave: " ".join(str(valor).split()) for chave, valor in inputs.items()},
+            "tarefa": [tarefa.name, tarefa.description, tarefa.expected_output],
+            "agente": [getattr(agente, campo, "") for campo in ("role", "goal", "backstory")] if agente else None,
+            "modelo": [getattr(llm, "model", ""), getattr(llm, "temperature", None)],
+            "contexto": contexto,
+        },
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+class PontosRetomada:
+    """
+    Saídas de tarefas de gerações ainda não concluídas, em SQLite.
+    - caminho: arquivo SQLite (":memory:" para não gravar nada em disco)
+    - validade: segundos até um ponto deixar de valer
+    """
+
+    def __init__(self, caminho=ARQUIVO_PADRAO, validade=VALIDADE_HORAS * 3600):
+        self.validade = validade
+        self.retomadas = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(caminho, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pontos ("
+            "chave TEXT PRIMARY KEY, escopo TEXT NOT NULL, tarefa TEXT NOT NULL, "
+            "texto TEXT NOT NULL, criado_em REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_pontos_criado_em ON pontos (criado_em)")
+        self._db.commit()
+
+    def obter(self, chave):
+        """Texto guardado para a chave, ou None (sem ponto ou vencido)."""
+        with self._lock:
+            linha = self._db.execute(
+                "SELECT texto FROM pontos WHERE chave = ? AND criado_em >= ?",
+                (chave, time.time() - self.validade),
+            ).fetchone()
+            if linha is not None:
+                self.retomadas += 1
+        return linha[0] if linha else None
+
+    def guardar(self, chave, escopo, tarefa, texto):
+        """Grava a saída de uma tarefa que acabou de terminar (e tira os pontos vencidos)."""
+        agora = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pontos (chave, escopo, tarefa, texto, criado_em) VALUES (?, ?, ?, ?, ?)",
+                (chave, escopo, tarefa, texto, agora),
+            )
+            self._db.execute("DELETE FROM pontos WHERE criado_em < ?", (agora - self.validade,))
+            self._db.commit()
+
+    def apagar(self, chaves):
+        """Apaga os pontos de uma geração que terminou sem falhas."""
+        chaves = list(chaves)
+        if not chaves:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM pontos WHERE chave = ?", [(c,) for c in chaves])
+            self._db.commit()
+
+    def estatisticas(self):
+        """Pontos guardados agora e tarefas retomadas desde que o processo subiu."""
+        with self._lock:
+            pontos = self._db.execute("SELECT COUNT(*) FROM pontos").fetchone()[0]
+        return {"pontos": pontos, "retomadas": self.retomadas}
+
+
+_pontos = None
+_pontos_lock = threading.Lock()
+
+
+def obter_pontos():
+    """Pontos de retomada únicos do processo (compartilhados por todas as sessões do Streamlit)."""
+    global _pontos
+    with _pontos_lock:
+        if _pontos is None:
+            _pontos = PontosRetomada()
+        return _pontos
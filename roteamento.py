@@ -0,0 +1,74 @@
+# ------------------------------------------------------------
+# 🧭 Roteamento de modelos por tarefa
+# ------------------------------------------------------------
+# Nem toda tarefa precisa do modelo grande: listas curtas e formulaicas
+# (exemplos, gabarito, ficha) saem bem e mais rápido no modelo pequeno;
+# o que exige mais raciocínio (resumo, exercícios) fica no grande.
+# Cada nível tem um modelo principal e reservas: se o principal devolver
+# 429, demorar demais ou estiver com fila acima do SLO, o LLMGroq passa a
+# chamada para a reserva sozinho.
+# ------------------------------------------------------------
+from rastreamento import nome_tarefa
+
+RAPIDO = "groq/llama-3.1-8b-instant"
+FORTE = "groq/llama-3.3-70b-versatile"
+
+# Nível -> modelos em ordem de preferência (o primeiro é o principal)
+NIVEIS = {
+    "rapido": [RAPIDO, FORTE],
+    "forte": [FORTE, RAPIDO],
+}
+
+# Nível de cada tarefa, pelo `name` da Task
+NIVEL_DAS_TAREFAS = {
+    "resumo": "forte",
+    "exemplos": "rapido",
+    "exercicios": "forte",
+    "gabarito": "rapido",
+    "conceito": "rapido",
+    "ficha": "rapido",
+    "descricao": "rapido",
+    "nucleo": "forte",  # modo vários níveis: as adaptações por nível vão no rápido (variantes.py)
+}
+
+# Fila aceitável antes de trocar de modelo, e tempo máximo de uma chamada
+SLO_FILA = 5.0
+TEMPO_LIMITE = 60
+
+
+def reservas_de(modelo):
+    """Modelos para onde uma chamada a `modelo` pode ir se ele estiver no limite."""
+    return [m for m in dict.fromkeys(NIVEIS["forte"] + NIVEIS["rapido"]) if m != modelo]
+
+
+def rotear(tarefas, llm, niveis=None):
+    """
+    Troca o LLM do agente de cada tarefa pelo modelo do nível dela.
+    - tarefas: lista de Task (cada uma com seu agente)
+    - llm: LLMGroq de base (chave, temperatura e cache são copiados dele)
+    - niveis: ajustes de NIVEL_DAS_TAREFAS para este app (ex.: {"exemplos": "forte"})
+    Tarefas sem nível conhecido ficam com o modelo de base.
+    """
+    niveis = {**NIVEL_DAS_TAREFAS, **(niveis or {})}
+    llms = {}
+    for tarefa in tarefas:
+        nivel = niveis.get(nome_tarefa(tarefa))
+        if nivel is None or tarefa.agent is None:
+            continue
+        if nivel not in llms:
+            principal, *reservas = NIVEIS[nivel]
+            llms[nivel] = llm.variante(principal, reservas)
+        tarefa.agent.llm = llms[nivel]
+
+
+def modelo_da_tarefa(rastro, tarefa):
+    """Modelo(s) que responderam às chamadas da tarefa neste rastro (sem o prefixo "groq/")."""
+    nome = nome_tarefa(tarefa)
+    modelos = []
+    for span in sorted(rastro.spans, key=lambda s: s.inicio):
+        if span.tipo == "llm" and span.nome == nome and span.modelo not in modelos:
+            modelos.append(span.modelo)
+    if not modelos and getattr(tarefa, "agent", None) is None and isinstance(tarefa.context, list) and tarefa.context:
+        # Tarefa local (ex.: gabarito do modo fundido): o texto veio da chamada da tarefa do context
+        return f"{modelo_da_tarefa(rastro, tarefa.context[0])} (mesma chamada)"
+    return " → ".join(m.split("/", 1)[-1] for m in modelos) or "?"
@@ -0,0 +1,481 @@
+# ------------------------------------------------------------
+# 🗂️ Resultados das tarefas guardados na sessão do Streamlit
+# ------------------------------------------------------------
+# Sem isso, o texto gerado só existe dentro do `if executar:` e some no
+# próximo rerun (ligar o gabarito, editar um campo...). Aqui a saída de
+# cada tarefa fica em st.session_state, com as entradas que ela de fato usa
+# (as variáveis {tema}, {nivel}... que aparecem no prompt dela) e o texto
+# das tarefas do `context`. Assim:
+# - ligar o gabarito roda só o gabarito, com os exercícios já guardados;
+# - mudar o objetivo só pede de novo o que usa {objetivo};
+# - cada aba tem um botão para gerar só ela de novo.
+# ------------------------------------------------------------
+import contextlib
+import hashlib
+import json
+import re
+import time
+
+import streamlit as st
+
+from rastreamento import nome_tarefa
+from roteamento import modelo_da_tarefa
+
+# Saídas guardadas por tarefa (as mais antigas saem primeiro)
+MAX_POR_TAREFA = 8
+
+# Intervalo máximo entre dois redesenhos da página enquanto o job roda
+INTERVALO = 0.3
+
+_VARIAVEL = re.compile(r"\{(\w+)\}")
+
+
+def _resumo_texto(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _original(objeto, campo):
+    # Depois da interpolação o CrewAI guarda o template em "_original_*"
+    return getattr(objeto, f"_original_{campo}", None) or getattr(objeto, campo, None) or ""
+
+
+def variaveis_da_tarefa(tarefa):
+    """Variáveis ({tema}, {nivel}...) que entram no prompt da tarefa, pelo agente ou pela descrição."""
+    textos = [_original(tarefa, "description"), _original(tarefa, "expected_output")]
+    if tarefa.agent is not None:
+        textos += [_original(tarefa.agent, campo) for campo in ("role", "goal", "backstory")]
+    return set(_VARIAVEL.findall("\n".join(textos)))
+
+
+def _chave_pedido(app, tarefas, inputs, opcoes):
+    # Mesmo pedido = mesmo app, mesmas entradas (sem espaços sobrando), mesmos prompts e
+    # modelos, mesmo context pronto e mesmas opções de execução. Sem chave (não coalesce)
+    # com o cache desligado ("gerar de novo" quer texto novo) ou com tarefas adotadas
+    if opcoes.get("origem") is not None:
+        return None
+    prontas = opcoes.get("prontas") or {}
+    descricao = []
+    for tarefa in tarefas:
+        llm = getattr(tarefa.agent, "llm", None)
+        if llm is None or not getattr(llm, "usar_cache", False):
+            return None
+        descricao.append(
+            [nome_tarefa(tarefa), llm.model, llm.temperature, prontas.get(id(tarefa))]
+            + [_original(tarefa, campo) for campo in ("description", "expected_output")]
+            + [_original(tarefa.agent, campo) for campo in ("role", "goal", "backstory")]
+        )
+    bruto = json.dumps(
+        {
+            "app": app,
+            "inputs": {chave: " ".join(str(valor).split()) for chave, valor in inputs.items()},
+            "tarefas": descricao,
+            "opcoes": {k: v for k, v in opcoes.items() if k not in ("prontas", "origem", "adotadas", "transmitir")},
+        },
+        ensure_ascii=False, sort_keys=True, default=repr,
+    )
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _usa_cache(tarefas):
+    # "Ignorar cache" desliga o cache no LLM dos agentes: o pedido quer texto novo
+    return all(getattr(getattr(t.agent, "llm", None), "usar_cache", True) for t in tarefas if t.agent is not None)
+
+
+class ResultadosSessao:
+    """
+    Saídas das tarefas de um app guardadas em st.session_state.
+    - app: nome do app (separa os resultados de páginas diferentes)
+    - inputs: entradas atuais da tela (tema, nivel...)
+    Uma saída vale para as entradas atuais se as variáveis que a tarefa usa
+    têm os mesmos valores e se as tarefas do context não mudaram desde então.
+    """
+
+    def __init__(self, app, inputs):
+        self.app = app
+        self.inputs = dict(inputs)
+        self._guardadas = st.session_state.setdefault(f"resultados_{app}", {})
+        self._chave_refazer = f"refazer_aba_{app}"
+        self._chave_entradas = f"entradas_{app}"
+        self._chave_job = f"job_{app}"
+        # Aba pedida pelo botão "gerar só esta aba de novo" no rerun anterior
+        self.aba_refazer = st.session_state.pop(self._chave_refazer, None)
+        # Botão "gerar do zero" do aviso de material reaproveitado
+        self.refazer_tudo = st.session_state.pop(f"refazer_tudo_{app}", False)
+
+    @property
+    def pular_cache(self):
+        """Pedido explícito para gerar de novo: o cache de respostas também fica de fora."""
+        return self.refazer_tudo or self.aba_refazer is not None
+
+    # ---------------------------
+    # Consulta
+    # ---------------------------
+    def obter(self, nome):
+        """Saída guardada da tarefa que vale para as entradas atuais (ou None)."""
+        for registro in self._guardadas.get(nome, []):
+            if self.vale(registro):
+                return registro
+        return None
+
+    def vale(self, registro, visitadas=()):
+        """Se o registro vale para as entradas atuais (variáveis iguais e context guardado sem mudança)."""
+        if any(self.inputs.get(var) != valor for var, valor in registro["entradas"].items()):
+            return False
+        for dep, resumo in registro["base"].items():
+            if dep in visitadas:
+                return False
+            atual = next(
+                (r for r in self._guardadas.get(dep, []) if self.vale(r, visitadas + (dep,))), None
+            )
+            if atual is None or _resumo_texto(atual["texto"]) != resumo:
+                return False
+        return True
+
+    def ultima(self, nome):
+        """Saída mais recente da tarefa, valendo ou não para as entradas atuais."""
+        guardadas = self._guardadas.get(nome)
+        return guardadas[0] if guardadas else None
+
+    def faltando(self, nomes):
+        return [n for n in nomes if self.obter(n) is None]
+
+    def junto_com(self, a_gerar, nome, dependencia):
+        """
+        Se `nome` pode sair na mesma chamada que `dependencia` (ex.: gabarito com os
+        exercícios): não pode quando só `nome` vai rodar, com a dependência já guardada.
+        """
+        return not (nome in a_gerar and dependencia not in a_gerar and self.obter(dependencia) is not None)
+
+    def a_gerar(self, nomes, executar, refazer=False):
+        """
+        Tarefas que precisam rodar neste rerun.
+        - nomes: tarefas que a tela mostra agora (ex.: sem "gabarito" se o toggle está desligado)
+        - executar: se o botão de gerar foi clicado
+        - refazer: "ignorar cache" ligado (o botão de gerar refaz todas)
+        Sem clique, só completa o que falta quando as entradas são as da última
+        geração (ex.: o gabarito acabou de ser ligado); campos editados esperam o botão.
+        """
+        if self.refazer_tudo:
+            return list(nomes)
+        if self._chave_job in st.session_state and not (executar or self.aba_refazer):
+            return []  # a geração em andamento é que vai completar o que falta
+        if self.aba_refazer in nomes:
+            return [self.aba_refazer]
+        if executar:
+            return list(nomes) if refazer else self.faltando(nomes)
+        if st.session_state.get(self._chave_entradas) == self.inputs:
+            return self.faltando(nomes)
+        return []
+
+    # ---------------------------
+    # Gravação
+    # ---------------------------
+    def guardar(self, tarefa, texto, modelo="?", inputs=None):
+        """
+        Guarda a saída da tarefa com as entradas e o context que ela usou.
+        - inputs: entradas da geração, se não forem as da tela agora (job que
+          terminou depois de o aluno editar um campo)
+        """
+        inputs = self.inputs if inputs is None else inputs
+        self.incluir(nome_tarefa(tarefa), self.registro(tarefa, texto, modelo, inputs))
+        st.session_state[self._chave_entradas] = inputs
+
+    def registro(self, tarefa, texto, modelo="?", inputs=None):
+        """Registro da saída (texto, modelo, entradas e context usados), sem guardar."""
+        inputs = self.inputs if inputs is None else inputs
+        contexto = tarefa.context if isinstance(tarefa.context, list) else []
+        return {
+            "texto": texto,
+            "modelo": modelo,
+            "entradas": {v: inputs.get(v) for v in sorted(variaveis_da_tarefa(tarefa))},
+            "base": {nome_tarefa(d): _resumo_texto(self._texto_de(d)) for d in contexto},
+        }
+
+    def incluir(self, nome, registro):
+        """Põe o registro como a saída mais recente da tarefa."""
+        self._guardadas[nome] = [registro] + self._guardadas.get(nome, [])[:MAX_POR_TAREFA - 1]
+
+    def _texto_de(self, tarefa):
+        # Tarefa que rodou agora tem `output`; a que veio pronta da sessão, não
+        if tarefa.output is not None:
+            return tarefa.output.raw
+        registro = self.obter(nome_tarefa(tarefa))
+        return registro["texto"] if registro else ""
+
+    def preparar(self, tarefas, a_gerar):
+        """
+        Separa o que roda do que vem da sessão; devolve (tarefas, prontas) para o executar_dag.
+        - tarefas: todas as Task do app
+        - a_gerar: nomes devolvidos por a_gerar(); a lista é ampliada no lugar com
+          quem depende de uma tarefa que vai rodar (o context dela vai mudar) e com
+          as dependências que não têm saída guardada
+        `prontas` é {id(tarefa): texto}; tarefas que nem rodam nem são context de
+        ninguém ficam de fora.
+        """
+        mudou = True
+        while mudou:
+            mudou = False
+            for tarefa in tarefas:
+                nome = nome_tarefa(tarefa)
+                contexto = tarefa.context if isinstance(tarefa.context, list) else []
+                novas = [nome] if nome not in a_gerar and any(nome_tarefa(d) in a_gerar for d in contexto) else []
+                if nome in a_gerar:
+                    novas = [nome_tarefa(d) for d in contexto
+                             if nome_tarefa(d) not in a_gerar and self.obter(nome_tarefa(d)) is None]
+                a_gerar.extend(novas)
+                mudou = mudou or bool(novas)
+        rodar = [t for t in tarefas if nome_tarefa(t) in a_gerar]
+        prontas = {}
+        for tarefa in rodar:
+            for dep in tarefa.context if isinstance(tarefa.context, list) else []:
+                if nome_tarefa(dep) not in a_gerar:
+                    prontas[id(dep)] = self.obter(nome_tarefa(dep))["texto"]
+        ids = {id(t) for t in rodar} | set(prontas)
+        return [t for t in tarefas if id(t) in ids], prontas
+
+    # ---------------------------
+    # Cache semântico (pedidos parecidos de qualquer sessão)
+    # ---------------------------
+    def reaproveitar_parecido(self, nomes, a_gerar, limiar):
+        """
+        Serve do índice semântico do app o que falta, se houver pedido parecido.
+        - nomes: tarefas que a tela mostra
+        - a_gerar: o que a_gerar() pediu
+        - limiar: semelhança mínima (0 a 1)
+        Devolve o que ainda precisa rodar. Não consulta o índice quando o pedido
+        é para gerar de novo (botão de uma aba ou "gerar do zero").
+        """
+        if not a_gerar or self.refazer_tudo or self.aba_refazer:
+            return a_gerar
+        from cache_semantico import obter_indice
+
+        achado = obter_indice(self.app).buscar(self.inputs, limiar, precisa=a_gerar)
+        if achado is None:
+            return a_gerar
+        semelhanca, inputs_origem, material = achado
+        origem = {"tema": inputs_origem.get("tema", ""), "semelhanca": semelhanca}
+        for nome in [n for n in a_gerar if n in material]:
+            # Mesmas variáveis, agora com os valores deste pedido; o gabarito só vale
+            # se os exercícios também vierem do mesmo pedido (o "base" confere)
+            registro = dict(material[nome], origem=origem)
+            registro["entradas"] = {v: self.inputs.get(v) for v in registro["entradas"]}
+            self.incluir(nome, registro)
+        st.session_state[self._chave_entradas] = self.inputs
+        return self.faltando(nomes)
+
+    def indexar(self, nomes):
+        """Põe no índice semântico do app o material destas entradas, se estiver completo e for novo."""
+        registros = {nome: self.obter(nome) for nome in nomes}
+        if all(registros.values()) and not any(r.get("origem") for r in registros.values()):
+            from cache_semantico import obter_indice
+
+            obter_indice(self.app).adicionar(self.inputs, registros)
+
+    # ---------------------------
+    # Histórico persistente (historico.py)
+    # ---------------------------
+    def arquivar(self, titulos, job):
+        """
+        Guarda no histórico do processo a geração que o job acabou de concluir.
+        - titulos: {nome da tarefa: título da aba}
+        - job: job devolvido por acompanhar()
+        Entram as abas com saída para as entradas do job (as que ele gerou e as que
+        vieram da sessão), com o modelo e os segundos de cada tarefa. Job que não
+        produziu nada (cancelado antes de começar, falha geral) não entra.
+        """
+        if job.rastro is None or not any(not isinstance(s, Exception) for _, s in job.concluidas):
+            return
+        from historico import obter_historico
+
+        inputs = job.rastro.inputs
+        segundos = {s.nome: s.duracao for s in list(job.rastro.spans) if s.tipo == "tarefa"}
+        saidas = {}
+        for nome in titulos:
+            registro = next(
+                (r for r in self._guardadas.get(nome, [])
+                 if all(inputs.get(var) == valor for var, valor in r["entradas"].items())),
+                None,
+            )
+            if registro is not None:
+                saidas[nome] = {"texto": registro["texto"], "modelo": registro["modelo"], "segundos": segundos.get(nome, 0.0)}
+        if saidas:
+            obter_historico().registrar(self.app, inputs, saidas, (job.rastro.fim or time.time()) - job.rastro.inicio)
+
+    # ---------------------------
+    # Geração em segundo plano (fila_jobs.py)
+    # ---------------------------
+    def submeter(self, agentes, tarefas, inputs, a_gerar, extras=None, **kwargs):
+        """
+        Manda a geração para a fila de jobs do processo; a página só acompanha.
+        - agentes, tarefas, inputs: como no executar_dag
+        - a_gerar: tarefas que o job vai produzir (depois do preparar())
+        - extras: dados que a página quer de volta no fim (ex.: relatório de prompts)
+        - kwargs: parâmetros do executar_dag (max_paralelo, prontas...) e `transmitir`
+        Tarefas já feitas por uma geração interrompida com as mesmas entradas não
+        rodam de novo (retomada.py), a não ser quando o pedido é para gerar de novo
+        ("ignorar cache", "gerar do zero" ou "gerar só esta aba de novo").
+        Com a fila cheia, mostra o aviso e devolve False. Um job anterior desta
+        página na mesma sessão é cancelado. Pedido idêntico a um job ainda no ar
+        (outra sessão, mesmo tema) passa a acompanhar esse job.
+        """
+        from fila_jobs import FilaCheia, obter_fila, rodar_tarefas
+
+        anterior = self.job_atual()
+        kwargs.setdefault("retomada", None if self.pular_cache or not _usa_cache(tarefas) else self.app)
+
+        def funcao(job):
+            rodar_tarefas(job, agentes, tarefas, inputs, **kwargs)
+
+        try:
+            job = obter_fila().submeter(self.app, funcao, chave=_chave_pedido(self.app, tarefas, inputs, kwargs))
+        except FilaCheia as erro:
+            st.error(f"🚦 Servidor ocupado ({erro}). Tente de novo em alguns segundos.")
+            return False
+        if anterior is not None:
+            anterior.desistir()
+        if job.funcao is funcao:
+            job.extras = dict(extras or {})
+        st.session_state[self._chave_job] = {
+            "id": job.id, "inputs": dict(inputs), "a_gerar": list(a_gerar), "entregues": 0,
+            # Coalescido: as tarefas que o job de outra sessão entregar não foram à API por este pedido
+            "coalescido": job.funcao is not funcao,
+        }
+        return True
+
+    def job_atual(self):
+        """Job desta página na sessão (rodando ou terminado e ainda não mostrado), ou None."""
+        info = st.session_state.get(self._chave_job)
+        if info is None:
+            return None
+        from fila_jobs import obter_fila
+
+        job = obter_fila().obter(info["id"])
+        if job is None:
+            st.session_state.pop(self._chave_job, None)
+        return job
+
+    def acompanhar(self, titulos, transmitir=True, grupos=None):
+        """
+        Desenha as abas do job desta sessão e redesenha a página até ele terminar.
+        - titulos: {nome da tarefa: título da aba}
+        - transmitir: mostrar o texto parcial das tarefas em andamento
+        - grupos: grupos de abas, como em abas()
+        Cada saída nova vai para a sessão assim que chega. Devolve o job uma vez,
+        quando ele termina (a página mostra `job.erro`, se houver), ou None se não
+        há job (a página desenha as abas guardadas).
+        """
+        job = self.job_atual()
+        if job is None:
+            return None
+        from fila_jobs import CANCELADO, NA_FILA, obter_fila
+
+        info = st.session_state[self._chave_job]
+        job.visto_em = time.time()
+        concluidas = job.concluidas[:]
+        erros = info.setdefault("erros", {})
+        recebidas = 0
+        for tarefa, saida in concluidas[info["entregues"]:]:
+            if isinstance(saida, Exception):
+                erros[nome_tarefa(tarefa)] = str(saida)
+            else:
+                modelo = job.modelos.get(nome_tarefa(tarefa)) or modelo_da_tarefa(job.rastro, tarefa)
+                self.guardar(tarefa, saida.raw, modelo, info["inputs"])
+                recebidas += 1
+        info["entregues"] = len(concluidas)
+        if info.get("coalescido") and recebidas:
+            from coalescencia import obter_coalescedor
+
+            obter_coalescedor().contar(recebidas)
+        prontas = {nome_tarefa(t) for t, _ in concluidas}
+        pendentes = [] if job.terminado else [n for n in info["a_gerar"] if n not in prontas]
+
+        if job.estado == NA_FILA:
+            st.info(f"⏳ Na fila de geração: posição {obter_fila().posicao(job)}. As abas se preenchem quando começar.")
+        elif job.estado == CANCELADO:
+            st.warning("✖️ Geração cancelada.")
+        if not job.terminado:
+            st.button("✖️ Cancelar geração", key=f"cancelar_{self.app}", on_click=self._cancelar, args=(job,))
+
+        espacos = self.abas(titulos, pendentes, grupos)
+        for nome in pendentes:
+            if nome not in espacos:
+                continue
+            if job.avisos.get(nome):
+                espacos[nome].warning(job.avisos[nome])
+            if transmitir and job.parciais.get(nome):
+                espacos[nome].markdown(job.parciais[nome] + " ▌")
+        for nome, erro in erros.items():
+            if nome in espacos:
+                espacos[nome].error(f"🚫 Falha ao gerar esta parte: {erro}")
+
+        if not job.terminado:
+            job.esperar(INTERVALO, vistas=len(concluidas))
+            st.rerun()
+        st.session_state.pop(self._chave_job, None)
+        return job
+
+    def _cancelar(self, job):
+        job.desistir()
+        if not job.cancelado:
+            # Outras sessões acompanham o mesmo pedido: só esta deixa de acompanhar
+            st.session_state.pop(self._chave_job, None)
+
+    # ---------------------------
+    # Exibição
+    # ---------------------------
+    def pedir_refazer(self, nome):
+        st.session_state[self._chave_refazer] = nome
+
+    def pedir_refazer_tudo(self):
+        st.session_state[f"refazer_tudo_{self.app}"] = True
+
+    def abas(self, titulos, a_gerar=(), grupos=None):
+        """
+        Desenha uma aba por tarefa e devolve {nome: espaço} para a geração preencher.
+        - titulos: {nome da tarefa: título da aba}, na ordem das abas
+        - a_gerar: tarefas que vão rodar agora (a aba fica com "Gerando...")
+        - grupos: {rótulo: {nome da tarefa: título}} para desenhar um grupo de abas
+          dentro de cada aba de rótulo (ex.: um por nível); sem grupos, só `titulos`
+        As outras mostram a saída guardada; se ela é de entradas antigas, com um aviso.
+        """
+        espacos = {}
+        origens = [r["origem"] for n in titulos if n not in a_gerar and (r := self.obter(n)) and r.get("origem")]
+        if origens:
+            st.info(
+                f"♻️ Material reaproveitado do cache: pedido parecido com “{origens[0]['tema']}” "
+                f"({origens[0]['semelhanca']:.0%} de semelhança). Nada foi gerado agora para essas abas."
+            )
+            st.button("🆕 Gerar do zero para este pedido", key=f"gerar_do_zero_{self.app}",
+                      on_click=self.pedir_refazer_tudo)
+        if grupos is None:
+            grupos = {None: titulos}
+        externas = st.tabs(list(grupos)) if None not in grupos else [contextlib.nullcontext()]
+        for externa, grupo in zip(externas, grupos.values()):
+            with externa:
+                for (nome, titulo), aba in zip(grupo.items(), st.tabs(list(grupo.values()))):
+                    with aba:
+                        espacos[nome] = st.empty()
+                        if nome in a_gerar:
+                            espacos[nome].info("🧠 Gerando...")
+                        else:
+                            self.mostrar(nome, espacos[nome])
+                        st.button(
+                            "🔄 Gerar só esta aba de novo",
+                            key=f"refazer_{self.app}_{nome}",
+                            on_click=self.pedir_refazer,
+                            args=(nome,),
+                        )
+        return espacos
+
+    def mostrar(self, nome, espaco):
+        """Mostra a saída guardada da tarefa no espaço (com o modelo que respondeu)."""
+        registro = self.obter(nome)
+        with espaco.container():
+            if registro is None:
+                registro = self.ultima(nome)
+                if registro is None:
+                    st.info("Ainda não gerado. Clique no botão de gerar.")
+                    return
+                st.warning("⚠️ Gerado para entradas anteriores. Clique no botão de gerar para atualizar.")
+            st.markdown(registro["texto"])
+            st.caption(f"🤖 {registro['modelo']}" + (" · ♻️ do cache semântico" if registro.get("origem") else ""))
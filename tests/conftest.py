@@ -0,0 +1,15 @@
+# Os módulos do projeto ficam na raiz do repositório (sem pacote): os testes
+# importam direto de lá, como os apps do Streamlit fazem.
+import os
+import sys
+
+# Tudo local: sem mapa de custos remoto do litellm, sem telemetria e sem
+# gravar cache, retomada ou histórico em disco
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CACHE_RESPOSTAS_ARQUIVO", ":memory:")
+os.environ.setdefault("RETOMADA_ARQUIVO", ":memory:")
+os.environ.setdefault("HISTORICO_ARQUIVO", ":memory:")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+# Tasks falsas para os testes do executar_dag: só o que ele usa de uma Task do
+# CrewAI, sem agente nem LLM.
+from types import SimpleNamespace
+
+
+class TarefaFalsa:
+    """
+    Task mínima: devolve "nome(context)" e registra início e fim em `eventos`.
+    - falhas: quantas execuções levantam erro antes de dar certo
+    - barreira: threading.Barrier que a execução precisa atravessar (prova o paralelismo)
+    """
+
+    def __init__(self, nome, context=None, eventos=None, falhas=0, barreira=None):
+        self.name = nome
+        self.description = f"Tarefa {nome}"
+        self.expected_output = "Texto"
+        self.context = context or []
+        self.agent = None
+        self.output = None
+        self.execucoes = 0
+        self.contextos = []
+        self._eventos = eventos if eventos is not None else []
+        self._falhas = falhas
+        self._barreira = barreira
+
+    def interpolate_inputs_and_add_conversation_history(self, inputs):
+        pass
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        self.execucoes += 1
+        self.contextos.append(context)
+        self._eventos.append(("inicio", self.name))
+        if self._barreira is not None:
+            self._barreira.wait()
+        if self.execucoes <= self._falhas:
+            self._eventos.append(("erro", self.name))
+            raise ValueError(f"falha em {self.name}")
+        self._eventos.append(("fim", self.name))
+        self.output = SimpleNamespace(raw=f"{self.name}({context or ''})")
+        return self.output
+
+
+def diamante(eventos=None, **extras):
+    # a -> (b, c) -> d
+    a = TarefaFalsa("a", eventos=eventos, **extras.get("a", {}))
+    b = TarefaFalsa("b", [a], eventos=eventos, **extras.get("b", {}))
+    c = TarefaFalsa("c", [a], eventos=eventos, **extras.get("c", {}))
+    d = TarefaFalsa("d", [b, c], eventos=eventos, **extras.get("d", {}))
+    return [a, b, c, d]
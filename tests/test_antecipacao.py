@@ -0,0 +1,103 @@
+# ------------------------------------------------------------
+# Antecipação: adoção pela geração e contagem de aproveitadas e desperdício
+# ------------------------------------------------------------
+import threading
+import time
+
+import pytest
+
+import antecipacao
+from antecipacao import EstatisticasAntecipacao, _antecipar, _reservar, obter_estatisticas
+from fila_jobs import FilaJobs, Job, adotar
+from rastreamento import registrar_uso, span_llm
+from tarefas_falsas import TarefaFalsa
+
+TOKENS = 15  # por chamada da TarefaComTokens
+
+
+class TarefaComTokens(TarefaFalsa):
+    """TarefaFalsa que gasta TOKENS numa chamada ao LLM (span no rastro do job) e pode esperar um evento."""
+
+    def __init__(self, nome, context=None, liberar=None):
+        super().__init__(nome, context)
+        self._liberar = liberar
+
+    def execute_sync(self, agent=None, context=None, tools=None):
+        if self._liberar is not None:
+            self._liberar.wait(5)
+        with span_llm("groq/teste", self):
+            registrar_uso({"prompt_tokens": 10, "completion_tokens": TOKENS - 10})
+            return super().execute_sync(agent, context, tools)
+
+
+@pytest.fixture(autouse=True)
+def estatisticas(monkeypatch):
+    monkeypatch.setattr(antecipacao, "_estatisticas", EstatisticasAntecipacao())
+    return obter_estatisticas()
+
+
+def _antecipado(*tarefas):
+    dados = {"agentes": [], "tarefas": list(tarefas), "inputs": {}, "prontas": {},
+             "entradas": {t.name: {} for t in tarefas}}
+    return FilaJobs(workers=1, max_fila=4).submeter("teste_antecipacao", lambda job: _antecipar(job, dados))
+
+
+def _esperar(condicao, segundos=5):
+    limite = time.time() + segundos
+    while not condicao() and time.time() < limite:
+        time.sleep(0.01)
+    assert condicao()
+
+
+def test_cada_tarefa_tem_um_destino_so():
+    job = Job("teste", None)
+    assert _reservar(job, "resumo", "colhida")
+    assert not _reservar(job, "resumo", "desperdicada")
+    assert job.extras["destinos"] == {"resumo": "colhida"}
+
+
+def test_adotada_so_conta_quando_a_saida_chega(estatisticas):
+    liberar = threading.Event()
+    a = TarefaComTokens("a")
+    origem = _antecipado(a, TarefaComTokens("b", [a], liberar=liberar))
+    _esperar(lambda: origem.concluidas)
+
+    # No clique: "b" ainda no ar é adotada pela geração; "a" ficou pronta e ninguém colheu
+    assert _reservar(origem, "b", "adotada")
+    origem.extras["sem_colheita"] = True
+    geracao, tarefa_b = Job("teste", None), TarefaFalsa("b")
+    prontas = []
+    adotando = threading.Thread(target=lambda: prontas.append(adotar(geracao, origem, ["b"], [tarefa_b])))
+    adotando.start()
+    time.sleep(0.1)
+    assert estatisticas.estatisticas()["aproveitadas"] == 0
+
+    liberar.set()
+    adotando.join(5)
+    assert prontas == [{id(tarefa_b): "b(a())"}]
+    _esperar(lambda: origem.terminado)
+    stats = estatisticas.estatisticas()
+    assert (stats["aproveitadas"], stats["tokens_aproveitados"]) == (1, TOKENS)
+    assert (stats["descartadas"], stats["tokens_desperdicados"]) == (1, TOKENS)
+
+
+def test_job_cancelado_conta_o_que_gastou_e_ninguem_colheu(estatisticas):
+    liberar = threading.Event()
+    a = TarefaComTokens("a")
+    origem = _antecipado(a, TarefaComTokens("b", [a], liberar=liberar))
+    _esperar(lambda: origem.concluidas)
+    origem.cancelar()
+    _esperar(lambda: origem.terminado)
+    liberar.set()
+    # "b" não chegou a gastar nada; "a" foi gerada para ninguém
+    stats = estatisticas.estatisticas()
+    assert (stats["aproveitadas"], stats["descartadas"], stats["tokens_desperdicados"]) == (0, 1, TOKENS)
+
+
+def test_saida_colhida_nao_conta_como_desperdicio(estatisticas):
+    origem = _antecipado(TarefaComTokens("a"))
+    _esperar(lambda: origem.concluidas)
+    assert _reservar(origem, "a", "colhida")
+    origem.cancelar()
+    _esperar(lambda: origem.terminado)
+    assert estatisticas.estatisticas()["tokens_desperdicados"] == 0
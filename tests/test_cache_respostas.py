@@ -0,0 +1,55 @@
+# ------------------------------------------------------------
+# Cache de respostas: LRU em memória, SQLite, TTL e limite de bytes
+# ------------------------------------------------------------
+from cache_respostas import CacheRespostas
+
+MENSAGENS = [{"role": "user", "content": "Explique grafos"}]
+
+
+def test_chave_depende_de_modelo_temperatura_e_mensagens():
+    chave = CacheRespostas.chave("groq/a", 0.2, MENSAGENS)
+    assert chave == CacheRespostas.chave("groq/a", 0.2, [dict(m) for m in MENSAGENS])
+    assert chave != CacheRespostas.chave("groq/b", 0.2, MENSAGENS)
+    assert chave != CacheRespostas.chave("groq/a", 0.7, MENSAGENS)
+    assert chave != CacheRespostas.chave("groq/a", 0.2, [{"role": "user", "content": "Explique árvores"}])
+
+
+def test_lru_em_memoria_tira_o_menos_usado_e_o_disco_segura():
+    cache = CacheRespostas(":memory:", max_memoria=2)
+    cache.guardar("a", "A")
+    cache.guardar("b", "B")
+    assert cache.obter("a") == "A"  # "a" passa a ser o mais recente
+    cache.guardar("c", "C")  # sai "b" da memória
+
+    assert cache.estatisticas()["itens_memoria"] == 2
+    assert cache.obter("b") == "B"
+    estatisticas = cache.estatisticas()
+    assert (estatisticas["acertos_memoria"], estatisticas["acertos_disco"]) == (1, 1)
+
+
+def test_limite_de_bytes_tira_os_menos_usados_do_disco():
+    cache = CacheRespostas(":memory:", max_memoria=10, max_bytes_disco=10)
+    cache.guardar("velha", "1234")
+    cache.guardar("meio", "1234")
+    cache.guardar("nova", "1234")
+
+    assert cache.estatisticas()["itens_disco"] == 2
+    assert cache.obter("velha") is None
+    assert cache.obter("nova") == "1234"
+
+
+def test_resposta_expirada_some_das_duas_camadas():
+    cache = CacheRespostas(":memory:", ttl=60)
+    cache.guardar("a", "A")
+    cache.ttl = -1
+    assert cache.obter("a") is None
+    assert cache.estatisticas()["itens_disco"] == 0
+    assert cache.estatisticas()["falhas"] == 1
+
+
+def test_limpar_zera_memoria_e_disco():
+    cache = CacheRespostas(":memory:")
+    cache.guardar("a", "A")
+    cache.limpar()
+    assert cache.obter("a") is None
+    assert cache.estatisticas()["itens_memoria"] == cache.estatisticas()["itens_disco"] == 0
@@ -0,0 +1,89 @@
+# ------------------------------------------------------------
+# Cache semântico: pedidos parecidos reaproveitam a geração guardada
+# ------------------------------------------------------------
+import pytest
+
+from cache_semantico import IndiceSemantico, marcos, normalizar, vetorizar
+
+ALGORITMOS = {"tema": "Algoritmos de ordenação", "nivel": "Iniciante", "objetivo": "Prova"}
+
+
+def test_normalizar():
+    assert normalizar("  Algoritmos   de Ordenação! ") == "algoritmos de ordenacao"
+    assert normalizar("Não informado") == ""
+    assert normalizar(None) == ""
+
+
+def test_vetor_normalizado_e_independente_da_grafia():
+    vetor = vetorizar(ALGORITMOS["tema"])
+    assert float(vetor @ vetor) == pytest.approx(1.0, abs=1e-5)
+    assert float(vetor @ vetorizar("ALGORITMOS DE ORDENACAO")) == pytest.approx(1.0, abs=1e-5)
+    assert vetorizar("") is None and vetorizar("Não informado") is None
+
+
+def test_marcos_do_tema():
+    assert marcos("Equação do 2º grau") == {"2o"}
+    assert marcos("Segunda Guerra Mundial") == {"segunda"}
+    assert marcos("Algoritmos de ordenação") == set()
+
+
+def test_erro_de_digitacao_acerta_e_outro_tema_nao():
+    indice = IndiceSemantico()
+    indice.adicionar(ALGORITMOS, {"resumo": "R"})
+
+    achado = indice.buscar({**ALGORITMOS, "tema": "Algoritimos de ordenaçao"})
+    assert achado is not None
+    semelhanca, inputs, material = achado
+    assert semelhanca >= 0.75 and inputs == ALGORITMOS and material == {"resumo": "R"}
+
+    assert indice.buscar({**ALGORITMOS, "tema": "Fotossíntese"}) is None
+
+
+def test_erro_de_digitacao_so_no_tema_passa_do_limiar():
+    indice = IndiceSemantico()
+    indice.adicionar({"tema": "Algoritmos"}, {"resumo": "R"})
+    assert indice.buscar({"tema": "Algoritimos"}) is not None
+    assert indice.buscar({"tema": "Logaritmos"}) is None
+
+
+@pytest.mark.parametrize("guardado, novo", [
+    ("Equação do 2º grau", "Equação do 1º grau"),
+    ("Leis de Newton 1", "Leis de Newton 3"),
+    ("Segunda Lei de Newton", "Primeira Lei de Newton"),
+])
+def test_numeros_e_ordinais_do_tema_precisam_ser_iguais(guardado, novo):
+    indice = IndiceSemantico()
+    indice.adicionar({"tema": guardado}, {"resumo": "R"})
+    assert indice.buscar({"tema": novo}, limiar=0.5) is None
+    assert indice.buscar({"tema": guardado.upper()})[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_campo_vazio_fica_de_fora_e_campo_diferente_reprova():
+    indice = IndiceSemantico()
+    indice.adicionar({"tema": "Algoritmos", "nivel": "Iniciante", "objetivo": "Não informado"}, {"resumo": "R"})
+    # Vazio num dos pedidos não soma nem tira: só o tema e o nível contam
+    assert indice.buscar({"tema": "Algoritmos", "nivel": "iniciante", "objetivo": ""})[0] == pytest.approx(1.0)
+    assert indice.buscar({"tema": "Algoritmos", "objetivo": "Prova"})[0] == pytest.approx(1.0)
+    # Nível preenchido e diferente nos dois reprova, mesmo com o tema igual
+    assert indice.buscar({"tema": "Algoritmos", "nivel": "Pós-graduação"}, limiar=0.5) is None
+
+
+def test_prefere_a_geracao_que_tem_as_tarefas_pedidas():
+    indice = IndiceSemantico()
+    indice.adicionar(ALGORITMOS, {"resumo": "R"})
+    indice.adicionar({**ALGORITMOS, "objetivo": "Prova final"}, {"resumo": "R2", "gabarito": "G"})
+    assert indice.buscar(ALGORITMOS, limiar=0.7)[2] == {"resumo": "R"}
+    assert indice.buscar(ALGORITMOS, limiar=0.7, precisa=("gabarito",))[2]["gabarito"] == "G"
+
+
+def test_entradas_iguais_substituem_e_o_mais_antigo_sai():
+    indice = IndiceSemantico(max_itens=2)
+    indice.adicionar(ALGORITMOS, {"resumo": "velho"})
+    indice.adicionar({**ALGORITMOS, "tema": " algoritmos de ORDENAÇÃO"}, {"resumo": "novo"})
+    assert len(indice) == 1
+    assert indice.buscar(ALGORITMOS)[2] == {"resumo": "novo"}
+
+    indice.adicionar({"tema": "Grafos"}, {})
+    indice.adicionar({"tema": "Árvores"}, {})
+    assert len(indice) == 2
+    assert indice.buscar(ALGORITMOS) is None
@@ -0,0 +1,67 @@
+# ------------------------------------------------------------
+# Pool de chaves: leitura do ambiente, escolha pela folga, 429, falhas e quarentena
+# ------------------------------------------------------------
+from chaves import PoolChaves, carregar_chaves, mascarar
+from limitador import obter_limitador
+
+
+def _uso(pool, chave):
+    return next(u for u in pool.uso() if u["chave"] == mascarar(chave))
+
+
+def test_carregar_chaves_sem_repeticao_e_na_ordem(monkeypatch, tmp_path):
+    arquivo = tmp_path / "chaves.txt"
+    arquivo.write_text("gsk_c  # reserva\n\n# comentário\ngsk_a\n", encoding="utf-8")
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_a")
+    monkeypatch.setenv("GROQ_API_KEYS", "gsk_b, gsk_a;gsk_c")
+    monkeypatch.setenv("GROQ_CHAVES_ARQUIVO", str(arquivo))
+    assert carregar_chaves() == ["gsk_a", "gsk_b", "gsk_c"]
+    assert mascarar("gsk_abcd1234") == "…1234"
+
+
+def test_escolhe_a_chave_com_mais_folga():
+    modelo = "teste/chaves-folga"
+    pool = PoolChaves(["k1", "k2"])
+    obter_limitador(modelo, "k1").aguardar(3000)  # metade dos tokens/min de k1 já foi
+    assert pool.escolher(modelo, 100) == "k2"
+    # Empate na folga: vai para a que tem menos chamadas em andamento
+    pool_vazio = PoolChaves(["k3", "k4"])
+    assert pool_vazio.escolher("teste/chaves-empate", 10) == "k3"
+    assert pool_vazio.escolher("teste/chaves-empate", 10) == "k4"
+
+
+def test_registrar_conta_chamadas_e_tokens():
+    pool = PoolChaves(["k1"])
+    chave = pool.escolher("teste/chaves-registro", 10)
+    assert _uso(pool, chave)["em_andamento"] == 1
+    pool.registrar(chave, tokens=120)
+    uso = _uso(pool, chave)
+    assert (uso["em_andamento"], uso["chamadas"], uso["tokens"]) == (0, 1, 120)
+
+
+def test_falha_so_libera_a_vaga():
+    pool = PoolChaves(["k1", "k2"], quarentena_apos=2)
+    pool.escolher("teste/chaves-falha", 10)
+    pool.registrar("k1", erro_429=True)
+    pool.escolher("teste/chaves-falha", 10)
+    # Timeout no meio dos 429: não conta chamada nem zera os 429 seguidos
+    pool.registrar("k1", tokens=50, falha=True)
+    uso = _uso(pool, "k1")
+    assert (uso["em_andamento"], uso["chamadas"], uso["tokens"]) == (0, 0, 0)
+    pool.registrar("k1", erro_429=True)
+    assert _uso(pool, "k1")["quarentenas"] == 1
+
+
+def test_quarentena_tira_a_chave_do_rodizio():
+    pool = PoolChaves(["k1", "k2"], quarentena_apos=2, quarentena=60)
+    for _ in range(2):
+        pool.registrar("k1", erro_429=True)
+    assert _uso(pool, "k1")["quarentena_restante"] > 50
+    assert {pool.escolher("teste/chaves-quarentena", 10) for _ in range(3)} == {"k2"}
+
+
+def test_chave_unica_nunca_entra_em_quarentena():
+    pool = PoolChaves(["k1"], quarentena_apos=1)
+    pool.registrar("k1", erro_429=True)
+    assert _uso(pool, "k1")["quarentenas"] == 0
+    assert pool.escolher("teste/chaves-unica", 10) == "k1"
@@ -0,0 +1,65 @@
+# ------------------------------------------------------------
+# Coalescência: chamadas idênticas em andamento viram uma só
+# ------------------------------------------------------------
+import threading
+
+import pytest
+
+from coalescencia import Coalescedor, EsperaCancelada, Voo, chave_chamada
+
+
+def test_chave_ignora_espacos_sobrando():
+    mensagens = [{"role": "user", "content": "Explique  grafos "}]
+    assert chave_chamada("m", 0.2, mensagens) == chave_chamada("m", 0.2, [{"role": "user", "content": "Explique grafos"}])
+    assert chave_chamada("m", 0.2, mensagens) != chave_chamada("m", 0.7, mensagens)
+
+
+def test_quem_chega_depois_espera_a_lider():
+    coalescedor = Coalescedor()
+    voo, lider = coalescedor.entrar("k")
+    mesmo, segundo = coalescedor.entrar("k")
+    assert lider and not segundo and mesmo is voo
+
+    recebidos, resposta = [], []
+    seguidora = threading.Thread(target=lambda: resposta.append(voo.acompanhar(recebidos.append)))
+    seguidora.start()
+    voo.publicar("Olá, ")
+    voo.publicar(None)  # a líder recomeçou (nova tentativa)
+    voo.publicar("Oi!")
+    coalescedor.sair("k", voo, texto="Oi!")
+    seguidora.join(timeout=5)
+
+    assert resposta == ["Oi!"]
+    assert recebidos[-2:] == [None, "Oi!"]
+    # A chave ficou livre: a próxima chamada é líder de novo
+    assert coalescedor.entrar("k")[1]
+
+
+def test_erro_da_lider_vai_para_quem_espera_e_nao_conta():
+    coalescedor = Coalescedor()
+    voo, _ = coalescedor.entrar("k")
+    coalescedor.sair("k", voo, erro=ValueError("falhou"))
+    with pytest.raises(ValueError):
+        voo.acompanhar()
+    assert coalescedor.estatisticas()["deduplicadas"] == 0
+    coalescedor.contar()
+    assert coalescedor.estatisticas() == {"em_andamento": 0, "lideres": 1, "deduplicadas": 1}
+
+
+def test_seguidora_cancelada_desiste_sem_esperar_a_lider():
+    voo = Voo()
+    cancelar = threading.Event()
+    erros = []
+
+    def acompanhar():
+        try:
+            voo.acompanhar(cancelar=cancelar)
+        except EsperaCancelada as erro:
+            erros.append(erro)
+
+    seguidora = threading.Thread(target=acompanhar)
+    seguidora.start()
+    cancelar.set()
+    seguidora.join(timeout=5)
+    assert not seguidora.is_alive() and len(erros) == 1
+    assert not voo.terminado  # a líder segue para os outros
@@ -0,0 +1,126 @@
+# ------------------------------------------------------------
+# Fila de jobs: workers, admissão, cancelamento e abandono
+# ------------------------------------------------------------
+import threading
+import time
+
+import pytest
+
+from fila_jobs import CANCELADO, CONCLUIDO, ERRO, NA_FILA, FilaCheia, FilaJobs, rodar_tarefas
+from tarefas_falsas import diamante
+
+
+def _esperar_fim(job, segundos=5):
+    limite = time.time() + segundos
+    while not job.terminado and time.time() < limite:
+        job.esperar(0.1, vistas=len(job.concluidas))
+    assert job.terminado
+
+
+def test_job_roda_no_worker_e_conclui():
+    fila = FilaJobs(workers=1, max_fila=4)
+    threads = []
+    job = fila.submeter("teste", lambda job: threads.append(threading.current_thread().name))
+    _esperar_fim(job)
+    assert job.estado == CONCLUIDO and threads[0].startswith("fila-worker-")
+
+
+def test_erro_do_trabalho_fica_no_job():
+    fila = FilaJobs(workers=1, max_fila=4)
+
+    def falhar(job):
+        raise ValueError("falhou")
+
+    job = fila.submeter("teste", falhar)
+    _esperar_fim(job)
+    assert job.estado == ERRO and isinstance(job.erro, ValueError)
+
+
+def test_fila_cheia_recusa_na_hora_e_mostra_a_posicao():
+    fila = FilaJobs(workers=1, max_fila=2)
+    liberar = threading.Event()
+    rodando = fila.submeter("teste", lambda job: liberar.wait(5))
+    while rodando.estado == NA_FILA:
+        time.sleep(0.01)
+    esperando = [fila.submeter("teste", lambda job: None) for _ in range(2)]
+    assert [fila.posicao(job) for job in esperando] == [1, 2]
+    with pytest.raises(FilaCheia):
+        fila.submeter("teste", lambda job: None)
+    assert fila.estatisticas() == {"esperando": 2, "rodando": 1, "workers": 1, "max_fila": 2}
+    liberar.set()
+    _esperar_fim(esperando[-1])
+
+
+def test_job_cancelado_na_fila_nem_roda():
+    fila = FilaJobs(workers=1, max_fila=4)
+    liberar = threading.Event()
+    fila.submeter("teste", lambda job: liberar.wait(5))
+    rodou = []
+    job = fila.submeter("teste", lambda job: rodou.append(True))
+    job.cancelar()
+    liberar.set()
+    _esperar_fim(job)
+    assert job.estado == CANCELADO and not rodou
+
+
+def test_job_que_ninguem_consulta_e_cancelado():
+    fila = FilaJobs(workers=1, max_fila=4, abandono=0.2)
+    job = fila.submeter("teste", lambda job: job._cancelar.wait(5))
+    _esperar_fim(job)
+    assert job.estado == CANCELADO
+
+
+def test_rodar_tarefas_entrega_cada_tarefa_e_para_no_cancelamento():
+    fila = FilaJobs(workers=1, max_fila=4)
+    tarefas = diamante()
+    job = fila.submeter("teste", lambda job: rodar_tarefas(job, [], tarefas, {}, transmitir=False))
+    _esperar_fim(job)
+    nomes = [t.name for t, _ in job.concluidas]
+    assert nomes[0] == "a" and nomes[-1] == "d" and sorted(nomes) == ["a", "b", "c", "d"]
+    assert job.rastro is not None and job.rastro.fim
+
+    cancelado = fila.submeter("teste", lambda job: (job.cancelar(), rodar_tarefas(job, [], diamante(), {})))
+    _esperar_fim(cancelado)
+    assert cancelado.estado == CANCELADO and cancelado.concluidas == []
+
+
+def test_pedido_identico_acompanha_o_job_no_ar():
+    fila = FilaJobs(workers=1, max_fila=4)
+    liberar = threading.Event()
+    job = fila.submeter("teste", lambda job: liberar.wait(5), chave="k")
+    assert fila.submeter("teste", lambda job: None, chave="k") is job
+    assert job.interessados == 2
+    # Uma das sessões desiste: o job segue para a outra
+    job.desistir()
+    assert not job.cancelado
+    liberar.set()
+    _esperar_fim(job)
+    # Terminado, a mesma chave volta a abrir um job novo
+    assert fila.submeter("teste", lambda job: None, chave="k") is not job
+
+
+def test_job_e_cancelado_quando_todos_desistem():
+    fila = FilaJobs(workers=1, max_fila=4)
+    job = fila.submeter("teste", lambda job: job._cancelar.wait(5), chave="k")
+    fila.submeter("teste", lambda job: None, chave="k")
+    job.desistir()
+    job.desistir()
+    _esperar_fim(job)
+    assert job.estado == CANCELADO
+    assert fila.submeter("teste", lambda job: None, chave="k") is not job
+
+
+def test_desistir_e_submeter_ao_mesmo_tempo_nao_perdem_o_interessado():
+    # Quem chega junto com a última desistência ou soma antes (e o job segue)
+    # ou vê o job cancelado (e abre outro); nunca fica atrás de um job cancelado
+    fila = FilaJobs(workers=1, max_fila=64)
+    for _ in range(20):
+        job = fila.submeter("teste", lambda job: job._cancelar.wait(0.5), chave="k")
+        novos = []
+        outra = threading.Thread(target=lambda: novos.append(fila.submeter("teste", lambda job: None, chave="k")))
+        outra.start()
+        job.desistir()
+        outra.join()
+        assert novos[0] is not job or not job.cancelado
+        job.cancelar()
+        novos[0].cancelar()
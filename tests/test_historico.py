@@ -0,0 +1,54 @@
+# ------------------------------------------------------------
+# Histórico: registro, busca pelas entradas e limites
+# ------------------------------------------------------------
+import pytest
+
+from historico import HistoricoGeracoes
+
+
+def _saidas(*textos):
+    return {f"t{i}": {"texto": texto, "modelo": "m", "segundos": 1.0} for i, texto in enumerate(textos)}
+
+
+@pytest.fixture
+def historico():
+    historico = HistoricoGeracoes(":memory:")
+    historico.registrar("aula", {"tema": "Algoritmos", "nivel": "Iniciante"}, _saidas("a"))
+    historico.registrar("aula", {"tema": "snake_case em Python", "nivel": "Médio"}, _saidas("b"))
+    historico.registrar("exercicio", {"tema": "Algoritmos"}, _saidas("c"))
+    return historico
+
+
+def _temas(historico, busca, app="aula"):
+    return [geracao["inputs"]["tema"] for geracao in historico.listar(app, busca)]
+
+
+def test_busca_nas_entradas_normalizadas(historico):
+    assert _temas(historico, "") == ["snake_case em Python", "Algoritmos"]
+    assert _temas(historico, "ALGORÍTMOS") == ["Algoritmos"]
+    assert _temas(historico, "medio") == ["snake_case em Python"]
+    assert _temas(historico, "algo", app="exercicio") == ["Algoritmos"]
+
+
+def test_busca_nao_casa_nomes_dos_campos_nem_curingas(historico):
+    assert _temas(historico, "tema") == []
+    assert _temas(historico, "nivel") == []
+    assert _temas(historico, "_") == ["snake_case em Python"]
+    # Só pontuação: nada sobra da busca e a lista vem inteira
+    assert _temas(historico, '"%') == ["snake_case em Python", "Algoritmos"]
+
+
+def test_geracao_que_contem_a_anterior_a_substitui(historico):
+    historico.registrar("aula", {"tema": "algoritmos ", "nivel": "iniciante"}, _saidas("a", "gabarito"))
+    geracoes = historico.listar("aula", "algoritmos")
+    assert len(geracoes) == 1 and geracoes[0]["tarefas"] == ["t0", "t1"]
+    assert historico.obter(geracoes[0]["id"])["saidas"]["t1"]["texto"] == "gabarito"
+
+
+def test_limite_de_bytes_tira_as_mais_antigas():
+    historico = HistoricoGeracoes(":memory:")
+    primeira = historico.registrar("aula", {"tema": "a"}, _saidas("x" * 100))
+    historico.max_bytes = historico.estatisticas()["bytes"]  # cabe uma geração
+    historico.registrar("aula", {"tema": "b"}, _saidas("y" * 100))
+    assert _temas(historico, "") == ["b"]
+    assert historico.obter(primeira) is None
@@ -0,0 +1,60 @@
+# ------------------------------------------------------------
+# Limitador: token bucket, folga, pausa depois de 429 e retry-after
+# ------------------------------------------------------------
+from types import SimpleNamespace
+
+import pytest
+
+from limitador import RESERVA_SAIDA, BaldeDeTokens, LimitadorModelo, estimar_tokens, tempo_de_espera
+
+
+def test_balde_espera_o_que_falta_e_repoe_com_o_tempo():
+    balde = BaldeDeTokens(capacidade=10, por_segundo=2)
+    agora = balde.atualizado_em
+    assert balde.espera_para(10, agora) == 0
+    balde.consumir(10)
+    assert balde.espera_para(4, agora) == pytest.approx(2.0)
+    assert balde.espera_para(4, agora + 2) == 0
+    # Pedido maior que o balde espera só o balde encher
+    assert balde.espera_para(50, agora + 2) == pytest.approx(3.0)
+
+
+def test_limitador_desconta_requisicoes_e_tokens():
+    limitador = LimitadorModelo(rpm=2, tpm=1000)
+    assert limitador.folga() == pytest.approx(1.0, abs=0.01)
+    assert limitador.aguardar(500) < 0.1
+    assert limitador.folga() == pytest.approx(0.5, abs=0.01)
+    assert limitador.aguardar(100) < 0.1
+    # Sem requisições no balde: a próxima espera ~30 s (2 por minuto)
+    assert limitador.espera_prevista(100) == pytest.approx(30, abs=1)
+
+
+def test_pausa_depois_de_429_zera_a_folga():
+    limitador = LimitadorModelo(rpm=30, tpm=6000)
+    limitador.pausar(5)
+    assert limitador.folga() == 0.0
+    assert limitador.espera_prevista(10) == pytest.approx(5, abs=0.5)
+
+
+def test_estimativa_de_tokens():
+    mensagens = [{"role": "system", "content": "x" * 400}, {"role": "user", "content": "y" * 400}]
+    assert estimar_tokens(mensagens) == 200 + RESERVA_SAIDA
+    assert estimar_tokens("z" * 40, max_tokens=300) == 310
+
+
+def _erro(mensagem="", cabecalhos=None):
+    class Erro429(Exception):
+        response = SimpleNamespace(headers=cabecalhos or {})
+
+    return Erro429(mensagem)
+
+
+def test_tempo_de_espera_usa_retry_after_e_mensagem():
+    assert 7 <= tempo_de_espera(_erro(cabecalhos={"retry-after": "7"}), tentativa=0) <= 8
+    espera = tempo_de_espera(_erro("Rate limit reached. Please try again in 1m2.5s."), tentativa=1)
+    assert 62.5 <= espera <= 64.5
+
+
+def test_tempo_de_espera_sem_sugestao_e_exponencial_com_teto():
+    assert 4 <= tempo_de_espera(_erro(), tentativa=1) <= 6
+    assert 60 <= tempo_de_espera(_erro(), tentativa=10) <= 90
@@ -0,0 +1,103 @@
+# ------------------------------------------------------------
+# Marcadores nas respostas do modelo: gabarito do modo fundido e modo grupo
+# ------------------------------------------------------------
+# O modelo nem sempre escreve o marcador do jeito pedido (negrito, cabeçalho,
+# minúsculas, texto antes do primeiro bloco): a separação tem de aguentar.
+# ------------------------------------------------------------
+import pytest
+
+from equipes import separar_gabarito
+from grupo import formatar_lote, ler_personagens, separar_respostas
+
+LOTE = [
+    {"nome": "Thorin", "raca": "Anão", "classe": "Guerreiro", "tema": "montanhas"},
+    {"nome": "Élana", "raca": "Elfo", "classe": "Mago", "tema": "não especificado"},
+]
+
+
+def _personagem(nome, abertura="=== PERSONAGEM: {nome} ===", parte="--- {parte} ---"):
+    partes = [parte.format(parte=p) + f"\nTexto de {p.lower()} de {nome}." for p in ("CONCEITO", "FICHA", "DESCRIÇÃO")]
+    return abertura.format(nome=nome) + "\n" + "\n".join(partes)
+
+
+# ----------------------------
+# Gabarito (modo fundido)
+# ----------------------------
+@pytest.mark.parametrize("marcador", [
+    "=== GABARITO ===",
+    "**=== GABARITO ===**",
+    "## === Gabarito ===",
+    "==== gabarito ====",
+    "  === GABARITO ===  ",
+])
+def test_gabarito_separado_com_marcador_enfeitado(marcador):
+    texto = f"1. Quanto é 2+2?\n2. Quanto é 3+3?\n\n{marcador}\n\n1. 4\n2. 6\n"
+    assert separar_gabarito(texto) == ("1. Quanto é 2+2?\n2. Quanto é 3+3?", "1. 4\n2. 6")
+
+
+def test_sem_marcador_o_gabarito_vem_vazio():
+    assert separar_gabarito("  1. Quanto é 2+2?\n") == ("1. Quanto é 2+2?", "")
+
+
+def test_marcador_no_meio_da_linha_nao_separa():
+    texto = "Confira o === GABARITO === no fim.\n1. Quanto é 2+2?"
+    assert separar_gabarito(texto) == (texto, "")
+
+
+def test_so_o_primeiro_marcador_separa():
+    exercicios, gabarito = separar_gabarito("1. Q\n=== GABARITO ===\n1. R\n=== GABARITO ===\nsobra")
+    assert exercicios == "1. Q"
+    assert gabarito == "1. R\n=== GABARITO ===\nsobra"
+
+
+# ----------------------------
+# Modo grupo
+# ----------------------------
+def test_lote_completo_separado_por_nome():
+    texto = "Aqui estão os personagens:\n\n" + _personagem("Thorin") + "\n\n" + _personagem("Élana")
+    thorin, elana = separar_respostas(texto, LOTE)
+    assert thorin == {
+        "conceito": "Texto de conceito de Thorin.",
+        "ficha": "Texto de ficha de Thorin.",
+        "descricao": "Texto de descrição de Thorin.",
+    }
+    assert elana["ficha"] == "Texto de ficha de Élana."
+
+
+def test_marcadores_em_negrito_cabecalho_e_minusculas():
+    texto = "\n".join([
+        _personagem("Thorin", "**=== PERSONAGEM: Thorin ===**", "**--- {parte} ---**"),
+        _personagem("Élana", "## ==== personagem : élana ====", "--- {parte} ---").replace("CONCEITO", "Conceito"),
+    ])
+    thorin, elana = separar_respostas(texto, LOTE)
+    assert thorin["conceito"] == "Texto de conceito de Thorin."
+    assert elana["descricao"] == "Texto de descrição de Élana."
+
+
+def test_fora_de_ordem_vale_o_nome():
+    texto = _personagem("Elana") + "\n" + _personagem("THORIN")
+    thorin, elana = separar_respostas(texto, LOTE)
+    assert "Thorin" not in elana["conceito"] and "THORIN" in thorin["conceito"]
+
+
+def test_nome_trocado_usa_a_ordem_se_vieram_todos():
+    texto = _personagem("Thorin Escudo-de-Carvalho") + "\n" + _personagem("Elana, a Sábia")
+    thorin, elana = separar_respostas(texto, LOTE)
+    assert "Thorin" in thorin["conceito"] and "Elana" in elana["conceito"]
+
+
+def test_faltou_personagem_ou_parte_vem_none():
+    incompleto = _personagem("Élana").split("--- DESCRIÇÃO ---")[0]
+    assert separar_respostas(_personagem("Thorin"), LOTE)[1] is None
+    assert separar_respostas(_personagem("Thorin") + "\n" + incompleto, LOTE)[1] is None
+    assert separar_respostas("O modelo se recusou a responder.", LOTE) == [None, None]
+
+
+def test_lista_de_personagens_ida_e_volta():
+    personagens, ignoradas = ler_personagens("Thorin, Anão, Guerreiro, montanhas\n\nsó um nome\nÉlana; Elfo; Mago")
+    assert ignoradas == ["só um nome"]
+    assert personagens == LOTE
+    assert formatar_lote(personagens).splitlines() == [
+        "1. Thorin | Anão | Guerreiro | montanhas",
+        "2. Élana | Elfo | Mago | não especificado",
+    ]
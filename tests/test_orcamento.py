@@ -0,0 +1,111 @@
+# ------------------------------------------------------------
+# Orçamento de saída: tamanho pedido no texto da tarefa -> max_tokens e a
+# continuação curta quando a resposta bate no teto
+# ------------------------------------------------------------
+from types import SimpleNamespace
+
+import pytest
+
+import orcamento
+from llm_groq import LLMGroq, incompleta
+from llm_stub import StubLLM
+from orcamento import TETO_MINIMO, aplicar_orcamentos, orcamento_da_tarefa, palavras_pedidas
+from rastreamento import Rastro
+
+
+@pytest.mark.parametrize("texto, palavras", [
+    ("Resumo de 150–220 palavras.", 220),
+    ("Resumo de 150-220 palavras.", 220),
+    ("Entre 100 a 150 palavras, em 2 parágrafos.", 150),  # palavras vêm antes de parágrafos
+    ("Explique em 1-2 parágrafos.", 2 * 90),
+    ("Um parágrafo curto.", 0),
+    ("3 exemplos, até 5 linhas cada.", 3 * 5 * 12 + 3 * 15),
+    ("Lista (1–4) com 1–2 frases por item.", 4 * 2 * 20 + 4 * 15),
+    ("Responda com 2 frases e 3 bullets.", 2 * 20 + 3 * 15),
+    # Frases de cada parte somam; os marcadores repetidos no expected_output contam uma vez
+    ("Inclua: definição (3-4 frases), por que importa (2-3), onde se aplica (2,3) e 4,6 ideias chave, "
+     "com marcadores.\nResumo com 4-6 marcadores (bullets).", (4 + 3 + 3) * 20 + 6 * 15),
+    ("- CONCEITO: 2 a 3 parágrafos.\n- DESCRIÇÃO: 1 a 2 parágrafos.", (3 + 2) * 90),
+    ("Escreva sobre o tema.", 0),
+    ("Crie 4 exercícios.", 0),
+])
+def test_palavras_pedidas(texto, palavras):
+    assert palavras_pedidas(texto) == palavras
+
+
+def _tarefa(descricao, nome=None, esperado=""):
+    return SimpleNamespace(name=nome, description=descricao, expected_output=esperado, agent=None)
+
+
+def test_teto_com_folga_e_minimo():
+    # 220 palavras * 1,6 tokens * 1,5 de folga + 40 fixos
+    assert orcamento_da_tarefa(_tarefa("Resumo", esperado="150–220 palavras")) == 568
+    assert orcamento_da_tarefa(_tarefa("Resumo em 10 palavras")) == TETO_MINIMO
+    assert orcamento_da_tarefa(_tarefa("Resumo livre")) is None
+
+
+def test_teto_pelo_nome_vence_o_texto():
+    assert orcamento_da_tarefa(_tarefa("Ficha em 500 palavras", nome="ficha")) == 300
+    assert orcamento_da_tarefa(_tarefa("Exercícios em 50 palavras", nome="exercicios")) is None
+    assert orcamento_da_tarefa(_tarefa("Ficha", nome="ficha"), {"ficha": 450}) == 450
+
+
+class _LLMFalso:
+    def __init__(self, max_tokens=None):
+        self.model, self.reservas, self.max_tokens = "modelo", (), max_tokens
+
+    def variante(self, modelo, reservas, max_tokens=None):
+        return _LLMFalso(max_tokens)
+
+
+def test_aplicar_orcamentos_troca_o_llm_so_de_quem_ganha_teto(monkeypatch):
+    monkeypatch.setattr(orcamento, "ATIVO", True)
+    com_teto = _tarefa("Resumo em 150–220 palavras", nome="resumo")
+    sem_teto = _tarefa("Texto livre", nome="livre")
+    ja_menor = _tarefa("Resumo em 150–220 palavras", nome="curto")
+    local = _tarefa("Gabarito em 100 palavras", nome="gabarito")
+    for tarefa, llm in ((com_teto, _LLMFalso()), (sem_teto, _LLMFalso()), (ja_menor, _LLMFalso(100))):
+        tarefa.agent = SimpleNamespace(llm=llm)
+
+    assert aplicar_orcamentos([com_teto, sem_teto, ja_menor, local]) == {"resumo": 568}
+    assert com_teto.agent.llm.max_tokens == 568
+    assert sem_teto.agent.llm.max_tokens is None and ja_menor.agent.llm.max_tokens == 100
+
+    monkeypatch.setattr(orcamento, "ATIVO", False)
+    assert aplicar_orcamentos([_tarefa("Resumo em 200 palavras")]) == {}
+
+
+@pytest.mark.parametrize("texto, cortado", [
+    ("Uma frase completa.", False),
+    ("- item um\n- item dois", True),
+    ('{"nome": "Brom", "classe"', True),
+    ("```python\nprint(1)", True),
+    ("| a | b |", False),
+    ("", False),
+])
+def test_incompleta(texto, cortado):
+    assert incompleta(texto) == cortado
+
+
+def _continuacoes(max_tokens, tokens_saida):
+    rastro = Rastro("teste").ativar()
+    llm = LLMGroq(model="groq/llama-3.1-8b-instant", api_key="teste-continuacao", max_tokens=max_tokens,
+                  usar_cache=False)
+    try:
+        with StubLLM(latencia=0, tokens_por_segundo=10 ** 6, tokens_saida=tokens_saida).instalado() as stub:
+            resposta = llm.call([{"role": "user", "content": "Explique grafos"}])
+    finally:
+        rastro.encerrar(caminho=None)
+    return resposta, stub.chamadas, sum(s.continuacoes for s in rastro.spans if s.tipo == "llm")
+
+
+def test_resposta_cortada_no_teto_ganha_uma_continuacao():
+    resposta, chamadas, continuacoes = _continuacoes(max_tokens=100, tokens_saida=400)
+    assert (chamadas, continuacoes) == (2, 1)
+    assert resposta.endswith(" e assim termina o resultado.")
+
+
+def test_resposta_dentro_do_teto_nao_continua():
+    resposta, chamadas, continuacoes = _continuacoes(max_tokens=600, tokens_saida=100)
+    assert (chamadas, continuacoes) == (1, 0)
+    assert not resposta.endswith(" e assim termina o resultado.")
@@ -0,0 +1,134 @@
+# ------------------------------------------------------------
+# executar_dag: ordem pelo DAG, paralelismo, erros, re-tentativas e cancelamento
+# ------------------------------------------------------------
+# As tarefas são falsas (tarefas_falsas.py): nenhum teste chama o LLM.
+# ------------------------------------------------------------
+import threading
+
+import pytest
+
+from orquestracao import SEPARADOR_CONTEXTO, executar_dag, executar_em_paralelo, montar_dependencias
+from tarefas_falsas import diamante
+
+
+# ----------------------------
+# Dependências
+# ----------------------------
+def test_dependencias_vem_do_context():
+    a, b, c, d = diamante()
+    dependencias = montar_dependencias([a, b, c, d])
+    assert dependencias[id(a)] == []
+    assert dependencias[id(d)] == [b, c]
+
+
+def test_dependencia_fora_da_lista_e_ciclo_sao_recusados():
+    a, b, c, d = diamante()
+    with pytest.raises(ValueError, match="fora da lista"):
+        montar_dependencias([b, c, d])
+    a.context = [d]
+    with pytest.raises(ValueError, match="circulares"):
+        montar_dependencias([a, b, c, d])
+
+
+# ----------------------------
+# Ordem e context
+# ----------------------------
+def test_tarefa_so_comeca_depois_das_dependencias():
+    eventos = []
+    tarefas = diamante(eventos)
+    ordem = [t.name for t, _ in executar_dag([], tarefas, {})]
+
+    assert ordem[0] == "a" and ordem[-1] == "d"
+    assert sorted(ordem[1:3]) == ["b", "c"]
+    inicio_d = eventos.index(("inicio", "d"))
+    assert eventos.index(("fim", "b")) < inicio_d and eventos.index(("fim", "c")) < inicio_d
+
+
+def test_context_junta_as_saidas_das_dependencias_na_ordem_do_context():
+    a, b, c, d = diamante()
+    executar_em_paralelo([], [a, b, c, d], {})
+    assert b.contextos == ["a()"]
+    assert d.contextos == [f"b(a()){SEPARADOR_CONTEXTO}c(a())"]
+    assert d.output.raw.startswith("d(b(a())")
+
+
+def test_tarefas_independentes_rodam_ao_mesmo_tempo():
+    # b e c só passam da barreira se estiverem rodando juntas
+    barreira = threading.Barrier(2, timeout=5)
+    tarefas = diamante(b={"barreira": barreira}, c={"barreira": barreira})
+    assert sorted(t.name for t, _ in executar_dag([], tarefas, {})) == ["a", "b", "c", "d"]
+
+
+def test_prontas_nao_rodam_e_viram_context():
+    a, b, c, d = diamante()
+    nomes = [t.name for t, _ in executar_dag([], [a, b, c, d], {}, prontas={id(a): "guardado"})]
+    assert "a" not in nomes and a.execucoes == 0
+    assert b.contextos == ["guardado"]
+
+
+# ----------------------------
+# Erros e re-tentativas
+# ----------------------------
+def test_erro_da_tarefa_e_levantado():
+    tarefas = diamante(b={"falhas": 1})
+    with pytest.raises(ValueError, match="falha em b"):
+        list(executar_dag([], tarefas, {}))
+
+
+def test_erro_devolvido_derruba_so_quem_depende_dele():
+    a, b, c, d = diamante(b={"falhas": 5})
+    saidas = {t.name: s for t, s in executar_dag([], [a, b, c, d], {}, devolver_erros=True)}
+
+    assert isinstance(saidas["b"], ValueError)
+    assert saidas["c"].raw == "c(a())"
+    assert isinstance(saidas["d"], RuntimeError)
+    assert d.execucoes == 0
+
+
+def test_repete_so_a_tarefa_que_falhou():
+    repeticoes = []
+    a, b, c, d = diamante(b={"falhas": 1})
+    saidas = {
+        t.name: s
+        for t, s in executar_dag(
+            [], [a, b, c, d], {}, tentativas=2, espera=0,
+            ao_repetir=lambda tarefa, tentativa, erro: repeticoes.append((tarefa.name, tentativa)),
+        )
+    }
+    assert saidas["d"].raw.startswith("d(b(a())")
+    assert repeticoes == [("b", 2)]
+    assert (a.execucoes, b.execucoes, c.execucoes, d.execucoes) == (1, 2, 1, 1)
+
+
+def test_erro_fora_de_repetir_em_nao_e_repetido():
+    a, b, c, d = diamante(b={"falhas": 1})
+    saidas = {
+        t.name: s
+        for t, s in executar_dag([], [a, b, c, d], {}, tentativas=3, espera=0,
+                                 repetir_em=(KeyError,), devolver_erros=True)
+    }
+    assert isinstance(saidas["b"], ValueError)
+    assert b.execucoes == 1
+
+
+# ----------------------------
+# Cancelamento
+# ----------------------------
+def test_cancelar_para_antes_das_proximas_tarefas():
+    cancelar = threading.Event()
+    a, b, c, d = diamante()
+    gerador = executar_dag([], [a, b, c, d], {}, cancelar=cancelar)
+
+    tarefa, _ = next(gerador)
+    assert tarefa is a
+    cancelar.set()
+    assert list(gerador) == []
+    assert b.execucoes == c.execucoes == d.execucoes == 0
+
+
+def test_cancelado_antes_de_comecar_nao_roda_nada():
+    cancelar = threading.Event()
+    cancelar.set()
+    tarefas = diamante()
+    assert list(executar_dag([], tarefas, {}, cancelar=cancelar)) == []
+    assert all(t.execucoes == 0 for t in tarefas)
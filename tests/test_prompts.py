@@ -0,0 +1,35 @@
+# ------------------------------------------------------------
+# Prompts: forma canônica e compactação do goal dos agentes
+# ------------------------------------------------------------
+import re
+
+from equipes import montar_aula_p
+from llm_groq import LLMGroq
+from prompts import compactar_goal, compactar_prompts, normalizar_espacos
+
+INPUTS = {"tema": "Algoritmos", "nivel": "Iniciante", "objetivo": "Prova"}
+
+
+def test_normalizar_espacos():
+    assert normalizar_espacos("sobre {objetivo}.Inclua  exemplos \n\n  e   mais ") == "sobre {objetivo}. Inclua exemplos\n\ne mais"
+
+
+def test_goal_perde_so_as_frases_que_a_tarefa_ja_diz():
+    tarefa = "Crie 5 exercícios sobre {tema}. NÃO inclua respostas."
+    goal = "Criar exercícios sobre {tema} sem respostas. Use linguagem acessível ao público."
+    assert compactar_goal(goal, tarefa) == "Use linguagem acessível ao público."
+    # Tudo repetido: fica a primeira frase (o goal não pode ficar vazio)
+    assert compactar_goal("Criar exercícios sobre {tema}.", tarefa) == "Criar exercícios sobre {tema}."
+
+
+def test_compactar_prompts_mede_e_encurta_sem_perder_as_variaveis():
+    agentes, tarefas = montar_aula_p(LLMGroq(model="groq/llama-3.1-8b-instant", api_key="teste-prompts"))
+    variaveis = [set(re.findall(r"\{\w+\}", tarefa.description)) for tarefa in tarefas]
+    medido = compactar_prompts(agentes, tarefas, INPUTS, aplicar=False)
+    assert all(linha["tokens_antes"] == linha["tokens_depois"] for linha in medido)
+
+    relatorio = compactar_prompts(agentes, tarefas, INPUTS)
+    assert [linha["tarefa"] for linha in relatorio] == [linha["tarefa"] for linha in medido]
+    assert all(linha["tokens_depois"] <= linha["tokens_antes"] for linha in relatorio)
+    assert sum(linha["tokens_depois"] for linha in relatorio) < sum(linha["tokens_antes"] for linha in relatorio)
+    assert [set(re.findall(r"\{\w+\}", tarefa.description)) for tarefa in tarefas] == variaveis
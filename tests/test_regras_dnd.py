@@ -0,0 +1,103 @@
+# ------------------------------------------------------------
+# Números da ficha pelas regras do SRD (nível 1)
+# ------------------------------------------------------------
+import pytest
+
+import regras_dnd
+from regras_dnd import (
+    bonus_proficiencia, calcular_ficha, comprar_pontos, ler_narrativa, modificador, renderizar_ficha,
+)
+
+
+@pytest.mark.parametrize("valor, esperado", [(1, -5), (8, -1), (9, -1), (10, 0), (11, 0), (15, 2), (20, 5)])
+def test_modificador(valor, esperado):
+    assert modificador(valor) == esperado
+
+
+@pytest.mark.parametrize("nivel, esperado", [(1, 2), (4, 2), (5, 3), (9, 4), (17, 6)])
+def test_bonus_de_proficiencia(nivel, esperado):
+    assert bonus_proficiencia(nivel) == esperado
+
+
+def test_guerreiro_humano_com_matriz_padrao():
+    ficha = calcular_ficha("Bram", "Humano", "Guerreiro")
+    valores = {a: ficha["atributos"][a]["valor"] for a in regras_dnd.ATRIBUTOS}
+    assert valores == {"FOR": 16, "DES": 14, "CON": 15, "INT": 9, "SAB": 13, "CAR": 11}
+    assert ficha["salvaguardas"]["FOR"] == 5 and ficha["salvaguardas"]["CON"] == 4
+    assert ficha["salvaguardas"]["DES"] == 2
+    assert ficha["pv"] == 12  # d10 + CON
+    assert ficha["ca"] == 18 and ficha["armadura"] == "Cota de malha + escudo"  # DES não conta
+    assert ficha["iniciativa"] == 2 and ficha["deslocamento"] == 9
+
+
+def test_defesa_sem_armadura_e_deslocamento_da_raca():
+    monge = calcular_ficha("Li", "Anão", "Monge")  # DES 15, SAB 14
+    assert monge["ca"] == 10 + 2 + 2
+    assert monge["deslocamento"] == 7.5
+    barbaro = calcular_ficha("Grok", "Meio-orc", "Bárbaro")  # FOR 17, CON 15, DES 13
+    assert barbaro["ca"] == 10 + 1 + 2
+    assert barbaro["pv"] == 12 + 2
+
+
+def test_armadura_pesada_ignora_des_negativa_e_media_nao(monkeypatch):
+    # Matriz com a DES do paladino (5ª prioridade) e do clérigo (4ª) em 6 (-2)
+    monkeypatch.setattr(regras_dnd, "MATRIZ_PADRAO", (15, 14, 13, 6, 6, 6))
+    paladino = calcular_ficha("Aster", "Gnomo", "Paladino")
+    assert paladino["modificadores"]["DES"] == -2
+    assert paladino["ca"] == 16 + 2
+    clerigo = calcular_ficha("Aster", "Gnomo", "Clérigo")
+    assert clerigo["modificadores"]["DES"] == -2
+    assert clerigo["ca"] == 14 - 2 + 2  # brunea: DES até +2, negativa também conta
+
+
+def test_brunea_limita_a_des_em_2():
+    clerigo = calcular_ficha("Sol", "Elfo", "Cleric")  # DES 12 + 2 = 14 (+2)
+    assert clerigo["ca"] == 14 + 2 + 2
+
+
+def test_meio_elfo_ganha_mais_dois_atributos_da_classe():
+    ficha = calcular_ficha("Vex", "Meio-elfo", "Ladino")  # DES e INT são os dois primeiros
+    racial = {a: ficha["atributos"][a]["racial"] for a in regras_dnd.ATRIBUTOS}
+    assert racial == {"FOR": 0, "DES": 1, "CON": 0, "INT": 1, "SAB": 0, "CAR": 2}
+
+
+def test_atributo_nao_passa_de_20():
+    ficha = calcular_ficha("Rolo", "Meio-orc", "Bárbaro", "4d6")
+    assert all(3 <= dados["valor"] <= 20 for dados in ficha["atributos"].values())
+
+
+def test_4d6_e_o_mesmo_para_o_mesmo_personagem():
+    a = calcular_ficha("Élana", "Elfo", "Mago", "4d6")
+    b = calcular_ficha("  elana ", "ELFO", "mago", "4d6")
+    c = calcular_ficha("Outra", "Elfo", "Mago", "4d6")
+    assert a["atributos"] == b["atributos"]
+    assert a["atributos"] != c["atributos"] or a["pv"] != c["pv"]
+
+
+def test_compra_de_pontos():
+    assert comprar_pontos() == [15, 15, 13, 10, 10, 8]
+    with pytest.raises(ValueError, match="27"):
+        comprar_pontos((15, 15, 15, 15, 8, 8))
+    with pytest.raises(ValueError, match="8 a 15"):
+        comprar_pontos((16, 8, 8, 8, 8, 8))
+
+
+def test_raca_e_classe_fora_do_srd_ficam_nos_avisos():
+    ficha = calcular_ficha("Zed", "Kenku", "Caçador de Bruxas")
+    assert len(ficha["avisos"]) == 2
+    assert ficha["dado_vida"] == 8 and ficha["armadura"] == "Armadura de couro"
+    assert all(dados["racial"] == 0 for dados in ficha["atributos"].values())
+
+
+def test_narrativa_em_json_com_cerca_e_chaves_com_acento():
+    campos, sobra = ler_narrativa('Claro!\n```json\n{"Alinhamento": "Neutro", "vínculo": "A forja"}\n```')
+    assert campos == {"alinhamento": "Neutro", "vinculo": "A forja"} and sobra == ""
+    assert ler_narrativa("sem json") == ({}, "sem json")
+
+
+def test_ficha_renderizada_traz_os_numeros_calculados():
+    personagem = {"nome": "Bram", "raca": "Humano", "classe": "Guerreiro"}
+    texto = renderizar_ficha(personagem, '{"alinhamento": "Leal e bom"}')
+    assert "Leal e bom" in texto
+    assert "| FOR | 16 (+1 racial) | +3 |" in texto
+    assert "**CA:** 18 (Cota de malha + escudo)" in texto
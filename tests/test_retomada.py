@@ -0,0 +1,81 @@
+# ------------------------------------------------------------
+# Pontos de retomada: a geração interrompida recomeça do que faltou
+# ------------------------------------------------------------
+import pytest
+
+import retomada
+from equipes import MARCADOR_GABARITO, separar_gabarito
+from orquestracao import executar_dag
+from retomada import PontosRetomada, chave_ponto
+from tarefas_falsas import diamante
+
+
+@pytest.fixture
+def pontos(monkeypatch):
+    # Pontos novos (em memória) para cada teste, no lugar dos do processo
+    novos = PontosRetomada(":memory:")
+    monkeypatch.setattr(retomada, "_pontos", novos)
+    return novos
+
+
+def test_chave_muda_com_entradas_e_context_mas_nao_com_espacos():
+    a = diamante()[0]
+    chave = chave_ponto("app", {"tema": "Grafos"}, a, None)
+    assert chave == chave_ponto("app", {"tema": "  Grafos "}, a, None)
+    assert chave != chave_ponto("app", {"tema": "Árvores"}, a, None)
+    assert chave != chave_ponto("app", {"tema": "Grafos"}, a, "outro context")
+    assert chave != chave_ponto("outro_app", {"tema": "Grafos"}, a, None)
+
+
+def test_ponto_guardado_expira_e_e_apagado():
+    pontos = PontosRetomada(":memory:")
+    pontos.guardar("k", "app", "a", "texto")
+    assert pontos.obter("k") == "texto"
+    assert pontos.estatisticas() == {"pontos": 1, "retomadas": 1}
+
+    pontos.apagar(["k"])
+    assert pontos.obter("k") is None
+
+    vencidos = PontosRetomada(":memory:", validade=60)
+    vencidos.guardar("k", "app", "a", "texto")
+    vencidos.validade = -1
+    assert vencidos.obter("k") is None
+
+
+def test_geracao_interrompida_so_roda_o_que_faltou(pontos):
+    # 1ª geração: d falha de vez; a, b e c ficam gravados
+    a, b, c, d = diamante(d={"falhas": 1})
+    saidas = {t.name: s for t, s in executar_dag([], [a, b, c, d], {"tema": "x"},
+                                                 devolver_erros=True, retomada="app")}
+    assert isinstance(saidas["d"], ValueError)
+    assert pontos.estatisticas()["pontos"] == 3
+
+    # 2ª geração com as mesmas entradas: só d chama o "LLM", com o mesmo context
+    a2, b2, c2, d2 = diamante()
+    saidas = {t.name: s for t, s in executar_dag([], [a2, b2, c2, d2], {"tema": "x"}, retomada="app")}
+    assert (a2.execucoes, b2.execucoes, c2.execucoes, d2.execucoes) == (0, 0, 0, 1)
+    assert saidas["b"].raw == "b(a())" and a2.output.agent == "retomada"
+    assert d2.contextos == d.contextos
+
+    # Terminou sem falhas: nada a retomar
+    assert pontos.estatisticas() == {"pontos": 0, "retomadas": 3}
+
+
+def test_entradas_diferentes_nao_retomam(pontos):
+    tarefas = diamante(d={"falhas": 1})
+    list(executar_dag([], tarefas, {"tema": "x"}, devolver_erros=True, retomada="app"))
+
+    novas = diamante()
+    list(executar_dag([], novas, {"tema": "y"}, retomada="app"))
+    assert all(t.execucoes == 1 for t in novas)
+
+
+def test_sem_retomada_nada_e_gravado(pontos):
+    list(executar_dag([], diamante(d={"falhas": 1}), {}, devolver_erros=True))
+    assert pontos.estatisticas()["pontos"] == 0
+
+
+def test_ponto_do_modo_fundido_guarda_o_gabarito():
+    # O que TarefaExerciciosComGabarito grava (exercícios + marcador + respostas) volta igual
+    ponto = f"1. Quanto é 2+2?\n\n{MARCADOR_GABARITO}\n\n1. 4"
+    assert separar_gabarito(ponto) == ("1. Quanto é 2+2?", "1. 4")
@@ -0,0 +1,66 @@
+# ------------------------------------------------------------
+# Roteamento: modelo por tarefa e reserva quando o principal está no limite
+# ------------------------------------------------------------
+from types import SimpleNamespace
+
+import pytest
+
+from llm_groq import LLMGroq
+from llm_stub import StubLLM
+from rastreamento import Rastro
+from roteamento import FORTE, RAPIDO, modelo_da_tarefa, reservas_de, rotear
+
+
+class _LLMBase:
+    def variante(self, modelo, reservas=()):
+        return SimpleNamespace(model=modelo, reservas=list(reservas))
+
+
+def _tarefa(nome):
+    return SimpleNamespace(name=nome, agent=SimpleNamespace(llm=None), context=None)
+
+
+def test_rotear_da_a_cada_tarefa_o_modelo_do_nivel():
+    resumo, exemplos, outra = _tarefa("resumo"), _tarefa("exemplos"), _tarefa("outra")
+    rotear([resumo, exemplos, outra], _LLMBase(), niveis={"exemplos": "forte"})
+    assert (resumo.agent.llm.model, resumo.agent.llm.reservas) == (FORTE, [RAPIDO])
+    # Mesmo nível, mesmo LLM; tarefa sem nível fica com o de base
+    assert exemplos.agent.llm is resumo.agent.llm
+    assert outra.agent.llm is None
+
+
+def test_reservas_de_um_modelo():
+    assert reservas_de(RAPIDO) == [FORTE]
+    assert reservas_de(FORTE) == [RAPIDO]
+
+
+@pytest.fixture
+def rastro():
+    rastro = Rastro("teste").ativar()
+    yield rastro
+    rastro.encerrar(caminho=None)
+
+
+def _modelos(rastro):
+    return [span.modelo for span in rastro.spans if span.tipo == "llm"]
+
+
+def test_429_no_principal_passa_a_chamada_para_a_reserva(rastro):
+    # Chave fora do pool do processo: limitadores só deste teste
+    llm = LLMGroq(model=RAPIDO, api_key="teste-roteamento", reservas=[FORTE], usar_cache=False)
+    with StubLLM(latencia=0, tokens_por_segundo=10 ** 6, tokens_saida=20, rpm=1).instalado() as stub:
+        assert llm.call([{"role": "user", "content": "Explique grafos"}])
+        assert llm.call([{"role": "user", "content": "Explique árvores"}])
+    assert stub.erros_429 == 1
+    assert _modelos(rastro) == [RAPIDO, FORTE]
+    tarefa = SimpleNamespace(name=None, agent=llm, context=None)
+    assert modelo_da_tarefa(rastro, tarefa) == "llama-3.1-8b-instant → llama-3.3-70b-versatile"
+
+
+def test_sem_reserva_o_429_repete_no_mesmo_modelo(rastro, monkeypatch):
+    monkeypatch.setattr("llm_groq.tempo_de_espera", lambda erro, tentativa: 0.05)
+    llm = LLMGroq(model=RAPIDO, api_key="teste-sem-reserva", usar_cache=False)
+    with StubLLM(latencia=0, tokens_por_segundo=10 ** 6, tokens_saida=20, taxa_429=0.5, semente=1).instalado() as stub:
+        assert llm.call([{"role": "user", "content": "Explique filas"}])
+    assert stub.erros_429 >= 1
+    assert set(_modelos(rastro)) == {RAPIDO}
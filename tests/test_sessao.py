@@ -0,0 +1,81 @@
+# ------------------------------------------------------------
+# Saídas guardadas na sessão: o que vale para as entradas atuais e o que roda
+# ------------------------------------------------------------
+from types import SimpleNamespace
+
+import pytest
+
+import sessao
+from sessao import ResultadosSessao, variaveis_da_tarefa
+
+
+def _tarefa(nome, descricao, context=None, goal=""):
+    agente = SimpleNamespace(role="Professor", goal=goal, backstory="")
+    return SimpleNamespace(name=nome, description=descricao, expected_output="Texto", agent=agente,
+                           context=context or [], output=None)
+
+
+@pytest.fixture
+def tarefas():
+    exercicios = _tarefa("exercicios", "Exercícios sobre {tema}", goal="Para o nível {nivel}")
+    gabarito = _tarefa("gabarito", "Respostas dos exercícios", context=[exercicios])
+    resumo = _tarefa("resumo", "Resumo de {tema} com objetivo {objetivo}")
+    return {"resumo": resumo, "exercicios": exercicios, "gabarito": gabarito}
+
+
+@pytest.fixture(autouse=True)
+def sessao_vazia(monkeypatch):
+    estado = {}
+    monkeypatch.setattr(sessao, "st", SimpleNamespace(session_state=estado))
+    return estado
+
+
+def _resultados(**inputs):
+    return ResultadosSessao("teste", {"tema": "Grafos", "nivel": "Iniciante", "objetivo": "Prova", **inputs})
+
+
+def _gerar(resultados, tarefas, *nomes):
+    for nome in nomes:
+        tarefas[nome].output = SimpleNamespace(raw=f"{nome} v{len(resultados._guardadas.get(nome, [])) + 1}")
+        resultados.guardar(tarefas[nome], tarefas[nome].output.raw)
+        tarefas[nome].output = None
+
+
+def test_variaveis_da_tarefa_incluem_as_do_agente(tarefas):
+    assert variaveis_da_tarefa(tarefas["exercicios"]) == {"tema", "nivel"}
+    assert variaveis_da_tarefa(tarefas["gabarito"]) == set()
+
+
+def test_mudar_um_campo_so_invalida_quem_o_usa(tarefas):
+    _gerar(_resultados(), tarefas, "resumo", "exercicios", "gabarito")
+    resultados = _resultados(objetivo="Revisão")
+    assert resultados.faltando(list(tarefas)) == ["resumo"]
+    # Sem clique, campo editado espera o botão; com clique, só o que falta roda
+    assert resultados.a_gerar(list(tarefas), executar=False) == []
+    assert resultados.a_gerar(list(tarefas), executar=True) == ["resumo"]
+    assert resultados.a_gerar(list(tarefas), executar=True, refazer=True) == list(tarefas)
+
+
+def test_gabarito_depende_do_texto_dos_exercicios(tarefas):
+    resultados = _resultados()
+    _gerar(resultados, tarefas, "exercicios", "gabarito")
+    assert resultados.obter("gabarito") is not None
+    # Exercícios gerados de novo: o gabarito antigo não vale mais
+    _gerar(resultados, tarefas, "exercicios")
+    assert resultados.obter("gabarito") is None
+    assert resultados.ultima("gabarito")["texto"] == "gabarito v1"
+
+
+def test_preparar_roda_dependentes_e_serve_o_context_guardado(tarefas):
+    resultados = _resultados()
+    _gerar(resultados, tarefas, "exercicios")
+
+    a_gerar = ["gabarito"]
+    rodar, prontas = resultados.preparar(list(tarefas.values()), a_gerar)
+    assert [t.name for t in rodar] == ["exercicios", "gabarito"]
+    assert prontas == {id(tarefas["exercicios"]): "exercicios v1"}
+
+    # Exercícios vão rodar: o gabarito, que depende deles, entra junto
+    a_gerar = ["exercicios"]
+    rodar, prontas = resultados.preparar(list(tarefas.values()), a_gerar)
+    assert a_gerar == ["exercicios", "gabarito"] and prontas == {}
@@ -0,0 +1,46 @@
+# ------------------------------------------------------------
+# Vários níveis: leitura dos níveis, abas, recorte do núcleo e roteamento
+# ------------------------------------------------------------
+from equipes import montar_aula_niveis, recortar_secoes
+from llm_groq import LLMGroq
+from roteamento import FORTE, RAPIDO
+from variantes import MAX_NIVEIS, entradas_niveis, ler_niveis, rotear_variantes, titulos_niveis
+
+NUCLEO = "# Núcleo\n\n## Conceitos\nc1\n\n## **Cenários**\ns1\n\n## Exercícios\ne1"
+
+
+def test_ler_niveis_sem_repeticao_e_com_limite():
+    assert ler_niveis(" iniciante,  ensino   médio;iniciante\ngraduação ,") == ["iniciante", "ensino médio", "graduação"]
+    assert len(ler_niveis(",".join(f"n{i}" for i in range(10)))) == MAX_NIVEIS
+    assert ler_niveis(None) == []
+
+
+def test_entradas_trocam_nivel_por_um_campo_por_nivel():
+    entradas = entradas_niveis({"tema": "Grafos", "nivel": "x", "objetivo": "Prova"}, ["iniciante", "graduação"])
+    assert entradas == {"tema": "Grafos", "objetivo": "Prova", "nivel_1": "iniciante", "nivel_2": "graduação"}
+
+
+def test_titulos_e_grupos_de_abas():
+    titulos, grupos = titulos_niveis(["iniciante", "graduação"], mostrar_gabarito=False)
+    assert list(titulos) == ["nucleo", "resumo_1", "exemplos_1", "exercicios_1", "resumo_2", "exemplos_2", "exercicios_2"]
+    assert list(grupos) == ["🧱 Núcleo comum", "1. iniciante", "2. graduação"]
+    assert grupos["2. graduação"] == {"resumo_2": "Resumo", "exemplos_2": "Exemplos", "exercicios_2": "Exercícios"}
+
+
+def test_recortar_secoes_do_nucleo():
+    assert recortar_secoes(NUCLEO, ("Cenários",)) == "## **Cenários**\ns1"
+    assert recortar_secoes(NUCLEO, ("Exercícios", "Conceitos")) == "## Conceitos\nc1\n\n## Exercícios\ne1"
+    # Sem nenhuma das seções: o texto inteiro
+    assert recortar_secoes("Texto sem títulos", ("Cenários",)) == "Texto sem títulos"
+
+
+def test_nucleo_no_forte_e_adaptacoes_no_rapido():
+    agentes, tarefas = montar_aula_niveis(LLMGroq(model=RAPIDO, api_key="teste-variantes"), 2)
+    rotear_variantes(tarefas, LLMGroq(model=RAPIDO, api_key="teste-variantes"))
+    modelos = {tarefa.name: tarefa.agent.llm.model for tarefa in tarefas if tarefa.agent is not None}
+    assert modelos.pop("nucleo") == FORTE
+    assert modelos and set(modelos.values()) == {RAPIDO}
+    # Cada adaptação depende só do núcleo; o gabarito, dos exercícios do nível dele
+    por_nome = {tarefa.name: tarefa for tarefa in tarefas}
+    assert por_nome["resumo_2"].context == [por_nome["nucleo"]]
+    assert por_nome["gabarito_2"].context == [por_nome["exercicios_2"]]
@@ -0,0 +1,88 @@
+# ------------------------------------------------------------
+# 🎚️ Vários níveis a partir de um núcleo comum (modo do aula_p.py)
+# ------------------------------------------------------------
+# O professor que pede o mesmo tema para "iniciante", "ensino médio" e
+# "graduação" rodava a equipe inteira uma vez por nível. Neste modo o que
+# não depende do público (conceitos, cenários, ideias de exercício) sai numa
+# chamada só, ao modelo forte, e o resumo, os exemplos e os exercícios de
+# cada nível são adaptações curtas desse núcleo, no modelo rápido, todas ao
+# mesmo tempo. A página compara o custo com o de N gerações de um nível.
+# ------------------------------------------------------------
+import re
+
+from rastreamento import custo_tarefas, media_modo
+from roteamento import FORTE, rotear
+
+# Níveis aceitos numa geração
+MAX_NIVEIS = 5
+
+# Partes de cada nível, na ordem das abas
+PARTES = {"resumo": "Resumo", "exemplos": "Exemplos", "exercicios": "Exercícios", "gabarito": "Gabarito"}
+
+
+def ler_niveis(texto):
+    """Níveis digitados (separados por vírgula, ponto e vírgula ou linha), sem repetição, até MAX_NIVEIS."""
+    niveis = (" ".join(nivel.split()) for nivel in re.split(r"[,;\n]", texto or ""))
+    return list(dict.fromkeys(nivel for nivel in niveis if nivel))[:MAX_NIVEIS]
+
+
+def entradas_niveis(inputs, niveis):
+    """Entradas da geração: as do app, sem {nivel}, mais {nivel_1}, {nivel_2}..."""
+    entradas = {campo: valor for campo, valor in inputs.items() if campo != "nivel"}
+    entradas.update({f"nivel_{i}": nivel for i, nivel in enumerate(niveis, 1)})
+    return entradas
+
+
+def titulos_niveis(niveis, mostrar_gabarito=True):
+    """
+    Títulos das abas do modo vários níveis; devolve (titulos, grupos).
+    - titulos: {nome da tarefa: título}, para a sessão e o histórico
+    - grupos: {rótulo: {nome da tarefa: título}}, um grupo de abas para o núcleo e um por nível
+    """
+    partes = {parte: titulo for parte, titulo in PARTES.items() if mostrar_gabarito or parte != "gabarito"}
+    titulos = {"nucleo": "Núcleo comum"}
+    grupos = {"🧱 Núcleo comum": {"nucleo": "Núcleo comum"}}
+    for i, nivel in enumerate(niveis, 1):
+        titulos.update({f"{parte}_{i}": f"{titulo} (nível {i})" for parte, titulo in partes.items()})
+        grupos[f"{i}. {nivel}"] = {f"{parte}_{i}": titulo for parte, titulo in partes.items()}
+    return titulos, grupos
+
+
+def rotear_variantes(tarefas, llm):
+    """Núcleo no modelo forte; as adaptações de cada nível (e o gabarito) no rápido."""
+    rotear(tarefas, llm, {tarefa.name: "rapido" for tarefa in tarefas if tarefa.name != "nucleo"})
+
+
+def grupo_comparacao(mostrar_gabarito):
+    """Grupo do comparar_modos com o custo de uma geração de um nível (com ou sem gabarito)."""
+    return "niveis_gabarito" if mostrar_gabarito else "niveis"
+
+
+def mostrar_economia(rastro, nomes, quantos, mostrar_gabarito=True):
+    """
+    Legenda com tempo, tokens e chamadas desta geração de `quantos` níveis contra
+    `quantos` gerações de um nível, uma depois da outra (média medida no processo).
+    Não mostra nada se alguma tarefa veio da sessão, do cache ou de um ponto de retomada.
+    """
+    import streamlit as st
+
+    custo = custo_tarefas(rastro, nomes)
+    if custo is None:
+        return
+    segundos, tokens, chamadas = custo
+    forte = sum(s.tokens_entrada + s.tokens_saida for s in rastro.spans
+                if s.tipo == "llm" and s.nome in nomes and s.modelo == FORTE)
+    texto = (
+        f"🎚️ {quantos} níveis com núcleo comum: {segundos:.1f}s, {tokens} tokens "
+        f"({forte} no modelo forte), {chamadas} chamada(s)"
+    )
+    media = media_modo(grupo_comparacao(mostrar_gabarito), "um_nivel")
+    if media is None:
+        texto += " · gere um tema com um nível só para comparar com gerações independentes"
+    else:
+        segundos_um, tokens_um, chamadas_um, medidas = media
+        texto += (
+            f" · {quantos} gerações independentes, uma após a outra: {quantos * segundos_um:.1f}s, {quantos * tokens_um:.0f} tokens, "
+            f"{quantos * chamadas_um:.0f} chamada(s) (média de {medidas} geração(ões) de um nível)"
+        )
+    st.caption(texto)